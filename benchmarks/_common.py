@@ -0,0 +1,24 @@
+"""Helpers shared by the benchmark scripts in this directory"""
+import time
+
+import numpy as np
+
+
+def time_calls(f, n_repeats=20, with_first=False):
+    """Return median wall time of f() in seconds, after one warm-up call
+    (which includes tracing and compilation).
+
+    :param with_first: If True, return (wall time of the warm-up call,
+        median wall time of later calls) instead.
+    """
+    t0 = time.time()
+    f()
+    t_first = time.time() - t0
+    times = []
+    for _ in range(n_repeats):
+        t0 = time.time()
+        f()
+        times.append(time.time() - t0)
+    if with_first:
+        return t_first, np.median(times)
+    return np.median(times)
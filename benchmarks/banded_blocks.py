@@ -0,0 +1,83 @@
+"""Benchmark banded contractions of block results (see Block.banded)
+
+For each banded block, contracts its result (computed on simulated
+events) over the dimension the contraction plan sums it over, once as a
+dense matrix and once using only its band, and prints the band width and
+the speedup. Also compares the full differential rate with and without
+banded contractions.
+
+Usage: python banded_blocks.py [n_events] [batch_size] [band_threshold]
+    [max_band_fraction]
+"""
+import sys
+
+import numpy as np
+import tensorflow as tf
+
+import flamedisx as fd
+
+from _common import time_calls
+
+
+def main(n_events=1000, batch_size=100, band_threshold=0.,
+         max_band_fraction=0.5):
+    for source_class in (fd.ERSource, fd.NRSource):
+        np.random.seed(0)
+        data = source_class().simulate(n_events)
+        source = source_class(data, batch_size=batch_size)
+        source.band_threshold = band_threshold
+        print(f"{source_class.__name__}: {len(data)} events, "
+              f"batch_size {batch_size}, band_threshold {band_threshold}")
+
+        plan = source.contraction_plan
+        ptensor = source.ptensor_from_kwargs()
+        for k, shared in filter(None, plan.step_bands):
+            block = source.model_blocks[plan.inputs[k]]
+            # Contract over the shared dimension, as in the plan
+            transpose = block.dimensions[0] == shared
+
+            @tf.function
+            def block_result(data_tensor):
+                r = block.compute(data_tensor, ptensor)
+                return tf.transpose(r, [0, 2, 1]) if transpose else r
+
+            @tf.function
+            def dense(r, v):
+                return r @ v
+
+            @tf.function
+            def banded(r, v):
+                band, offset = fd.to_band(r, threshold=band_threshold)
+                return fd.band_matmul(band, offset, v)
+
+            widths, sizes, t_dense, t_banded = [], [], [], []
+            for data_tensor in source.data_tensor:
+                r = block_result(data_tensor)
+                v = tf.random.uniform((r.shape[0], r.shape[2], 1),
+                                      dtype=fd.float_type())
+                widths.append(fd.to_band(r, threshold=band_threshold)[0]
+                              .shape[2])
+                sizes.append(r.shape[2])
+                t_dense.append(time_calls(lambda: dense(r, v)))
+                t_banded.append(time_calls(lambda: banded(r, v)))
+            print(f"  {block.__class__.__name__:28} over {shared:24} "
+                  f"band width {np.mean(widths):5.1f} of {np.mean(sizes):5.1f}"
+                  f", speedup {np.sum(t_dense) / np.sum(t_banded):5.2f}x")
+
+        timings = dict()
+        for fraction in (0., max_band_fraction):
+            source.max_band_fraction = fraction
+            source.trace_differential_rate()
+            timings[fraction] = time_calls(
+                lambda: source.batched_differential_rate(progress=False),
+                n_repeats=5)
+        t_dense, t_banded = timings.values()
+        print(f"  differential rate: {t_dense:.3f} s dense, "
+              f"{t_banded:.3f} s banded (max_band_fraction "
+              f"{max_band_fraction}), "
+              f"speedup {t_dense / t_banded:.2f}x")
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:3]],
+         *[float(x) for x in sys.argv[3:5]])
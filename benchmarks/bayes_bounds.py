@@ -0,0 +1,106 @@
+"""Benchmark fd.bounds.bayes_bounds against a per-event reference
+implementation (the loop-based implementation it replaced)
+
+Usage: python bayes_bounds.py [n_events] [n_support]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import flamedisx as fd
+
+
+def reference_bounds(supports, cdfs, bounds_prob):
+    lower = [support[np.where(cdf < bounds_prob)[0][-1]]
+             if len(np.where(cdf < bounds_prob)[0]) > 0
+             else support[0]
+             for support, cdf in zip(supports, cdfs)]
+    upper = [support[np.where(cdf > 1. - bounds_prob)[0][0]]
+             if len(np.where(cdf > 1. - bounds_prob)[0]) > 0
+             else support[-1]
+             for support, cdf in zip(supports, cdfs)]
+    return np.array(lower), np.array(upper)
+
+
+def reference_binomial(supports, rvs, ns, ps):
+    pdfs = [stats.binom.pmf(rv, n, p) for rv, n, p in zip(rvs, ns, ps)]
+    return [np.cumsum(pdf / np.sum(pdf)) for pdf in pdfs]
+
+
+def reference_normal(supports, rvs, mus, sigmas):
+    pdfs = [stats.norm.pdf(rv, mu, sigma)
+            for rv, mu, sigma in zip(rvs, mus, sigmas)]
+    return [np.cumsum(pdf / np.sum(pdf)) for pdf in pdfs]
+
+
+def best_of(f, n_repeats=3):
+    times = []
+    for _ in range(n_repeats):
+        t0 = time.time()
+        f()
+        times.append(time.time() - t0)
+    return min(times)
+
+
+def main(n_events=10_000, n_support=1000):
+    np.random.seed(0)
+    bounds_prob = fd.Source().bounds_prob
+
+    # Photon detection, as in the NEST DetectPhotons block
+    out_bounds = np.random.randint(5, 200, size=n_events)
+    effs = np.random.uniform(0.05, 0.2, size=n_events)
+    supports = [np.linspace(out_bound, np.ceil(out_bound / eff * 10.),
+                            n_support).astype(int)
+                for out_bound, eff in zip(out_bounds, effs)]
+    binomial = dict(
+        rvs_binom=[out_bound * np.ones_like(support)
+                   for out_bound, support in zip(out_bounds, supports)],
+        ns_binom=supports,
+        ps_binom=[eff * np.ones_like(support)
+                  for eff, support in zip(effs, supports)])
+
+    # S1 smearing, as in the NEST MakeS1 block
+    signals = np.random.uniform(5, 200, size=n_events)
+    supports_normal = [np.linspace(np.floor(s / 2.), np.ceil(s * 2.),
+                                   n_support).astype(int)
+                       for s in signals]
+    normal = dict(
+        rvs_normal=[s * np.ones_like(support)
+                    for s, support in zip(signals, supports_normal)],
+        mus_normal=supports_normal,
+        sigmas_normal=[0.4 * np.sqrt(support) + 0.1
+                       for support in supports_normal])
+
+    print(f"{n_events} events, {n_support} support points")
+    for bound_type, supp, kwargs, reference in (
+            ('binomial', supports, binomial, reference_binomial),
+            ('normal', supports_normal, normal, reference_normal)):
+        df = pd.DataFrame(index=np.arange(n_events))
+
+        def new():
+            for bound in ('lower', 'upper'):
+                fd.bounds.bayes_bounds(
+                    df, 'x', bounds_prob, bound, bound_type, supp, **kwargs)
+
+        def old():
+            # Like bayes_bounds, compute the posterior once per bound
+            lower, _ = reference_bounds(
+                supp, reference(supp, *kwargs.values()), bounds_prob)
+            _, upper = reference_bounds(
+                supp, reference(supp, *kwargs.values()), bounds_prob)
+            return lower, upper
+
+        t_new, t_old = best_of(new), best_of(old)
+        lower, upper = old()
+        np.testing.assert_array_equal(df['x_min'].values, lower)
+        np.testing.assert_array_equal(df['x_max'].values, upper)
+        print(f"{bound_type:8}: per-event {t_old * 1e3:8.1f} ms, "
+              f"vectorized {t_new * 1e3:8.1f} ms "
+              f"({t_old / t_new:.1f}x), same bounds")
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,90 @@
+"""Benchmark ERSource's log likelihood and gradient with the beta-binomial
+quanta splitting computed as before (fd.beta_binom_pmf on the full
+(electrons, photons) grid) and as now (beta distribution per nq, binomial
+coefficients from fd.log_binom_coef)
+
+Usage: python beta_binomial.py [n_events] [batch_size]
+"""
+import sys
+
+import numpy as np
+import tensorflow as tf
+
+import flamedisx as fd
+
+from _common import time_calls
+
+o = tf.newaxis
+
+
+class OldMakePhotonsElectronsBetaBinomial(fd.MakePhotonsElectronsBetaBinomial):
+    """Quanta splitting as computed before, for comparison"""
+
+    def _compute(self,
+                 data_tensor, ptensor,
+                 electrons_produced, photons_produced,
+                 quanta_produced, rate_vs_quanta):
+        pel = self.source.gimme('p_electron', bonus_arg=quanta_produced,
+                                data_tensor=data_tensor, ptensor=ptensor)
+        nq = electrons_produced + photons_produced
+        _nq_ind = tf.round(
+            (nq - self.source._fetch(
+                'quanta_produced_min', data_tensor=data_tensor
+            )[:, o, o]) / self.source._fetch(
+                'quanta_produced_steps', data_tensor=data_tensor
+            )[:, o, o])
+        rate_nq = fd.lookup_axis1(rate_vs_quanta, _nq_ind)
+        pel = self._clip_pel(fd.lookup_axis1(pel, _nq_ind))
+        pel_fluct = self.gimme('p_electron_fluctuation',
+                               bonus_arg=quanta_produced,
+                               data_tensor=data_tensor,
+                               ptensor=ptensor)
+        pel_fluct = fd.lookup_axis1(pel_fluct, _nq_ind)
+        return rate_nq * fd.beta_binom_pmf(
+            photons_produced,
+            n=nq,
+            p_mean=1. - pel,
+            p_sigma=pel_fluct)
+
+
+class OldERSource(fd.ERSource):
+    model_blocks = (
+        fd.ERSource.model_blocks[:2]
+        + (OldMakePhotonsElectronsBetaBinomial,)
+        + fd.ERSource.model_blocks[3:])
+
+
+def main(n_events=1000, batch_size=100):
+    np.random.seed(0)
+    data = fd.ERSource().simulate(n_events)
+    print(f"{len(data)} events, batch_size {batch_size}")
+
+    lfs = dict()
+    for label, source_class in (('before', OldERSource),
+                                ('after', fd.ERSource)):
+        lfs[label] = fd.LogLikelihood(
+            sources=dict(er=source_class),
+            free_rates='er',
+            elife=(100e3, 500e3, 5),
+            data=data,
+            batch_size=batch_size,
+            progress=False,
+            memoize_differential_rates=False)
+    # Share the mu estimator, so both likelihoods give the same results
+    lfs['after'].mu_estimators = lfs['before'].mu_estimators
+    lfs['after'].param_defaults = lfs['before'].param_defaults
+
+    results = dict()
+    for label, lf in lfs.items():
+        t = time_calls(lambda: lf.log_likelihood())
+        results[label] = lf.log_likelihood()
+        print(f"{label:6} {t * 1e3:8.1f} ms per log likelihood and gradient")
+
+    np.testing.assert_allclose(results['after'][0], results['before'][0],
+                               rtol=1e-4)
+    np.testing.assert_allclose(results['after'][1], results['before'][1],
+                               rtol=1e-3)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""Benchmark speed and accuracy of the float types set by fd.set_float_type
+
+For each float type, times the log likelihood and its Hessian on the same
+data, and compares the log likelihood and gradient to float64.
+Sources and likelihoods keep the float type they are created with, so each
+float type gets its own likelihood.
+
+Usage: python float_type.py [n_events] [batch_size]
+"""
+import sys
+
+import numpy as np
+
+import flamedisx as fd
+
+from _common import time_calls
+
+
+def main(n_events=500, batch_size=50):
+    for source_class in (fd.ERSource, fd.NRSource):
+        np.random.seed(0)
+        data = source_class().simulate(n_events)
+        print(f"{source_class.__name__}: {len(data)} events, "
+              f"batch_size {batch_size}")
+
+        results = dict()
+        mu = None
+        for kind in ('float64', 'mixed', 'float32'):
+            fd.set_float_type(kind)
+            lf = fd.LogLikelihood(
+                sources=dict(s=source_class),
+                free_rates='s',
+                elife=(100e3, 500e3, 5),
+                data=data,
+                batch_size=batch_size,
+                progress=False,
+                mu_estimators=fd.ConstantMu)
+            # The expected number of events is estimated by MC,
+            # share it so only the float type differs between likelihoods
+            if mu is None:
+                mu = lf.mu_estimators['s'].mu
+            lf.mu_estimators['s'].mu = mu
+            t1 = time_calls(lambda: lf.log_likelihood())
+            t2 = time_calls(lambda: lf.log_likelihood(second_order=True))
+            results[kind] = lf.log_likelihood()[:2]
+
+            ll, grad = results[kind]
+            ll_ref, grad_ref = results['float64']
+            print(f"  {kind:8} {t1 * 1e3:8.1f} ms/call, "
+                  f"{t2 * 1e3:8.1f} ms/call with Hessian; "
+                  f"|d ll| = {abs(ll - ll_ref):.2e}, "
+                  f"max |d grad| = {np.max(np.abs(grad - grad_ref)):.2e}")
+        fd.set_float_type('float32')
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
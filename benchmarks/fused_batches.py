@@ -0,0 +1,47 @@
+"""Benchmark LogLikelihood.log_likelihood with and without fuse_batches
+
+Usage: python fused_batches.py [n_events] [batch_size]
+"""
+import sys
+
+import numpy as np
+
+import flamedisx as fd
+
+from _common import time_calls
+
+
+def main(n_events=1000, batch_size=50):
+    np.random.seed(0)
+    data = fd.ERSource().simulate(n_events)
+    print(f"{len(data)} events, batch_size {batch_size}")
+
+    lfs = dict()
+    for fuse_batches in (False, True):
+        lfs[fuse_batches] = fd.LogLikelihood(
+            sources=dict(er=fd.ERSource),
+            free_rates='er',
+            elife=(100e3, 500e3, 5),
+            data=data,
+            batch_size=batch_size,
+            progress=False,
+            fuse_batches=fuse_batches)
+    # Share the mu estimator, so both likelihoods give identical results
+    lfs[True].mu_estimators = lfs[False].mu_estimators
+    lfs[True].param_defaults = lfs[False].param_defaults
+
+    for second_order in (False, True):
+        results = dict()
+        for fuse_batches, lf in lfs.items():
+            t = time_calls(
+                lambda: lf.log_likelihood(second_order=second_order))
+            results[fuse_batches] = lf.log_likelihood(
+                second_order=second_order)
+            print(f"second_order={second_order!s:5} "
+                  f"fuse_batches={fuse_batches!s:5} {t * 1e3:8.1f} ms/call")
+        np.testing.assert_allclose(results[True][0], results[False][0],
+                                   rtol=1e-6)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,54 @@
+"""Benchmark per-batch row selection by range queries on an MC reservoir, with
+fd.bounds.IndexedReservoir and with boolean masks over the full reservoir
+(as used for the NEST energy bounds before).
+
+Usage: python indexed_reservoir.py [n_reservoir] [n_batches]
+"""
+import sys
+import time
+
+import numpy as np
+
+import flamedisx as fd
+
+
+def main(n_reservoir=1_000_000, n_batches=1000):
+    np.random.seed(0)
+    # Columns: energy, electrons_produced, photons_produced
+    energy = np.random.uniform(0, 50, n_reservoir)
+    electrons = np.random.poisson(30 * energy)
+    photons = np.random.poisson(40 * energy)
+    res = np.stack([energy, electrons, photons], axis=1).astype(float)
+
+    # Each batch covers events of similar energy
+    e = np.random.uniform(1, 45, n_batches)
+    queries = [({1: 30 * x * 0.9, 2: 40 * x * 0.9},
+                {1: 30 * x * 1.1, 2: 40 * x * 1.1}) for x in e]
+
+    t0 = time.time()
+    masked = []
+    for mins, maxs in queries:
+        mask = np.ones(n_reservoir, dtype=bool)
+        for col, x in mins.items():
+            mask &= res[:, col] >= x
+        for col, x in maxs.items():
+            mask &= res[:, col] <= x
+        masked.append(np.flatnonzero(mask))
+    t_mask = time.time() - t0
+
+    t0 = time.time()
+    index = fd.bounds.IndexedReservoir(res, 1)
+    t_build = time.time() - t0
+    indexed = [index.select(mins=mins, maxs=maxs) for mins, maxs in queries]
+    t_index = time.time() - t0
+
+    for rows_masked, rows_indexed in zip(masked, indexed):
+        np.testing.assert_array_equal(rows_masked, np.sort(rows_indexed))
+    print(f"{n_reservoir} rows, {n_batches} batches")
+    print(f"Boolean masks: {t_mask:.2f} s")
+    print(f"Indexed:       {t_index:.2f} s (of which {t_build:.2f} s "
+          f"building the index), {t_mask / t_index:.1f}x, same rows")
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
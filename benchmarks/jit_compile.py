@@ -0,0 +1,58 @@
+"""Benchmark XLA compilation (jit_compile) of differential rates and
+log likelihoods on the CPU
+
+Usage: python jit_compile.py [n_events] [batch_size]
+"""
+import sys
+
+import numpy as np
+import tensorflow as tf
+
+import flamedisx as fd
+
+from _common import time_calls
+
+
+def main(n_events=1000, batch_size=100):
+    tf.config.set_visible_devices([], 'GPU')
+
+    for source_class in (fd.ERSource, fd.NRSource):
+        np.random.seed(0)
+        data = source_class().simulate(n_events)
+        print(f"{source_class.__name__}: {len(data)} events, "
+              f"batch_size {batch_size}")
+
+        lfs = dict()
+        for jit_compile in (False, True):
+            lfs[jit_compile] = fd.LogLikelihood(
+                sources=dict(s=source_class),
+                free_rates='s',
+                elife=(100e3, 500e3, 5),
+                data=data,
+                batch_size=batch_size,
+                progress=False,
+                memoize_differential_rates=False,
+                jit_compile=jit_compile)
+        # Share the mu estimator, so both likelihoods give the same results
+        lfs[True].mu_estimators = lfs[False].mu_estimators
+        lfs[True].param_defaults = lfs[False].param_defaults
+
+        results = dict()
+        for jit_compile, lf in lfs.items():
+            source = lf.sources['s']
+            for name, f in (
+                    ('differential rate',
+                     lambda: source.batched_differential_rate(progress=False)),
+                    ('log likelihood', lambda: lf.log_likelihood()),
+                    ('hessian-vector product',
+                     lambda: lf.log_likelihood_hessp(np.ones(2)))):
+                t_first, t = time_calls(f, n_repeats=5, with_first=True)
+                print(f"  jit_compile={jit_compile!s:5} {name:23} "
+                      f"{t * 1e3:8.1f} ms/call, first call {t_first:6.1f} s")
+            results[jit_compile] = lf.log_likelihood()[0]
+        print(f"  log likelihood difference: "
+              f"{results[True] - results[False]:.2e}")
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,84 @@
+"""Benchmark Owen's T function as evaluated by SkewGaussian before
+(truncated series, with 2 and 5 terms as used for NEST NR and ER) and as
+now (fd.owens_t, Gauss-Legendre quadrature), for speed and for accuracy
+against scipy.special.owens_t. Also times the NEST NRSource differential
+rate, which evaluates Owen's T in MakePhotonsElectronsNR.
+
+Usage: python owens_t.py [n_elements] [n_events] [batch_size]
+"""
+import sys
+
+import numpy as np
+from scipy import special
+import tensorflow as tf
+import tensorflow_probability as tfp
+
+import flamedisx as fd
+
+from _common import time_calls
+
+
+def old_owens_t1(h, a, terms):
+    """Owen's T series as evaluated by SkewGaussian before, for comparison"""
+    hs = -0.5 * h * h
+    exp_hs = tf.math.exp(hs)
+
+    ci = -1 + exp_hs
+    val = tf.math.atan(a) * tf.ones_like(hs)
+
+    for i in range(terms):
+        val += ci * tf.math.pow(a, 2 * tf.cast(i, h.dtype) + 1) / (2 * tf.cast(i, h.dtype) + 1)
+        ci = -ci + tf.math.pow(hs, tf.cast(i + 1, h.dtype)) / tf.exp(tf.math.lgamma(tf.cast(i + 2, h.dtype))) * exp_hs
+
+    return val / (2 * np.pi)
+
+
+def old_owens_t(h, a, terms):
+    """Owen's T as evaluated by SkewGaussian._cdf before, for comparison"""
+    std_normal = tfp.distributions.Normal(
+        loc=tf.constant(0., h.dtype), scale=tf.constant(1., h.dtype))
+    owens_t_eval = (0.5 * std_normal.cdf(h) + 0.5 * std_normal.cdf(a * h)
+                    - std_normal.cdf(h) * std_normal.cdf(a * h))
+    return tf.where(a > tf.ones_like(a),
+                    owens_t_eval - old_owens_t1(a * h, 1. / a, terms),
+                    old_owens_t1(h, a, terms))
+
+
+def main(n_elements=1_000_000, n_events=1000, batch_size=100):
+    np.random.seed(0)
+    # Arguments as in MakePhotonsElectronsNR: standardized electron counts
+    # and modest skewness
+    h = np.random.normal(0, 3, n_elements).astype(np.float32)
+    a = np.random.normal(0, 2, n_elements).astype(np.float32)
+    expected = special.owens_t(h.astype(np.float64), a.astype(np.float64))
+    h, a = fd.np_to_tf(h), fd.np_to_tf(a)
+    print(f"{n_elements} elements, h ~ N(0, 3), a ~ N(0, 2)")
+
+    functions = {
+        f'series, {terms} terms': tf.function(
+            lambda h, a, terms=terms: old_owens_t(h, a, terms))
+        for terms in (2, 5)}
+    functions.update({
+        f'fd.owens_t, {n_points} points': tf.function(
+            lambda h, a, n_points=n_points: fd.owens_t(h, a, n_points))
+        for n_points in (4, 6)})
+    for label, f in functions.items():
+        t = time_calls(lambda: f(h, a))
+        result = f(h, a).numpy()
+        # The series was only used for a > -1
+        err = np.abs(result - expected)
+        err_pos = err[a.numpy() > -1]
+        print(f"  {label:22} {t * 1e3:7.2f} ms, max abs. error "
+              f"{err_pos.max():.1e} for a > -1, {err.max():.1e} overall")
+
+    data = fd.nest.nestNRSource().simulate(n_events)
+    source = fd.nest.nestNRSource(data, batch_size=batch_size)
+    t = time_calls(
+        lambda: source.batched_differential_rate(progress=False),
+        n_repeats=5)
+    print(f"nestNRSource: {len(data)} events, batch_size {batch_size}, "
+          f"{t:.3f} s per differential rate")
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,68 @@
+"""Report the padding in block tensors with and without sort_by_dimsizes
+
+The padded volume of a block is the sum over batches of
+batch_size times the product of the largest domain size in the batch
+along each of the block's hidden dimensions. The padding is the part of
+this not covered by any event's own domain.
+
+Sorting also changes which events share stepping (see
+calculate_dimsizes_special), so the total volume can change as well.
+
+Usage: python sort_by_dimsizes.py [n_events] [batch_size]
+"""
+import sys
+
+import numpy as np
+
+import flamedisx as fd
+
+
+def block_volumes(source):
+    """Return dict {block dimensions: (padded volume, padding)}"""
+    result = dict()
+    for block in source.model_blocks:
+        padded, used = 0, 0
+        for i in range(source.n_batches):
+            batch = source.data.iloc[i * source.batch_size:
+                                     (i + 1) * source.batch_size]
+            v_padded = source.batch_size
+            v_used = np.ones(len(batch))
+            for dim in block.dimensions:
+                if dim in source.inner_dimensions:
+                    sizes = batch[dim + '_dimsizes'].values
+                    v_padded *= sizes.max()
+                    v_used *= sizes
+            padded += v_padded
+            used += v_used.sum()
+        result[block.dimensions] = padded, padded - used
+    return result
+
+
+def main(n_events=1000, batch_size=50):
+    np.random.seed(0)
+    data = fd.ERSource().simulate(n_events)
+    print(f"{len(data)} events, batch_size {batch_size}")
+
+    volumes = dict()
+    for sort_by_dimsizes in (False, True):
+        s = fd.ERSource(data.copy(),
+                        batch_size=batch_size,
+                        sort_by_dimsizes=sort_by_dimsizes)
+        volumes[sort_by_dimsizes] = block_volumes(s)
+
+    print(f"{'block':45} {'unsorted':>21} {'sorted':>21}")
+    print(f"{'':45} {'volume':>10} {'padding':>10} "
+          f"{'volume':>10} {'padding':>10}")
+    totals = np.zeros(4)
+    for dims, (v, p) in volumes[False].items():
+        v_sorted, p_sorted = volumes[True][dims]
+        totals += [v, p, v_sorted, p_sorted]
+        print(f"{', '.join(dims):45} {v:10.0f} {p:10.0f} "
+              f"{v_sorted:10.0f} {p_sorted:10.0f}")
+    print(f"{'total':45} " + ' '.join([f"{x:10.0f}" for x in totals]))
+    print(f"Padding fraction: {totals[1] / totals[0]:.3f} unsorted, "
+          f"{totals[3] / totals[2]:.3f} sorted")
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -8,6 +8,8 @@ from .likelihood import *
 from .inference import *
 from .bounds import *
 from .mu_estimation import *
+from .batch_tuning import *
+from .toys import *
 from .frozen_reservoir import *
 
 # Original flamedisx models
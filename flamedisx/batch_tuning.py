@@ -0,0 +1,179 @@
+"""
+Routines for choosing the batch size of sources and likelihoods
+"""
+import time
+
+import numpy as np
+import tensorflow as tf
+
+import flamedisx as fd
+
+export, __all__ = fd.exporter()
+
+#: Candidate batch sizes tried by tune_batch_size
+DEFAULT_BATCH_SIZE_CANDIDATES = (5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+@export
+def estimate_batch_memory(source: fd.Source, overhead=4):
+    """Return estimated peak memory (in bytes) used by one call of
+    source.differential_rate, for the most demanding batch in its data.
+
+    The estimate is based on the (batch_size, n_x, n_y) tensors of the
+    blocks of a BlockModelSource; other sources only count the data tensor.
+
+    :param overhead: Factor to multiply the block tensor sizes with,
+        to account for temporary tensors inside the block computations.
+    """
+    itemsize = fd.float_type().size
+    batch_size = source.batch_size
+    n_data = batch_size * source.n_columns_in_data_tensor
+
+    blocks = getattr(source, 'model_blocks', tuple())
+    if not blocks:
+        return n_data * itemsize
+
+    peak = 0
+    for i_batch in range(source.n_batches):
+        data_tensor = source.data_tensor[i_batch]
+        batch = source.data.iloc[i_batch * batch_size:
+                                 (i_batch + 1) * batch_size]
+
+        def width(dim):
+            if dim in source.initial_dimensions:
+                return int(tf.shape(
+                    source.domain(dim, data_tensor=data_tensor))[1])
+            return int(batch[dim + '_dimsizes'].max())
+
+        n_blocks = 0
+        for b in blocks:
+            widths = [width(dim) for dim in b.dimensions]
+            for dim, stepped in b.bonus_dimensions:
+                if stepped:
+                    # Extra axis of the block tensor
+                    widths.append(width(dim))
+                else:
+                    # Unstepped version of the block's first dimension
+                    widths[0] = max(widths[0], width(dim))
+            n_blocks += batch_size * np.prod(widths)
+        peak = max(peak, n_data + overhead * n_blocks)
+
+    return int(peak) * itemsize
+
+
+def _original_data(source):
+    """Return the events in source.data without padding, in the order
+    they were passed to set_data"""
+    data = source.data.iloc[:source.n_events]
+    if source.event_order is not None:
+        data = data.iloc[np.argsort(source.event_order)]
+    return data.reset_index(drop=True)
+
+
+def _set_batch_size(source, batch_size, data):
+    source.batch_size = min(batch_size, len(data))
+    source.set_data(data.copy())
+    source.trace_differential_rate()
+
+
+def _time_source(source, n_batches, **params):
+    """Return seconds needed to compute the differential rate of all
+    events in source, extrapolated from timing n_batches batches"""
+    # First call includes tracing
+    source.differential_rate(data_tensor=source.data_tensor[0],
+                             **params).numpy()
+    times = []
+    for i in range(n_batches):
+        q = source.data_tensor[i % source.n_batches]
+        t0 = time.time()
+        source.differential_rate(data_tensor=q, **params).numpy()
+        times.append(time.time() - t0)
+    return np.median(times) * source.n_batches
+
+
+@export
+def tune_batch_size(source_or_likelihood,
+                    max_memory=None,
+                    candidates=DEFAULT_BATCH_SIZE_CANDIDATES,
+                    n_batches=3,
+                    apply=True,
+                    progress=False,
+                    **params):
+    """Return the batch size giving the highest throughput
+    (events / second) of the differential rate on the currently set data.
+
+    Each candidate batch size is tried by re-setting (and re-annotating)
+    the data, since stepping and domain sizes depend on the batching.
+
+    :param source_or_likelihood: Source or LogLikelihood with data set
+    :param max_memory: Maximum estimated peak memory in bytes of a single
+        differential rate call (see estimate_batch_memory). Candidates
+        exceeding this are skipped. If None, no limit is applied.
+    :param candidates: Batch sizes to try. Sizes above the number of
+        events are clipped to it.
+    :param n_batches: Number of batches to time per candidate
+    :param apply: If True, set the best batch size on the source or
+        likelihood. Otherwise, restore the original batch size.
+    :param progress: If True, print the result for each candidate
+    :param params: Parameters to evaluate the differential rate at
+    """
+    if isinstance(source_or_likelihood, fd.LogLikelihood):
+        lf = source_or_likelihood
+        sources = lf.sources
+    else:
+        lf = None
+        sources = dict(source=source_or_likelihood)
+    if any([s.data is None for s in sources.values()]):
+        raise ValueError("Set data before tuning the batch size")
+
+    original_batch_size = max([s.batch_size for s in sources.values()])
+    data = {sname: _original_data(s) for sname, s in sources.items()}
+    n_events = sum([len(d) for d in data.values()])
+    n_max = max([len(d) for d in data.values()])
+    candidates = sorted(set([min(c, n_max) for c in candidates]))
+
+    best, best_rate = None, 0
+    for batch_size in candidates:
+        t, memory = 0, 0
+        for sname, s in sources.items():
+            _set_batch_size(s, batch_size, data[sname])
+            memory = max(memory, estimate_batch_memory(s))
+            if max_memory is not None and memory > max_memory:
+                t = None
+                break
+            t += _time_source(
+                s, n_batches,
+                **{k: v for k, v in params.items() if k in s.defaults})
+
+        if t is None:
+            if progress:
+                print(f"batch_size {batch_size:5d}: skipped, "
+                      f"~{memory / 2**20:.1f} MB exceeds max_memory")
+            continue
+        rate = n_events / t
+        if progress:
+            print(f"batch_size {batch_size:5d}: {rate:10.1f} events/s, "
+                  f"~{memory / 2**20:.1f} MB")
+        if rate > best_rate:
+            best, best_rate = batch_size, rate
+
+    # Apply the best batch size, or restore the original one
+    final_batch_size = original_batch_size
+    if apply and best is not None:
+        final_batch_size = best
+    if lf is None:
+        _set_batch_size(sources['source'], final_batch_size, data['source'])
+    else:
+        for sname, s in sources.items():
+            s.batch_size = min(final_batch_size, len(data[sname]))
+            s.trace_differential_rate()
+        # Setting data also resets the default rate multipliers
+        param_defaults = lf.param_defaults.copy()
+        lf.set_data({dname: data[snames[0]]
+                     for dname, snames in lf.sources_in_dset.items()})
+        lf.param_defaults = param_defaults
+
+    if best is None:
+        raise ValueError(
+            f"No batch size in {candidates} fits in {max_memory} bytes")
+    return best
@@ -1,3 +1,4 @@
+import string
 import typing as ty
 
 import numpy as np
@@ -62,6 +63,24 @@ class Block:
     #: for variable tensor stepping
     max_dim_size: ty.Dict[str, int] = dict()
 
+    #: Whether the block's result is nonzero only near a diagonal of its
+    #: (index) domain, e.g. quanta_detected close to quanta_produced.
+    #: Contractions over one of its dimensions can then use only this
+    #: band, see BlockModelSource.max_band_fraction.
+    banded = False
+
+    #: Whether _annotate sets bounds for whole batches of events (e.g. from
+    #: an MC reservoir), so they depend on how events are batched.
+    #: Events are sorted (see Source.sort_by_dimsizes) using only the bounds
+    #: of blocks annotated before the first such block.
+    batch_annotation = False
+
+    #: Dimensions of a dependency (see depends_on) that the block can
+    #: contract its result with directly, in _compute_contracted, e.g.
+    #: by a scatter-add rather than a matrix multiplication. The block's
+    #: full result is then only computed if something else needs it.
+    contracted_dependency: ty.Tuple[str] = tuple()
+
     def __init__(self, source):
         self.source = source
         assert len(self.dimensions) in (1, 2), \
@@ -108,23 +127,45 @@ class Block:
         """Shorthand for self.source.gimme_numpy"""
         return self.source.gimme_numpy(*args, **kwargs)
 
-    def compute(self, data_tensor, ptensor, **kwargs):
+    def compute(self, data_tensor, ptensor, log_space=False, **kwargs):
+        """Return the block's result, or its log if log_space"""
+        compute = self._compute_log if log_space else self._compute
         if len(self.bonus_dimensions) == 0:
             # We don't have any bonus_dimensions; construct domains as normal for
             # this block
-            kwargs.update(self.source._domain_dict(
-                self.dimensions, data_tensor))
+            domains = self.source._domain_dict(self.dimensions, data_tensor)
+            kwargs.update(domains)
+            result = compute(data_tensor, ptensor, **kwargs)
+            if len(self.dimensions) == 2:
+                # Domains only broadcast to (n_events, n_x, n_y), see
+                # cross_domains, so results that do not depend on both
+                # dimensions must be expanded. This is free for results
+                # that already have the full shape.
+                result = tf.broadcast_to(result, tf.broadcast_dynamic_shape(
+                    *[tf.shape(domains[dim]) for dim in self.dimensions]))
         else:
             # We have bonus_dimensions; need to construct domains manually
             # for this block
             kwargs.update(self._domain_dict_bonus(data_tensor))
-        result = self._compute(data_tensor, ptensor, **kwargs)
+            result = compute(data_tensor, ptensor, **kwargs)
         assert result.dtype == fd.float_type(), \
             f"{self}._compute returned tensor of wrong dtype!"
         assert len(result.shape) == len(self.dimensions) + 1, \
             f"{self}._compute returned tensor of wrong rank!"
         return result
 
+    def compute_contracted(self, data_tensor, ptensor, log_space=False,
+                           **kwargs):
+        """Return the block's result contracted with the dependency
+        in contracted_dependency, or its log if log_space"""
+        if len(self.bonus_dimensions) == 0:
+            kwargs.update(self.source._domain_dict(self.dimensions,
+                                                   data_tensor))
+        else:
+            kwargs.update(self._domain_dict_bonus(data_tensor))
+        result = self._compute_contracted(data_tensor, ptensor, **kwargs)
+        return fd.safe_log(result) if log_space else result
+
     def simulate(self, d: pd.DataFrame):
         return_value = self._simulate(d)
         assert return_value is None, f"_simulate of {self} should return None"
@@ -174,6 +215,17 @@ class Block:
         """Return (n_batch_events, ...dimensions...) tensor"""
         raise NotImplementedError
 
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        """Return log of _compute's result. Override this if the block
+        can compute log probabilities without underflow."""
+        return fd.safe_log(self._compute(data_tensor, ptensor, **kwargs))
+
+    def _compute_contracted(self, data_tensor, ptensor, **kwargs):
+        """Return (n_batch_events, ...remaining dimensions...) tensor,
+        the contraction of _compute's result with the dependency in
+        contracted_dependency (passed like other dependencies)"""
+        raise NotImplementedError
+
     def _simulate(self, d):
         """Simulate extra columns in place.
 
@@ -238,6 +290,24 @@ class BlockModelSource(fd.Source):
     #: Dimensions provided by the first block
     initial_dimensions: tuple
 
+    #: {index in model_blocks: index of contracted result} for blocks with
+    #: a contracted_dependency, see plan_contractions
+    contracted_results: ty.Dict[int, int]
+
+    #: Contract results of banded blocks (see Block.banded) using only
+    #: their band, if its width is at most this fraction of the summed
+    #: dimension's size. Otherwise, or if 0 (default), contract them as
+    #: dense tensors. Finding the band costs time on every evaluation,
+    #: so check with benchmarks/banded_blocks.py whether this is faster
+    #: for your model before enabling it.
+    #: Banded contractions are not used with jit_compile, since the band
+    #: width varies between batches.
+    max_band_fraction = 0.
+
+    #: Entries of banded block results below band_threshold times the
+    #: largest entry for the event are taken to be zero.
+    band_threshold = 0.
+
     def __init__(self, *args, **kwargs):
         if isinstance(self.model_blocks[0], FirstBlock):
             # Blocks have already been instantiated
@@ -336,6 +406,8 @@ class BlockModelSource(fd.Source):
         self.exclude_data_tensor = tuple([
             d for d in collected['exclude_data_tensor']])
 
+        self.plan_contractions()
+
         super().__init__(*args, **kwargs)
 
     @staticmethod
@@ -353,12 +425,123 @@ class BlockModelSource(fd.Source):
                     return dims, b
         raise BlockNotFoundError(f"No block with {has_dim} found!")
 
+    def plan_contractions(self, dimsizes=None, optimize=True):
+        """Plan the order in which block results are contracted.
+
+        Sets contraction_plan, the plan for the differential rate, and
+        dependency_plans, a dictionary {dimensions: plan} for the results
+        blocks depend on (see Block.depends_on).
+
+        Blocks with a contracted_dependency are contracted with that
+        dependency by the block itself. Their contracted results are
+        numbered after the blocks, see contracted_results.
+
+        :param dimsizes: {dimension: typical size} to estimate the cost
+            of contractions with. Defaults to max_dim_sizes, and 1 for
+            final dimensions.
+        :param optimize: If False, contract blocks in the order of
+            model_blocks, see plan_contraction.
+
+        If the differential rate was already traced, call
+        trace_differential_rate after changing the plans.
+        """
+        if dimsizes is None:
+            dimsizes = dict()
+        dimsizes = {
+            **{dim: self.max_dim_sizes.get(dim, self.default_max_dim_size)
+               for b in self.model_blocks for dim in b.dimensions},
+            **{dim: 1 for dim in self.final_dimensions},
+            **dimsizes}
+
+        # Find which block results make up each dependency and the final
+        # result, by contracting each block with earlier results it
+        # shares a dimension with, in the order of model_blocks.
+        # results maps dimensions -> indices of blocks in that result.
+        results = dict()
+        dependencies = dict()
+        input_dims = [b.dimensions for b in self.model_blocks]
+        self.contracted_results = dict()
+        for block_i, b in enumerate(self.model_blocks):
+            for dependency_dims, _ in b.depends_on:
+                if dependency_dims not in results:
+                    raise ValueError(
+                        f"Block {b} depends on {dependency_dims}, but that "
+                        f"has not yet been computed")
+                dependencies.setdefault(dependency_dims,
+                                        results[dependency_dims])
+
+            b_dims, members = b.dimensions, (block_i,)
+            if b.contracted_dependency:
+                # The block contracts itself with the dependency
+                del results[b.contracted_dependency]
+                b_dims = tuple([d for d in b_dims
+                                if d not in b.contracted_dependency])
+                members = (len(input_dims),)
+                self.contracted_results[block_i] = members[0]
+                input_dims.append(b_dims)
+            results[b_dims] = members
+            try:
+                while True:
+                    b2_dims, members2 = self._find_block(
+                        results, has_dim=b_dims, exclude=members)
+                    del results[b_dims]
+                    del results[b2_dims]
+                    b_dims = tuple(
+                        [d for d in b_dims if d not in b2_dims]
+                        + [d for d in b2_dims if d not in b_dims])
+                    members = tuple(sorted(members + members2))
+                    results[b_dims] = members
+            except BlockNotFoundError:
+                continue
+
+        for output_dims, members in results.items():
+            if all([d in self.final_dimensions for d in output_dims]):
+                break
+        else:
+            raise ValueError("Blocks do not combine to a result with only "
+                             "final dimensions!")
+
+        def plan(inputs, output_dims):
+            return plan_contraction(
+                inputs,
+                [input_dims[i] for i in inputs],
+                output_dims,
+                dimsizes,
+                banded=[i for i in inputs
+                        if i < len(self.model_blocks)
+                        and self.model_blocks[i].banded],
+                optimize=optimize)
+
+        self.contraction_plan = plan(members, output_dims)
+        self.dependency_plans = {
+            dims: plan(members, dims)
+            for dims, members in dependencies.items()}
+
     def _differential_rate(self, data_tensor, ptensor):
-        results = {}
+        return self._contract_blocks(data_tensor, ptensor)
+
+    def _log_differential_rate(self, data_tensor, ptensor):
+        return self._contract_blocks(data_tensor, ptensor, log_space=True)
+
+    def _contract_blocks(self, data_tensor, ptensor, log_space=False):
+        """Return differential rate computed from the block results,
+        or its log if log_space. In log space, blocks return log
+        probabilities and are contracted with fd.log_einsum_exp, so small
+        probabilities do not underflow.
+
+        Block results are contracted as planned by plan_contractions.
+        """
+        band_kwargs = dict(
+            band_threshold=self.band_threshold,
+            max_band_fraction=(
+                0. if self.jit_compile else self.max_band_fraction))
+        results = dict()
+        dependencies = dict()
         already_stepped = ()  # Avoid double-multiplying to account for stepping
+        needed = set(self.contraction_plan.inputs).union(
+            *[plan.inputs for plan in self.dependency_plans.values()])
 
-        for b in self.model_blocks:
-            b_dims = b.dimensions
+        for block_i, b in enumerate(self.model_blocks):
             # These are the the dimensions we will do variable stepping over
             scaling_dims = b.dimensions + tuple([bonus_dimension[0] for
                                                 bonus_dimension in b.bonus_dimensions
@@ -367,15 +550,24 @@ class BlockModelSource(fd.Source):
             # Gather extra compute arguments.
             kwargs = dict()
             for dependency_dims, dependency_name in b.depends_on:
-                if dependency_dims not in results:
-                    raise ValueError(
-                        f"Block {b} depends on {dependency_dims}, but that has "
-                        f"not yet been computed")
-                kwargs[dependency_name] = results[dependency_dims]
+                if dependency_dims not in dependencies:
+                    dependencies[dependency_dims] = \
+                        self.dependency_plans[dependency_dims].contract(
+                            results, log_space=log_space, **band_kwargs)
+                kwargs[dependency_name] = (
+                    tf.exp(dependencies[dependency_dims]) if log_space
+                    else dependencies[dependency_dims])
                 kwargs.update(self._domain_dict(dependency_dims, data_tensor))
 
-            # Compute the block
-            r = b.compute(data_tensor, ptensor, **kwargs)
+            # Compute the block, and/or its contraction with a dependency
+            block_results = dict()
+            if block_i in needed:
+                block_results[block_i] = b.compute(
+                    data_tensor, ptensor, log_space=log_space, **kwargs)
+            if self.contracted_results.get(block_i) in needed:
+                block_results[self.contracted_results[block_i]] = \
+                    b.compute_contracted(
+                        data_tensor, ptensor, log_space=log_space, **kwargs)
 
             # Scale the block by stepped dimensions, if not already done in
             # another block
@@ -384,90 +576,47 @@ class BlockModelSource(fd.Source):
                         (dim not in self.no_step_dimensions) and \
                         (dim not in already_stepped):
                     steps = self._fetch(dim+'_steps', data_tensor=data_tensor)
-                    step_mul = tf.repeat(steps[:, o], tf.shape(r)[1], axis=1)
-                    step_mul = tf.repeat(step_mul[:, :, o],
-                                         tf.shape(r)[2], axis=2)
-                    r *= step_mul
+                    for i, r in block_results.items():
+                        r_steps = tf.reshape(
+                            steps, [-1] + [1] * (len(r.shape) - 1))
+                        if log_space:
+                            block_results[i] = r + tf.math.log(r_steps)
+                        else:
+                            block_results[i] = r * r_steps
                     already_stepped += (dim,)
 
-            results[b_dims] = r
-
-            # Try to matrix multiply with earlier blocks, until we cannot
-            # do so anymore.
-            try:
-                while True:
-                    b2_dims, r2 = self._find_block(
-                        results, has_dim=b_dims, exclude=r)
-
-                    new_dims, r = self.multiply_block_results(
-                        b_dims, b2_dims, r, r2)
-                    results[new_dims] = r
-                    del results[b_dims]
-                    del results[b2_dims]
-
-            except BlockNotFoundError:
-                continue
+            results.update(block_results)
 
         # The result should have a tensor with only final dimensions
-        result = None
-        for dims, result in results.items():
-            if all([d in self.final_dimensions for d in dims]):
-                break
-        if result is None:
-            raise ValueError("Result was not computed!")
+        result = self.contraction_plan.contract(
+            results, log_space=log_space, **band_kwargs)
         return tf.reshape(tf.squeeze(result), (self.batch_size,))
 
-    def multiply_block_results(self, b_dims, b2_dims, r, r2):
+    def multiply_block_results(self, b_dims, b2_dims, r, r2, log_space=False):
         """Return result of matrix-multiplying two block results
         :param b_dims: tuple, dimension specification of r
         :param b2_dims: tuple, dimension specification of r2
         :param r: tensor , first block result to be multiplier
         :param r2: tensor, second block result to be multiplied
+        :param log_space: if True, r and r2 are logs of block results,
+            and the log of their product is returned
         :return: (dimension specification, tensor) of results
+
+        Kept for sources that call it; _contract_blocks contracts block
+        results with a ContractionPlan, see plan_contractions.
         """
         shared_dim = set(b_dims).intersection(set(b2_dims))
         if len(shared_dim) != 1:
             raise ValueError(f"Expected one shared dimension, "
                              f"found {len(shared_dim)}!")
         shared_dim = list(shared_dim)[0]
-
-        # Figure out dimensions of result
         new_dims = tuple([d for d in b_dims if d != shared_dim]
                          + [d for d in b2_dims if d != shared_dim])
 
-        # TODO: can we generalize to rank > 2?
-        assert len(b_dims) in [1, 2]
-        assert len(b2_dims) in [1, 2]
-
-        # Due to the batch dimension, tf.matmul requires that the
-        # ranks of arguments to tf.matmul match exactly.
-        dummy_axis = None
-        if len(b_dims) == 1 and len(b2_dims) == 2:
-            dummy_axis = 1
-            r = r[:, o, :]
-        elif len(b_dims) == 2 and len(b2_dims) == 1:
-            dummy_axis = 2
-            r2 = r2[:, :, o]
-        elif len(b_dims) == 2 and len(b2_dims) == 2:
-            # Ensure the shared dimension is in the right position
-            # for matrix multiplication
-            if b_dims.index(shared_dim) != 1:
-                assert len(b_dims) == 2
-                r = tf.transpose(r, [0, 2, 1])
-            if b2_dims.index(shared_dim) != 0:
-                assert len(b2_dims) == 2
-                r2 = tf.transpose(r2, [0, 2, 1])
-        else:
-            raise ValueError(
-                "Unsupported ranks {len(b_dims)}, {len(b2_dims)}")
-
-        # Multiply the matching index to get a new block
-        r = r @ r2
-        if dummy_axis:
-            r = tf.squeeze(r, dummy_axis)
-        assert len(r.shape) == len(new_dims) + 1
-
-        return (new_dims, r)
+        plan = plan_contraction(
+            (0, 1), (b_dims, b2_dims), new_dims,
+            dimsizes={d: 1 for d in b_dims + b2_dims})
+        return new_dims, plan.contract([r, r2], log_space=log_space)
 
     def random_truth(self, n_events, fix_truth=None, **params):
         # First block provides the 'deep' truth (energies, positions, time)
@@ -502,6 +651,7 @@ class BlockModelSource(fd.Source):
         """
         if self.mc_reservoir.empty:
             return
+        reservoir = self.mc_reservoir.values
 
         for set in self.prior_dimensions:
             prior_dims = set[0]
@@ -512,6 +662,8 @@ class BlockModelSource(fd.Source):
                 prior_data_columns.append(self.mc_reservoir.columns.get_loc(dim))
             for dim in filter_dims:
                 filter_data_columns.append(self.mc_reservoir.columns.get_loc(dim))
+            # Index once, rather than filtering the full reservoir per batch
+            index = fd.bounds.IndexedReservoir(reservoir, filter_data_columns[0])
 
             for batch in range(self.n_batches):
                 df_batch = data[batch * self.batch_size:(batch + 1) * self.batch_size]
@@ -522,17 +674,36 @@ class BlockModelSource(fd.Source):
                 for dim in filter_dims:
                     filter_dims_max.append(max(df_batch[dim + '_max']))
 
-                fd.bounds.get_priors(self, self.mc_reservoir.values, prior_dims,
+                fd.bounds.get_priors(self, index, prior_dims,
                                      prior_data_columns, filter_data_columns,
                                      filter_dims_min, filter_dims_max)
 
-    def _annotate(self, _skip_bounds_computation=False):
+    def _event_annotation_blocks(self):
+        """Return blocks whose bounds do not depend on how events are
+        batched, in annotation order (see Block.batch_annotation)"""
+        result = []
+        for b in self.model_blocks[::-1]:
+            if b.batch_annotation:
+                break
+            result.append(b)
+        return result
+
+    def _annotate_events(self):
+        d = self.data
+        for b in self._event_annotation_blocks():
+            b.annotate(d)
+        return True
+
+    def _annotate(self, _skip_bounds_computation=False,
+                  _events_annotated=False):
         d = self.data
+        done = self._event_annotation_blocks() if _events_annotated else []
         # By going in reverse order through the blocks, we can use the bounds
         # on hidden variables closer to the final signals (easy to compute)
         # for estimating the bounds on deeper hidden variables.
         for b in self.model_blocks[::-1]:
-            b.annotate(d)
+            if b not in done:
+                b.annotate(d)
 
         # Next, we obtain any desired hidden variable priors, in case we want
         # to improve the bounds estimation for any hidden variables.
@@ -581,3 +752,304 @@ class BlockModelSource(fd.Source):
 
 class BlockNotFoundError(Exception):
     pass
+
+
+@export
+class ContractionPlan:
+    """Order in which to contract block results into one tensor,
+    see plan_contraction.
+
+    Operands are numbered as in a list that starts with the results of
+    the blocks in inputs, and grows with the result of each step.
+    Print the plan for an overview of the steps and their cost.
+    """
+
+    #: Indices (in model_blocks) of the blocks whose results are contracted.
+    #: Higher indices denote contracted results,
+    #: see BlockModelSource.contracted_results.
+    inputs: ty.Tuple[int]
+
+    #: Dimensions of the result
+    output_dims: ty.Tuple[str]
+
+    #: Dimensions of each operand
+    operand_dims: ty.List[ty.Tuple[str]]
+
+    #: Steps as (i, j, einsum equation) contracting operands i and j.
+    #: j is None for a step that only transposes operand i.
+    steps: ty.List[ty.Tuple[int, ty.Optional[int], str]]
+
+    #: Estimated multiply-adds per event of each step
+    step_flops: ty.List[float]
+
+    #: Indices (in model_blocks) of inputs with banded results,
+    #: see Block.banded
+    banded: ty.Tuple[int]
+
+    #: For each step, (k, dimension) if the step contracts banded input
+    #: operand k over dimension, and can use only its band. Else None.
+    step_bands: ty.List[ty.Optional[ty.Tuple[int, str]]]
+
+    def __init__(self, inputs, input_dims, output_dims, dimsizes,
+                 banded=tuple()):
+        self.inputs = tuple(inputs)
+        self.output_dims = tuple(output_dims)
+        self.operand_dims = [tuple(dims) for dims in input_dims]
+        self.dimsizes = dimsizes
+        self.banded = tuple(banded)
+        self.steps = []
+        self.step_flops = []
+        self.step_bands = []
+        # Operands not yet contracted
+        self.remaining = list(range(len(self.operand_dims)))
+
+        all_dims = set(sum(self.operand_dims, tuple()))
+        if not set(self.output_dims) <= all_dims:
+            raise ValueError(f"Output dimensions {self.output_dims} not in "
+                             f"block dimensions {all_dims}")
+        # Einsum labels. z is the batch dimension.
+        self.labels = dict(zip(
+            sorted(all_dims), string.ascii_letters.replace('z', '')))
+
+    @property
+    def flops(self):
+        """Estimated multiply-adds per event of the whole contraction"""
+        return sum(self.step_flops)
+
+    def _labels(self, dims):
+        return 'z' + ''.join([self.labels[d] for d in dims])
+
+    def add_step(self, i, j):
+        """Contract operands i and j, and return the index of the result.
+        Dimensions no other remaining operand or the output has are
+        summed over.
+        """
+        self.remaining.remove(i)
+        self.remaining.remove(j)
+        if self.remaining:
+            keep = set(self.output_dims).union(
+                *[self.operand_dims[k] for k in self.remaining])
+            dims = tuple(
+                [d for d in self.operand_dims[i] if d in keep]
+                + [d for d in self.operand_dims[j]
+                   if d in keep and d not in self.operand_dims[i]])
+        else:
+            dims = self.output_dims
+
+        self.steps.append((
+            i, j,
+            (self._labels(self.operand_dims[i])
+             + ',' + self._labels(self.operand_dims[j])
+             + '->' + self._labels(dims))))
+        self.step_flops.append(float(np.prod([
+            self.dimsizes[d]
+            for d in set(self.operand_dims[i] + self.operand_dims[j])])))
+
+        # A banded input can be contracted using only its band, if it is
+        # summed over one dimension, and all other dimensions are kept.
+        band = None
+        for k, other in ((i, j), (j, i)):
+            k_dims, other_dims = self.operand_dims[k], self.operand_dims[other]
+            if not (k < len(self.inputs) and self.inputs[k] in self.banded
+                    and len(k_dims) == 2):
+                continue
+            shared = [d for d in k_dims if d in other_dims]
+            if (len(shared) == 1 and set(dims)
+                    == set(k_dims + other_dims) - set(shared)):
+                band = (k, shared[0])
+                break
+        self.step_bands.append(band)
+
+        self.operand_dims.append(dims)
+        self.remaining.append(len(self.operand_dims) - 1)
+        return self.remaining[-1]
+
+    def finish(self):
+        """Transpose the result to output_dims, if needed"""
+        assert len(self.remaining) == 1
+        i = self.remaining[0]
+        if self.operand_dims[i] == self.output_dims:
+            return
+        if set(self.operand_dims[i]) != set(self.output_dims):
+            raise ValueError(
+                f"Cannot contract {self.operand_dims[i]} "
+                f"to {self.output_dims}")
+        self.steps.append((
+            i, None,
+            self._labels(self.operand_dims[i])
+            + '->' + self._labels(self.output_dims)))
+        self.step_flops.append(0.)
+        self.step_bands.append(None)
+        self.operand_dims.append(self.output_dims)
+        self.remaining = [len(self.operand_dims) - 1]
+
+    def contract(self, results, log_space=False,
+                 band_threshold=0., max_band_fraction=0.):
+        """Return the contraction of block results, or of their logs
+        if log_space.
+
+        :param results: dictionary of block results, with keys as in
+            inputs
+        :param band_threshold: see BlockModelSource.band_threshold
+        :param max_band_fraction: see BlockModelSource.max_band_fraction.
+            If 0 (default), contract all results as dense tensors.
+        """
+        operands = [results[i] for i in self.inputs]
+        for step_i, (i, j, equation) in enumerate(self.steps):
+            if j is None:
+                operands.append(tf.einsum(equation, operands[i]))
+            elif self.step_bands[step_i] and max_band_fraction > 0:
+                operands.append(self._contract_banded(
+                    operands, step_i,
+                    log_space=log_space,
+                    band_threshold=band_threshold,
+                    max_band_fraction=max_band_fraction))
+            else:
+                operands.append(self._contract_dense(
+                    operands[i], operands[j], equation, log_space=log_space))
+        return operands[-1]
+
+    @staticmethod
+    def _contract_dense(a, b, equation, log_space=False):
+        if log_space:
+            return fd.log_einsum_exp(equation, a, b)
+        return tf.einsum(equation, a, b)
+
+    def _contract_banded(self, operands, step_i, log_space=False,
+                         band_threshold=0., max_band_fraction=0.):
+        """Return the result of step step_i, which contracts a banded
+        input (see step_bands). Use only the band if its width is at most
+        max_band_fraction of the summed dimension's size.
+        """
+        i, j, equation = self.steps[step_i]
+        k, shared = self.step_bands[step_i]
+        other = j if k == i else i
+        a, a_dims = operands[k], self.operand_dims[k]
+        b, b_dims = operands[other], self.operand_dims[other]
+        kept = tuple([d for d in a_dims if d != shared])
+        rest = tuple([d for d in b_dims if d != shared])
+        result_dims = self.operand_dims[len(self.inputs) + step_i]
+
+        # Matrix multiply a (kept, shared) with b (shared, rest...)
+        if a_dims[0] == shared:
+            a = tf.transpose(a, [0, 2, 1])
+        band, offset = fd.to_band(
+            a, threshold=band_threshold, log_space=log_space)
+
+        def banded():
+            r2 = tf.einsum(
+                self._labels(b_dims) + '->' + self._labels((shared,) + rest),
+                b)
+            r2_shape = tf.shape(r2)
+            r = fd.band_matmul(
+                band, offset,
+                tf.reshape(r2, [r2_shape[0], r2_shape[1], -1]),
+                log_space=log_space)
+            r = tf.reshape(r, tf.concat([tf.shape(r)[:2], r2_shape[2:]], 0))
+            return tf.einsum(
+                self._labels(kept + rest) + '->' + self._labels(result_dims),
+                r)
+
+        def dense():
+            return self._contract_dense(
+                operands[i], operands[j], equation, log_space=log_space)
+
+        width = tf.cast(tf.shape(band)[2], tf.float32)
+        size = tf.cast(tf.shape(a)[2], tf.float32)
+        return tf.cond(width <= max_band_fraction * size, banded, dense)
+
+    def __str__(self):
+        lines = []
+        for (i, j, _), flops, band in zip(
+                self.steps, self.step_flops, self.step_bands):
+            if j is None:
+                continue
+            step_i = len(lines) + len(self.inputs)
+            lines.append(
+                f"{step_i}: {i} {self.operand_dims[i]} x "
+                f"{j} {self.operand_dims[j]} "
+                f"-> {self.operand_dims[step_i]}, {flops:.3g} flops"
+                + (f", banded {band[0]}" if band else ""))
+        lines.append(f"Total: {self.flops:.3g} multiply-adds per event")
+        return '\n'.join(lines)
+
+
+@export
+def plan_contraction(inputs, input_dims, output_dims, dimsizes,
+                     banded=tuple(), optimize=True):
+    """Return ContractionPlan for contracting the results of the blocks
+    in inputs, with dimensions input_dims, to a result with output_dims.
+
+    :param dimsizes: {dimension: typical size} to estimate the cost of
+        contractions with
+    :param banded: inputs whose results are banded, see Block.banded
+    :param optimize: If True (default), find the order with the fewest
+        estimated multiply-adds by dynamic programming over subsets of
+        the inputs, as opt_einsum's 'dp' strategy does. Otherwise,
+        contract each input with the first earlier result it shares a
+        dimension with.
+    """
+    plan = ContractionPlan(inputs, input_dims, output_dims, dimsizes,
+                           banded=banded)
+    n = len(input_dims)
+    if not optimize:
+        for input_i in range(n):
+            i = input_i
+            while True:
+                # Earlier inputs, or results of earlier steps
+                partner = [k for k in plan.remaining
+                           if k != i and (k < input_i or k >= n)
+                           and set(plan.operand_dims[k])
+                           & set(plan.operand_dims[i])]
+                if not partner:
+                    break
+                i = plan.add_step(i, partner[0])
+        # Combine results without shared dimensions
+        while len(plan.remaining) > 1:
+            plan.add_step(*plan.remaining[:2])
+        plan.finish()
+        return plan
+
+    # dims[mask]: set of dimensions of the inputs in bitmask
+    full = (1 << n) - 1
+    dims = [set()] * (full + 1)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        dims[mask] = dims[mask ^ low] | set(input_dims[low.bit_length() - 1])
+
+    def size(ds):
+        return float(np.prod([dimsizes[d] for d in ds]))
+
+    # Dimensions left after contracting the inputs in mask
+    open_dims = [dims[mask] & (set(output_dims) | dims[full ^ mask])
+                 for mask in range(full + 1)]
+
+    # cost[mask], split[mask]: lowest cost of contracting the inputs in
+    # mask to one tensor, and the submask of one of the two last operands
+    cost = [0.] * (full + 1)
+    split = [0] * (full + 1)
+    for mask in sorted(range(1, full + 1), key=lambda m: bin(m).count('1')):
+        if not mask & (mask - 1):
+            continue
+        low = mask & -mask
+        cost[mask] = float('inf')
+        # Enumerate submasks containing the lowest input, so each split
+        # is considered once
+        sub = (mask - 1) & mask
+        while sub:
+            if sub & low:
+                c = (cost[sub] + cost[mask ^ sub]
+                     + size(open_dims[sub] | open_dims[mask ^ sub]))
+                if c < cost[mask]:
+                    cost[mask], split[mask] = c, sub
+            sub = (sub - 1) & mask
+
+    def build(mask):
+        if not mask & (mask - 1):
+            return mask.bit_length() - 1
+        i, j = build(split[mask]), build(mask ^ split[mask])
+        return plan.add_step(i, j)
+
+    build(full)
+    plan.finish()
+    return plan
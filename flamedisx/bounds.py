@@ -1,5 +1,5 @@
 import numpy as np
-from scipy import stats
+from scipy import special, stats
 
 import flamedisx as fd
 export, __all__ = fd.exporter()
@@ -28,22 +28,13 @@ def bayes_bounds(df, in_dim, bounds_prob, bound, bound_type, supports, **kwargs)
         cdfs = bayes_bounds_normal(supports, **kwargs)
 
     if bound == 'lower':
-        lower_lims = [support[np.where(cdf < bounds_prob)[0][-1]]
-                      if len(np.where(cdf < bounds_prob)[0]) > 0
-                      else support[0]
-                      for support, cdf in zip(supports, cdfs)]
-        df[in_dim + '_min'] = lower_lims
+        df[in_dim + '_min'] = lower_limits(supports, cdfs, bounds_prob)
 
     elif bound == 'upper':
-        upper_lims = [support[np.where(cdf > 1. - bounds_prob)[0][0]]
-                      if len(np.where(cdf > 1. - bounds_prob)[0]) > 0
-                      else support[-1]
-                      for support, cdf in zip(supports, cdfs)]
-        df[in_dim + '_max'] = upper_lims
+        df[in_dim + '_max'] = upper_limits(supports, cdfs, bounds_prob)
 
     elif bound == 'mle':
-        mles = [support[np.argmin(np.abs(cdf - 0.5))] for support, cdf in zip(supports, cdfs)]
-        df[in_dim + '_mle'] = mles
+        df[in_dim + '_mle'] = mle_limits(supports, cdfs)
 
 
 def bayes_bounds_priors(source, batch, df, in_dim, bounds_prob, bound, bound_type, supports, **kwargs):
@@ -74,29 +65,113 @@ def bayes_bounds_priors(source, batch, df, in_dim, bounds_prob, bound, bound_typ
     cdfs_prior = bayes_bounds_binomial(supports, prior_pdf=prior_pdfs[in_dim], **kwargs)
     cdfs_no_prior = bayes_bounds_binomial(supports, **kwargs)
 
+    # Note max / min compare the lists of bounds for all events
+    # lexicographically, choosing one of the two lists as a whole
     if bound == 'lower':
-        lower_lims_prior = [support[np.where(cdf < bounds_prob)[0][-1]]
-                            if len(np.where(cdf < bounds_prob)[0]) > 0
-                            else support[0]
-                            for support, cdf in zip(supports, cdfs_prior)]
-        lower_lims_no_prior = [support[np.where(cdf < bounds_prob)[0][-1]]
-                               if len(np.where(cdf < bounds_prob)[0]) > 0
-                               else support[0]
-                               for support, cdf in zip(supports, cdfs_no_prior)]
         df.loc[batch * source.batch_size:(batch + 1) * source.batch_size - 1, in_dim + '_min'] = \
-            max(lower_lims_prior, lower_lims_no_prior)
+            max(lower_limits(supports, cdfs_prior, bounds_prob).tolist(),
+                lower_limits(supports, cdfs_no_prior, bounds_prob).tolist())
 
     elif bound == 'upper':
-        upper_lims_prior = [support[np.where(cdf > 1. - bounds_prob)[0][0]]
-                            if len(np.where(cdf > 1. - bounds_prob)[0]) > 0
-                            else support[-1]
-                            for support, cdf in zip(supports, cdfs_prior)]
-        upper_lims_no_prior = [support[np.where(cdf > 1. - bounds_prob)[0][0]]
-                               if len(np.where(cdf > 1. - bounds_prob)[0]) > 0
-                               else support[-1]
-                               for support, cdf in zip(supports, cdfs_no_prior)]
         df.loc[batch * source.batch_size:(batch + 1) * source.batch_size - 1, in_dim + '_max'] = \
-            min(upper_lims_prior, upper_lims_no_prior)
+            min(upper_limits(supports, cdfs_prior, bounds_prob).tolist(),
+                upper_limits(supports, cdfs_no_prior, bounds_prob).tolist())
+
+
+def lower_limits(supports, cdfs, bounds_prob):
+    """Return, for each event, the last value of supports where the cdf
+    is below bounds_prob, or the first value of supports if there is none.
+
+    :param supports: (n_events, n_support) array of hidden variable values
+    :param cdfs: (n_events, n_support) array of posterior CDFs along supports
+    """
+    supports, cdfs = np.asarray(supports), np.asarray(cdfs)
+    below = cdfs < bounds_prob
+    last = below.shape[1] - 1 - np.argmax(below[:, ::-1], axis=1)
+    return np.where(below.any(axis=1),
+                    np.take_along_axis(supports, last[:, None], axis=1)[:, 0],
+                    supports[:, 0])
+
+
+def upper_limits(supports, cdfs, bounds_prob):
+    """Return, for each event, the first value of supports where the cdf
+    is above 1 - bounds_prob, or the last value of supports if there is none.
+
+    :param supports: (n_events, n_support) array of hidden variable values
+    :param cdfs: (n_events, n_support) array of posterior CDFs along supports
+    """
+    supports, cdfs = np.asarray(supports), np.asarray(cdfs)
+    above = cdfs > 1. - bounds_prob
+    first = np.argmax(above, axis=1)
+    return np.where(above.any(axis=1),
+                    np.take_along_axis(supports, first[:, None], axis=1)[:, 0],
+                    supports[:, -1])
+
+
+def mle_limits(supports, cdfs):
+    """Return, for each event, the value of supports where the cdf is
+    closest to 0.5
+
+    :param supports: (n_events, n_support) array of hidden variable values
+    :param cdfs: (n_events, n_support) array of posterior CDFs along supports
+    """
+    supports, cdfs = np.asarray(supports), np.asarray(cdfs)
+    closest = np.argmin(np.abs(cdfs - 0.5), axis=1)
+    return np.take_along_axis(supports, closest[:, None], axis=1)[:, 0]
+
+
+class IndexedReservoir:
+    """MC reservoir indexed by one key column, for fast selection of the
+    rows within ranges of several columns.
+
+    Rows within the range of the key column are found by binary search,
+    and only those rows are checked against the ranges of other columns.
+    Columns used in queries are copied once, in key order.
+
+    :param reservoir: (n_rows, n_columns) array of MC events
+    :param key_col: column number to index. Queries are fastest if this
+    is the most selective column.
+    """
+
+    def __init__(self, reservoir, key_col):
+        self.reservoir = reservoir
+        self.key_col = key_col
+        keys = reservoir[:, key_col]
+        # NaN keys never satisfy a range, leave them out of the index
+        self.order = np.flatnonzero(keys == keys)
+        self.order = self.order[np.argsort(keys[self.order], kind='stable')]
+        self.keys = keys[self.order]
+        # Columns in key order, filled as they are queried
+        self._sorted_columns = {key_col: self.keys}
+
+    def _sorted_column(self, col):
+        if col not in self._sorted_columns:
+            self._sorted_columns[col] = self.reservoir[self.order, col]
+        return self._sorted_columns[col]
+
+    def select(self, mins=None, maxs=None):
+        """Return indices of rows with reservoir[i, col] >= x for all
+        col, x in mins.items(), and reservoir[i, col] <= x for all col, x in
+        maxs.items(). Indices are ordered by the key column.
+        Rows with a NaN key are never selected.
+        """
+        mins = dict() if mins is None else mins
+        maxs = dict() if maxs is None else maxs
+        start, stop = 0, len(self.keys)
+        if self.key_col in mins:
+            start = np.searchsorted(self.keys, mins[self.key_col], side='left')
+        if self.key_col in maxs:
+            stop = np.searchsorted(self.keys, maxs[self.key_col], side='right')
+        stop = max(start, stop)
+
+        mask = np.ones(stop - start, dtype=bool)
+        for col, x in mins.items():
+            if col != self.key_col:
+                mask &= self._sorted_column(col)[start:stop] >= x
+        for col, x in maxs.items():
+            if col != self.key_col:
+                mask &= self._sorted_column(col)[start:stop] <= x
+        return self.order[start:stop][mask]
 
 
 def get_priors(source, reservoir, prior_dims,
@@ -106,7 +181,8 @@ def get_priors(source, reservoir, prior_dims,
     accurate Bayes bounds. Separate priors calculated for estimating upper and
     lower bounds.
 
-    :param reservoir: MC reservoir filtered for prior estimation
+    :param reservoir: MC reservoir filtered for prior estimation, either an
+    array or an IndexedReservoir (faster when calling this for many batches)
     :param prior_dims: tuple of dimensions we are obtaining priors for
     :param prior_data_cols: column numbers in reservoir corresponding to prior_dims
     :param filter_data_cols: column numbers in reservoir corresponding to dimensions
@@ -116,35 +192,22 @@ def get_priors(source, reservoir, prior_dims,
     :param filter_dims_max: upper bounds of the dimensions we are filtering by, for
     obtaining upper bound priors
     """
-    prior_dict = {}
-
-    for prior_dim, prior_data_col in zip(prior_dims, prior_data_cols):
-        prior_data_filter = [True] * len(reservoir[:, 0])
-
-        for filter_data_col, filter_dim_min in zip(filter_data_cols, filter_dims_min):
-            prior_data_filter = prior_data_filter * (reservoir[:, filter_data_col] >= filter_dim_min)
-
-        prior_data = reservoir[:, prior_data_col][prior_data_filter]
-        prior_hist = np.histogram(prior_data)
-        prior_pdf = stats.rv_histogram(prior_hist)
-        prior_dict[prior_dim] = prior_pdf
-
-    source.prior_PDFs_LB += (prior_dict,)
+    if not isinstance(reservoir, IndexedReservoir):
+        reservoir = IndexedReservoir(reservoir, filter_data_cols[0])
 
-    prior_dict = {}
+    for filter_kwargs, prior_PDFs in (
+            (dict(mins=dict(zip(filter_data_cols, filter_dims_min))), 'prior_PDFs_LB'),
+            (dict(maxs=dict(zip(filter_data_cols, filter_dims_max))), 'prior_PDFs_UB')):
+        rows = reservoir.select(**filter_kwargs)
 
-    for prior_dim, prior_data_col in zip(prior_dims, prior_data_cols):
-        prior_data_filter = [True] * len(reservoir[:, 0])
+        prior_dict = {}
+        for prior_dim, prior_data_col in zip(prior_dims, prior_data_cols):
+            prior_data = reservoir.reservoir[rows, prior_data_col]
+            prior_hist = np.histogram(prior_data)
+            prior_pdf = stats.rv_histogram(prior_hist)
+            prior_dict[prior_dim] = prior_pdf
 
-        for filter_data_col, filter_dim_max in zip(filter_data_cols, filter_dims_max):
-            prior_data_filter = prior_data_filter * (reservoir[:, filter_data_col] <= filter_dim_max)
-
-        prior_data = reservoir[:, prior_data_col][prior_data_filter]
-        prior_hist = np.histogram(prior_data)
-        prior_pdf = stats.rv_histogram(prior_hist)
-        prior_dict[prior_dim] = prior_pdf
-
-    source.prior_PDFs_UB += (prior_dict,)
+        setattr(source, prior_PDFs, getattr(source, prior_PDFs) + (prior_dict,))
 
 
 def bayes_bounds_binomial(supports, rvs_binom, ns_binom, ps_binom, prior_pdf=None):
@@ -163,20 +226,15 @@ def bayes_bounds_binomial(supports, rvs_binom, ns_binom, ps_binom, prior_pdf=Non
     assert (np.shape(rvs_binom) == np.shape(ns_binom) == np.shape(ps_binom) == np.shape(supports)), \
         "Shapes of suports, rvs_binom, ns_binom and ps_binom must be equal"
 
-    def prior(x):
-        if prior_pdf is None:
-            return 1
-        elif np.sum(prior_pdf.pdf(x)) == 0:
-            return 1
-        else:
-            return prior_pdf.pdf(x)
+    supports = np.asarray(supports)
+    pdfs = binom_pmf(rvs_binom, ns_binom, ps_binom)
+    if prior_pdf is not None:
+        priors = prior_pdf.pdf(supports)
+        # Use a flat prior for events where the prior vanishes on the support
+        priors[np.sum(priors, axis=1) == 0] = 1
+        pdfs = pdfs * priors
 
-    pdfs = [stats.binom.pmf(rv_binom, n_binom, p_binom) * prior(support)
-            for rv_binom, n_binom, p_binom, support in zip(rvs_binom, ns_binom, ps_binom, supports)]
-    pdfs = [pdf / np.sum(pdf) for pdf in pdfs]
-    cdfs = [np.cumsum(pdf) for pdf in pdfs]
-
-    return cdfs
+    return _normalized_cdfs(pdfs)
 
 
 def bayes_bounds_normal(supports, rvs_normal, mus_normal, sigmas_normal):
@@ -197,9 +255,38 @@ def bayes_bounds_normal(supports, rvs_normal, mus_normal, sigmas_normal):
     assert (len(np.nonzero([np.sum(sigma_normal) for sigma_normal in sigmas_normal])[0]) > 0), \
         "Logic will not work for a normal distribution with 0 standard deviation; you should probably deprecate a block"
 
-    pdfs = [stats.norm.pdf(rv_normal, mu_normal, sigma_normal)
-            for rv_normal, mu_normal, sigma_normal in zip(rvs_normal, mus_normal, sigmas_normal)]
-    pdfs = [pdf / np.sum(pdf) for pdf in pdfs]
-    cdfs = [np.cumsum(pdf) for pdf in pdfs]
+    sigmas_normal = np.asarray(sigmas_normal)
+    z = (np.asarray(rvs_normal) - np.asarray(mus_normal)) / sigmas_normal
+    pdfs = np.exp(-0.5 * z**2) / (np.sqrt(2 * np.pi) * sigmas_normal)
+
+    return _normalized_cdfs(pdfs)
 
-    return cdfs
+
+def binom_pmf(k, n, p):
+    """Return binomial PMF of k successes in n trials with success
+    probability p, for arrays of integers k and n.
+
+    Faster than scipy.stats.binom.pmf for large arrays, since the binomial
+    coefficients are looked up in the table of fd.log_factorial.
+    """
+    k, n, p = np.asarray(k), np.asarray(n), np.asarray(p)
+    if not (np.all(np.mod(k, 1) == 0) and np.all(np.mod(n, 1) == 0)):
+        return stats.binom.pmf(k, n, p)
+
+    # Like scipy, return nan for invalid parameters, 0 outside the support
+    params_ok = (n >= 0) & (p >= 0) & (p <= 1)
+    in_support = (k >= 0) & (k <= n)
+    k = np.where(in_support, k, 0).astype(int)
+    n = np.where(in_support, n, 0).astype(int)
+    log_factorials = fd.extend_log_factorials(n.max(initial=0))
+
+    log_pmf = (log_factorials[n] - log_factorials[k] - log_factorials[n - k]
+               + special.xlogy(k, p) + special.xlog1py(n - k, -p))
+    result = np.where(in_support, np.exp(log_pmf), 0.)
+    return np.where(params_ok, result, np.nan)
+
+
+def _normalized_cdfs(pdfs):
+    """Return (n_events, n_support) array of CDFs from unnormalized PDFs"""
+    pdfs = pdfs / np.sum(pdfs, axis=1, keepdims=True)
+    return np.cumsum(pdfs, axis=1)
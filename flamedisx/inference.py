@@ -10,20 +10,23 @@ import tensorflow as tf
 import tensorflow_probability as tfp
 
 from scipy.optimize import NonlinearConstraint
+from scipy.sparse.linalg import LinearOperator
 
 
 __all__ = ['LOWER_RATE_MULTIPLIER_BOUND',
            'SUPPORTED_OPTIMIZERS',
-           'SUPPORTED_INTERVAL_OPTIMIZERS',
-           'FLOAT32_EPS']
+           'SUPPORTED_INTERVAL_OPTIMIZERS']
 
 # Setting this to 0 does work, but makes the inference rather slow
 # (at least for scipy); probably there is a relative xtol computation,
 # which fails when x -> 0.
 LOWER_RATE_MULTIPLIER_BOUND = 1e-9
 
-# Floating point precision of 32-bit computations
-FLOAT32_EPS = np.finfo(np.float32).eps
+
+def float_eps():
+    """Return floating point precision of the likelihood computation,
+    see fd.set_float_type"""
+    return np.finfo(fd.float_type().as_numpy_dtype).eps
 
 
 class OptimizerWarning(UserWarning):
@@ -54,13 +57,20 @@ class Objective:
     :param bounds: {param: (left, right)} bounds, if any (otherwise None)
     :param nan_val: Value to pass to optimizer if likelihood evaluates to NaN
     :param get_lowlevel_result: Return low-level result from optimizer directly
-    :param use_hessian: If supported, use Hessian to improve error estimate
-    :param return_errors: If supported, return error estimates on parameters
+    :param use_hessian: If supported, use Hessian in the optimizer and for
+    error estimates. The Hessian is only computed when the optimizer asks
+    for it (see hess), never in regular objective calls.
+    :param return_errors: If True, return error estimates on parameters
+    from the exact Hessian at the best fit (see errors). Some optimizers
+    support other methods, see error_methods.
     """
     memoize = True                  # Cache values during minimization.
     require_complete_guess = True   # Require a guess for all fitted parameters
     arg_names: ty.List = None
 
+    #: Values of return_errors besides True and False that are supported
+    error_methods: ty.Tuple[str] = tuple()
+
     _cache: dict
 
     def __init__(self, *,
@@ -90,6 +100,11 @@ class Objective:
         self.get_lowlevel_result = get_lowlevel_result
         self.return_history = get_history
         self.use_hessian = use_hessian
+        if return_errors not in (False, True) + self.error_methods:
+            raise ValueError(
+                f"{self.__class__.__name__} does not support "
+                f"return_errors={return_errors!r}, use True, False"
+                + "".join(f" or {m!r}" for m in self.error_methods))
         self.return_errors = return_errors
         self.optimizer_kwargs = optimizer_kwargs
         self.allow_failure = allow_failure
@@ -238,19 +253,20 @@ class Objective:
     def restore_scale(self, x, input_kind='parameters'):
         return self.normalize(x, input_kind, _reverse=True)
 
-    def nan_result(self):
+    def nan_result(self, second_order=False):
         """Return ObjectiveResult with all values NaN"""
         n = len(self.arg_names)
         return ObjectiveResult(
             fun=self.nan_val,
             grad=np.ones(n) * float('nan'),
             hess=(np.ones((n, n)) * float('nan')
-                  if self.use_hessian else None))
+                  if second_order else None))
 
-    def __call__(self, x_norm):
+    def __call__(self, x_norm, second_order=False):
         """Evaluate the objective function defined in _inner_fun_and_grad.
-        Returns ObjectiveResult with objective value, gradient and optionally
-        the hessian at the requested position in parameter space.
+        Returns ObjectiveResult with objective value, gradient and,
+        if second_order, the hessian (computed by _inner_fun_grad_and_hess)
+        at the requested position in parameter space.
         This function is used by optimizers which work in normalized space,
         the input is a vector of normalized values for the parameters of the
         objective function.
@@ -259,7 +275,8 @@ class Objective:
         Repeated calls to this function with the same input are cached such
         that optimizers can use multiple calls to retrieve the function value
         and gradient at the same position while only evaluating
-        _inner_fun_and_grad once.
+        _inner_fun_and_grad once. A later second_order call at the same
+        position does compute the hessian.
         """
 
         # Convert the normalized input back to physical values
@@ -269,32 +286,24 @@ class Objective:
         if self.memoize:
             memkey = tuple(x)
             if memkey in self._cache:
-                return self._cache[memkey]
+                result = self._cache[memkey]
+                if not second_order or result.hess is not None:
+                    return result
 
-        # Check parameters are valid
         params = {**self._array_to_dict(x), **self.fix}
-        for k, v in params.items():
-            if np.isnan(v):
-                warnings.warn(f"Optimizer requested likelihood at {k} = NaN",
-                              OptimizerWarning)
-                return self.nan_result()
-            if k in self.bounds:
-                b = self.bounds[k]
-                if not ((b[0] is None or b[0] <= v)
-                        and (b[1] is None or v <= b[1])):
-                    warnings.warn(
-                        f"Optimizer requested likelihood at {k} = {v}, "
-                        f"which is outside the bounds {b}.",
-                        OptimizerWarning)
-                    return self.nan_result()
+        if not self._valid_params(params):
+            return self.nan_result(second_order)
 
-        result = self._inner_fun_and_grad(params)
+        if second_order:
+            result = self._inner_fun_grad_and_hess(params)
+        else:
+            result = self._inner_fun_and_grad(params)
 
         # Convert result gradient and hessian to normalized space
         # for the optimizer
         y = result[0]
         grad = self.normalize(result[1], 'gradient')
-        if self.use_hessian:
+        if second_order:
             hess = self.normalize(result[2], 'hessian')
         else:
             hess = None
@@ -307,15 +316,15 @@ class Objective:
         if np.isnan(y):
             warnings.warn(f"Objective at {x_desc} is Nan!",
                           OptimizerWarning)
-            result = self.nan_result()
+            result = self.nan_result(second_order)
         elif np.any(np.isnan(grad)):
             warnings.warn(f"Objective at {x_desc} has NaN gradient {grad}",
                           OptimizerWarning)
-            result = self.nan_result()
+            result = self.nan_result(second_order)
         elif hess is not None and np.any(np.isnan(hess)):
             warnings.warn(f"Objective at {x_desc} has NaN Hessian {hess}",
                           OptimizerWarning)
-            result = self.nan_result()
+            result = self.nan_result(second_order)
         else:
             result = ObjectiveResult(fun=y, grad=grad, hess=hess)
 
@@ -323,13 +332,45 @@ class Objective:
             self._cache[memkey] = result
         return result
 
+    def _valid_params(self, params):
+        """Return whether the likelihood can be evaluated at params,
+        warning if it cannot"""
+        for k, v in params.items():
+            if np.isnan(v):
+                warnings.warn(f"Optimizer requested likelihood at {k} = NaN",
+                              OptimizerWarning)
+                return False
+            if k in self.bounds:
+                b = self.bounds[k]
+                if not ((b[0] is None or b[0] <= v)
+                        and (b[1] is None or v <= b[1])):
+                    warnings.warn(
+                        f"Optimizer requested likelihood at {k} = {v}, "
+                        f"which is outside the bounds {b}.",
+                        OptimizerWarning)
+                    return False
+        return True
+
     def _inner_fun_and_grad(self, params):
         # Get -2lnL and its gradient
         return self.lf.minus2_ll(
             **params,
-            second_order=self.use_hessian,
+            omit_grads=tuple(self.fix.keys()))[:2]
+
+    def _inner_fun_grad_and_hess(self, params):
+        # Get -2lnL, its gradient and its Hessian
+        return self.lf.minus2_ll(
+            **params,
+            second_order=True,
             omit_grads=tuple(self.fix.keys()))
 
+    def _inner_fun_grad_and_hessp(self, params, vector):
+        # Get -2lnL, its gradient and its Hessian times vector
+        return tuple(-2 * r for r in self.lf.log_likelihood_hessp(
+            vector,
+            omit_grads=tuple(self.fix.keys()),
+            **params))
+
     def fun_and_grad(self, x):
         r = self(x)
         return r.fun, r.grad
@@ -343,8 +384,30 @@ class Objective:
         return self(x).grad
 
     def hess(self, x):
-        """Return only Hessian"""
-        return self(x).hess
+        """Return only Hessian. This is the only method that computes it,
+        so optimizers that do not call it never pay for the Hessian."""
+        return self(x, second_order=True).hess
+
+    def hessp(self, x_norm, p):
+        """Return product of the Hessian at x_norm with the vector p
+        (both in normalized space), without computing the Hessian itself.
+        This costs about two gradient evaluations, regardless of the
+        number of parameters.
+        """
+        x = self.restore_scale(x_norm)
+        params = {**self._array_to_dict(x), **self.fix}
+        if not self._valid_params(params):
+            return np.ones(len(self.arg_names)) * float('nan')
+
+        # The normalized Hessian is S H S, with S = diag(scale_vector)
+        scale = self.scale_vector
+        hessp = scale * self._inner_fun_grad_and_hessp(params, scale * p)[2]
+        if np.any(np.isnan(hessp)):
+            x_desc = dict(zip(self.arg_names, x))
+            warnings.warn(
+                f"Objective at {x_desc} has NaN Hessian-vector product "
+                f"{hessp}", OptimizerWarning)
+        return hessp
 
     def _lowlevel_shortcut(self, res):
         if self.get_lowlevel_result:
@@ -383,9 +446,28 @@ class Objective:
                     OptimizerWarning)
 
         result = {**result, **self.fix}
+        if self.return_errors:
+            result = {**result,
+                      **{'error_' + k: v
+                         for k, v in self.errors(result).items()}}
         # TODO: return ll_val, use it
         return result
 
+    def errors(self, bestfit):
+        """Return {param: error} estimates of the fitted parameters,
+        from the inverse of the exact Hessian at the bestfit.
+        This is the only Hessian computed for the fit if the optimizer
+        does not use it.
+
+        :param bestfit: {param: value} best fit, including fixed parameters
+        """
+        x_norm = self.normalize(self._dict_to_array(bestfit))
+        hess = self.restore_scale(self.hess(x_norm), 'hessian')
+        # hess is the Hessian of -2 log likelihood, the covariance matrix
+        # is the inverse of the Hessian of - log likelihood
+        stderr, _ = fd.cov_to_std(2 * np.linalg.inv(hess))
+        return dict(zip(self.arg_names, stderr))
+
     def _minimize(self):
         raise NotImplementedError
 
@@ -402,13 +484,6 @@ class Objective:
 class ScipyObjective(Objective):
 
     def _minimize(self):
-        if self.return_errors:
-            raise NotImplementedError(
-                "Scipy minimizer does not yet support return errors")
-
-        # TODO implement optimizer methods to use the Hessian,
-        # see https://github.com/FlamTeam/flamedisx/pull/60#discussion_r354832569
-
         kwargs: ty.Dict[str, ty.Any] = self._scipy_minizer_options()
 
         if self.use_hessian:
@@ -418,19 +493,25 @@ class ScipyObjective(Objective):
         else:
             kwargs.setdefault('method', 'TNC')
 
-        # The underlying tensorflow computation has float32 precision,
-        # so we have to adjust the precision options
+        # The underlying tensorflow computation has limited (by default
+        # float32) precision, so we have to adjust the precision options
+        eps = float_eps()
         if kwargs['method'].upper() == 'TNC':
-            kwargs['options'].setdefault('accuracy', FLOAT32_EPS**0.5)
+            kwargs['options'].setdefault('accuracy', eps**0.5)
 
         # Achtung! setdefault will not kick in if user specified 'xtol' in the
         # options.
-        kwargs['options'].setdefault('xtol', FLOAT32_EPS**0.5)
-        kwargs['options'].setdefault('gtol', 1e-2 * FLOAT32_EPS**0.25)
+        kwargs['options'].setdefault('xtol', eps**0.5)
+        kwargs['options'].setdefault('gtol', 1e-2 * eps**0.25)
 
         if self.use_hessian:
-            if (kwargs['method'].lower() in ('newton-cg', 'dogleg')
-                    or kwargs['method'].startswith('trust')):
+            method = kwargs['method'].lower()
+            if method in ('newton-cg', 'trust-ncg', 'trust-krylov',
+                          'trust-constr'):
+                # Hessian-vector products are enough, and much cheaper
+                # than the full Hessian if there are many parameters
+                kwargs['hessp'] = self.hessp
+            elif method in ('dogleg', 'trust-exact'):
                 kwargs['hess'] = self.hess
             else:
                 warnings.warn(
@@ -467,10 +548,6 @@ class TensorFlowObjective(Objective):
     memoize = False
 
     def _minimize(self):
-        if self.return_errors:
-            raise NotImplementedError(
-                "Tensorflow minimizer does not yet support return errors")
-
         if self.use_hessian:
             # This optimizer can use the hessian information
             # Compute the inverse hessian at the guess
@@ -508,15 +585,20 @@ class TensorFlowObjective(Objective):
 
 
 class MinuitObjective(Objective):
+    """Objective minimized with Minuit's MIGRAD.
+
+    Minuit does not use the Hessian while minimizing. The errors for
+    return_errors are:
+      * True: from the exact Hessian at the minimum if use_hessian,
+        else Minuit's estimates from MIGRAD;
+      * 'hesse': from Minuit's HESSE, regardless of use_hessian;
+      * 'minos': (lower, upper) errors from Minuit's MINOS, regardless of
+        use_hessian, where lower is negative. Requires iminuit >= 2.
+    """
     minuit2 = version.parse(iminuit.__version__) >= version.parse('2.0.0')
+    error_methods = ('hesse', 'minos')
 
     def _minimize(self):
-        if self.use_hessian:
-            warnings.warn(
-                "You set use_hessian = True, but Minuit cannot use the Hessian",
-                UserWarning)
-            self.use_hessian = False
-
         kwargs = self.optimizer_kwargs
 
         x_guess = self._dict_to_array(self.normalize(self.guess))
@@ -533,7 +615,7 @@ class MinuitObjective(Objective):
             precision = kwargs['precision']
             del kwargs['precision']
         else:
-            precision = FLOAT32_EPS
+            precision = float_eps()
 
         if self.minuit2:
             # Minuit2 changed the API; Minuit() no longer takes 'option-like'
@@ -584,8 +666,39 @@ class MinuitObjective(Objective):
         position = {k: result.values[i] if self.minuit2 else result.fitarg[k]
                     for i, k in enumerate(self.arg_names)}
         position = self.restore_scale(position)
+        self._fit = result
         return position, result.fval
 
+    def errors(self, bestfit):
+        if self.return_errors is True and self.use_hessian:
+            return super().errors(bestfit)
+        fit = self._fit
+        if self.return_errors == 'minos':
+            if not self.minuit2:
+                raise NotImplementedError(
+                    "return_errors='minos' requires iminuit >= 2")
+            # Find where our objective -2lnL rises by 1
+            errordef = fit.errordef
+            fit.errordef = 1.
+            try:
+                fit.minos()
+            finally:
+                fit.errordef = errordef
+            # Minuit errors are in normalized coordinates
+            return {
+                k: (fit.merrors[k].lower * scale,
+                    fit.merrors[k].upper * scale)
+                for k, scale in zip(self.arg_names, self.scale_vector)}
+        if self.return_errors == 'hesse':
+            fit.hesse()
+        # Minuit errors are in normalized coordinates, and are where the
+        # objective rises by errordef. Our objective -2lnL rises by 1.
+        errors = (np.array(fit.errors if self.minuit2
+                           else [fit.errors[k] for k in self.arg_names])
+                  * self.scale_vector
+                  / fit.errordef ** 0.5)
+        return dict(zip(self.arg_names, errors))
+
 
 SUPPORTED_OPTIMIZERS = dict(tfp=TensorFlowObjective,
                             minuit=MinuitObjective,
@@ -650,7 +763,6 @@ class IntervalObjective(Objective):
         self.bestfit_tp = self.bestfit[self.target_parameter]
         self.m2ll_best, _grad_at_bestfit = self.lf.minus2_ll(
             **bestfit,
-            second_order=self.use_hessian,
             omit_grads=tuple(self.fix.keys()))[:2]
         self.bestfit_tp_slope = _grad_at_bestfit[self.arg_names.index(self.target_parameter)]
 
@@ -709,18 +821,27 @@ class IntervalObjective(Objective):
         return 0.
 
     def _inner_fun_and_grad(self, params):
+        return self._interval_objective(
+            params, *super()._inner_fun_and_grad(params))
+
+    def _inner_fun_grad_and_hess(self, params):
+        return self._interval_objective(
+            params, *super()._inner_fun_grad_and_hess(params))
+
+    def _inner_fun_grad_and_hessp(self, params, vector):
+        fun, grad, hessp = super()._inner_fun_grad_and_hessp(params, vector)
+        return self._interval_objective(
+            params, fun, grad, hessp=hessp, vector=vector)
+
+    def _interval_objective(self, params, fun, grad,
+                            hess=None, hessp=None, vector=None):
+        """Return objective, gradient and hessian (or hessian @ vector,
+        or None) from -2lnL, its gradient and (optionally) its
+        hessian or hessian @ vector at params"""
         x = params[self.target_parameter]
         x_norm = (x - self.bestfit_tp) / self.sigma_guess
         tp_index = self.arg_names.index(self.target_parameter)
 
-        # Evaluate likelihood
-        result = super()._inner_fun_and_grad(params)
-        if self.use_hessian:
-            fun, grad, hess = result
-        else:
-            fun, grad = result[:2]
-            hess = None
-
         # Compute Mexican hat objective
         diff = fun - (self.m2ll_best + self.t_ppf(x))
         objective = diff ** 2
@@ -729,12 +850,18 @@ class IntervalObjective(Objective):
         grad_diff[tp_index] -= self.t_ppf_grad(x)
         grad_objective = 2 * diff * grad_diff
 
-        if self.use_hessian:
+        if hess is not None:
             hess_of_diff = hess
             hess_of_diff[tp_index, tp_index] -= self.t_ppf_hess(x)
             hess_objective = 2 * (
                     diff * hess_of_diff
                     + np.outer(grad_diff, grad_diff))
+        elif hessp is not None:
+            hessp_of_diff = hessp
+            hessp_of_diff[tp_index] -= self.t_ppf_hess(x) * vector[tp_index]
+            hess_objective = 2 * (
+                    diff * hessp_of_diff
+                    + grad_diff * np.dot(grad_diff, vector))
         else:
             hess_objective = None
 
@@ -766,18 +893,34 @@ class NonlinearIntervalObjective(IntervalObjective, ScipyObjective):
 
     def _inner_fun_and_grad(self, params):
         # Bypass the parabolic tilt function in IntervalObjective
-        m2ll, grad, hess = Objective._inner_fun_and_grad(self, params)
+        m2ll, grad = Objective._inner_fun_and_grad(self, params)
+        return (m2ll - self.m2ll_best - self.t_ppf(params),
+                grad - self.t_ppf_grad(params))
+
+    def _inner_fun_grad_and_hess(self, params):
+        m2ll, grad, hess = Objective._inner_fun_grad_and_hess(self, params)
         return (m2ll - self.m2ll_best - self.t_ppf(params),
                 grad - self.t_ppf_grad(params),
                 hess - self.t_ppf_hess(params))
 
+    def _inner_fun_grad_and_hessp(self, params, vector):
+        m2ll, grad, hessp = Objective._inner_fun_grad_and_hessp(
+            self, params, vector)
+        return (m2ll - self.m2ll_best - self.t_ppf(params),
+                grad - self.t_ppf_grad(params),
+                hessp - self.t_ppf_hess(params) * np.sum(vector))
+
     def tilt_fun(self, x):
         # Ensure we get a scalar back regardless of what nuisance parameters we
         # might have
         return -self.direction * self._array_to_dict(x)[self.target_parameter]
 
     def hess_constraint(self, x, v):
-        return v * self(x).hess
+        # trust-constr accepts a LinearOperator, so it only needs
+        # Hessian-vector products
+        return LinearOperator(
+            (len(x), len(x)),
+            matvec=lambda p: v[0] * self.hessp(x, np.ravel(p)))
 
     def _minimize(self):
         kwargs = self._scipy_minizer_options()
@@ -40,6 +40,10 @@ class LogLikelihood:
     # dsetname -> [start, stop] array over sources
     column_indices: ty.Dict[str, np.ndarray]
 
+    #: Number of times the log likelihood graphs have been traced.
+    #: Useful for diagnosing unexpected retracing.
+    n_traces = 0
+
     def __init__(
             self,
             sources: ty.Union[
@@ -60,6 +64,12 @@ class LogLikelihood:
             progress=True,
             defaults=None,
             mu_estimators=None,
+            fuse_batches=False,
+            memoize_differential_rates=True,
+            sort_by_dimsizes=False,
+            cache_dir=None,
+            jit_compile=False,
+            log_space=False,
             **common_param_specs):
         """
 
@@ -108,6 +118,38 @@ class LogLikelihood:
             * a dict {source_name: mu_est}, where mu_est is one of the above two,
                 to use a different estimator for different sources.
 
+        :param fuse_batches: If True, evaluate all batches of all datasets
+            in a single compiled graph, accumulating the likelihood,
+            gradient and Hessian on the device. This avoids one host/device
+            round-trip per batch, at the cost of a longer initial trace.
+
+        :param memoize_differential_rates: If True (default), keep the
+            differential rates of the sources on the device, and reuse them
+            when no parameter they depend on has changed. This is decided
+            per source: it is done for sources whose parameters are all
+            fixed (in omit_grads), e.g. background sources in a fit of
+            signal shape parameters. Fits of only rate multipliers then
+            need no differential rate computations at all.
+
+        :param sort_by_dimsizes: If True, sort events by the size of their
+            hidden variable domains before batching, to reduce padding.
+            All sources in a dataset use the order of its first source.
+
+        :param cache_dir: Directory in which sources cache their annotated
+            data and data tensors, see fd.Source. If None, no caching.
+
+        :param jit_compile: If True, compile the likelihood graphs and the
+            differential rates of the sources with XLA. Graphs XLA cannot
+            compile fall back to regular tf.functions, see fd.XLAFunction.
+            XLA compilation makes the first call with new settings
+            (e.g. second_order or omit_grads) slower.
+
+        :param log_space: If True, compute the log of the differential rates
+            directly, contracting the blocks of BlockModelSources in log
+            space. Small probabilities then do not underflow, so wide
+            hidden variable domains (large max_sigma) are safe to use
+            in float32.
+
         :param **common_param_specs: dict {param_name: (min, max, mu_options), ...}
             specifying the parameters of the fit. Here min and max are bounds
             on the parameters, and mu_options are instructions to the mu estimator.
@@ -171,6 +213,9 @@ class LogLikelihood:
                           # take
                           fit_params=list(k for k in common_param_specs.keys()),
                           batch_size=batch_size,
+                          sort_by_dimsizes=sort_by_dimsizes,
+                          cache_dir=cache_dir,
+                          jit_compile=jit_compile,
                           **defaults)
             for sname, sclass in self.sources.items()}
 
@@ -238,15 +283,45 @@ class LogLikelihood:
                 return 0.
         self.log_constraint = log_constraint
 
+        self.fuse_batches = fuse_batches
+        self.log_space = log_space
+
+        # fname -> XLA-compiled version of the traced function fname,
+        # see _traced_function
+        self.jit_compile = jit_compile
+        self._xla_functions = dict()
+        if jit_compile:
+            for fname in ('_log_likelihood', '_log_likelihood_fused',
+                          '_log_likelihood_from_rates',
+                          '_log_likelihood_hessp'):
+                f = getattr(self.__class__, fname).python_function
+                self._xla_functions[fname] = fd.XLAFunction(f.__get__(self))
+
+        # Fit parameters each source's differential rate depends on
+        self.memoize_differential_rates = memoize_differential_rates
+        self._differential_rate_params = {
+            sname: [pname for pname in self.param_names
+                    if any(pname in f_params
+                           for f_params in s.f_params.values())]
+            for sname, s in self.sources.items()}
+
         self.set_data(data)
 
     def set_data(self,
-                 data: ty.Union[pd.DataFrame, ty.Dict[str, pd.DataFrame]]):
+                 data: ty.Union[pd.DataFrame, ty.Dict[str, pd.DataFrame]],
+                 n_workers=1):
         """set new data for sources in the likelihood.
         Data is passed in the same format as for __init__
         Data can contain any subset of the original data keys to only
         update specific datasets.
+
+        :param n_workers: Number of processes each source uses to
+            annotate the data, see Source.set_data.
         """
+        # sname -> (key, list of [batch_size] differential rates),
+        # see _memoized_differential_rates
+        self._differential_rate_cache = dict()
+
         if isinstance(data, pd.DataFrame):
             assert len(self.dsetnames) == 1, \
                 "You passed one DataFrame but there are multiple datasets"
@@ -264,6 +339,10 @@ class LogLikelihood:
 
         batch_info = np.zeros((len(self.dsetnames), 3), dtype=int)
 
+        # Events must be batched in the same order for all sources
+        # in a dataset, since their data tensors are concatenated.
+        event_orders = dict()
+
         for sname, source in self.sources.items():
             dname = self.dset_for_source[sname]
             if dname not in data:
@@ -271,7 +350,13 @@ class LogLikelihood:
                 continue
 
             # Copy ensures annotations don't clobber
-            source.set_data(deepcopy(data[dname]))
+            source.set_data(deepcopy(data[dname]),
+                            event_order=event_orders.get(dname),
+                            n_workers=n_workers)
+            if dname not in event_orders:
+                event_orders[dname] = (
+                    source.event_order if source.event_order is not None
+                    else np.arange(len(data[dname])))
 
             # Update batch info
             dset_index = self.dsetnames.index(dname)
@@ -368,37 +453,72 @@ class LogLikelihood:
     def log_likelihood(self, second_order=False,
                        omit_grads=tuple(), **kwargs):
         params = self.prepare_params(kwargs)
-        n_grads = len(self.param_defaults) - len(omit_grads)
+        memoized = self._memoized_sources(omit_grads)
+        if self.fuse_batches and not memoized:
+            return self._log_likelihood_all_batches(
+                second_order=second_order, omit_grads=omit_grads, **params)
+
+        omit_grads, traced_omit_grads = self._traced_omit_grads(
+            omit_grads, second_order)
+        n_grads = len(self.param_defaults) - len(traced_omit_grads)
         ll = 0.
         llgrad = np.zeros(n_grads, dtype=np.float64)
         llgrad2 = np.zeros((n_grads, n_grads), dtype=np.float64)
 
         for dsetname in self.dsetnames:
+            snames = self.sources_in_dset[dsetname]
             # Getting this from the batch_info tensor is much slower
-            n_batches = self.sources[self.sources_in_dset[dsetname][0]].n_batches
-            if n_batches == 0:
-                # Signal _log_likelihood to do a 'dummy batch' without data,
-                # just to get the mu and constraint terms
-                n_batches = 1
-                empty_batch = True
-            else:
-                empty_batch = False
-
-            for i_batch in range(n_batches):
-                # Iterating over tf.range seems much slower!
-                if empty_batch:
-                    batch_data_tensor = None
-                else:
-                    batch_data_tensor = self.data_tensors[dsetname][i_batch]
-                results = self._log_likelihood(
-                    tf.constant(i_batch, dtype=fd.int_type()),
+            n_batches = self.sources[snames[0]].n_batches
+            # Differential rates of memoized sources, or None
+            cached_drs = [
+                self._memoized_differential_rates(sname, params)
+                if sname in memoized else None
+                for sname in snames]
+
+            if all(sname in memoized for sname in snames):
+                # No differential rates to compute, so no need to batch
+                n_events = self.sources[snames[0]].n_events
+                batch_results = [self._traced_function(
+                        '_log_likelihood_from_rates', second_order)(
                     dsetname=dsetname,
-                    data_tensor=batch_data_tensor,
-                    batch_info=self.batch_info,
-                    omit_grads=omit_grads,
+                    drs=tf.stack([
+                        tf.concat([tf.zeros(0, dtype=fd.float_type())] + drs,
+                                  axis=0)[:n_events]
+                        for drs in cached_drs]),
+                    omit_grads=traced_omit_grads,
                     second_order=second_order,
-                    empty_batch=empty_batch,
-                    **params)
+                    **params)]
+            else:
+                if n_batches == 0:
+                    # Signal _log_likelihood to do a 'dummy batch' without
+                    # data, just to get the mu and constraint terms
+                    n_batches = 1
+                    empty_batch = True
+                else:
+                    empty_batch = False
+                if empty_batch or all(drs is None for drs in cached_drs):
+                    cached_drs = None
+                data_tensor = (None if empty_batch
+                               else self.data_tensors[dsetname])
+
+                batch_results = (
+                    self._traced_function('_log_likelihood', second_order)(
+                        # Iterating over tf.range seems much slower!
+                        tf.constant(i_batch, dtype=fd.int_type()),
+                        dsetname=dsetname,
+                        data_tensor=(None if data_tensor is None
+                                     else data_tensor[i_batch]),
+                        batch_info=self.batch_info,
+                        omit_grads=traced_omit_grads,
+                        second_order=second_order,
+                        empty_batch=empty_batch,
+                        cached_drs=(None if cached_drs is None else tuple([
+                            None if drs is None else drs[i_batch]
+                            for drs in cached_drs])),
+                        **params)
+                    for i_batch in range(n_batches))
+
+            for results in batch_results:
                 ll += results[0].numpy().astype(np.float64)
 
                 if self.param_names:
@@ -410,7 +530,169 @@ class LogLikelihood:
 
         if second_order:
             return ll, llgrad, llgrad2
-        return ll, llgrad, None
+        return ll, self._omit_grads(llgrad, omit_grads), None
+
+    def _memoized_sources(self, omit_grads):
+        """Return names of sources whose differential rates can be
+        memoized for a call with omit_grads, i.e. for which we need no
+        gradients with respect to parameters they depend on."""
+        if not self.memoize_differential_rates:
+            return tuple()
+        return tuple([
+            sname for sname, pnames in self._differential_rate_params.items()
+            if all(pname in omit_grads for pname in pnames)])
+
+    def _memoized_differential_rates(self, sname, params):
+        """Return list of differential rates (their logs if log_space)
+        of source sname, one [batch_size] tensor per batch of its dataset.
+        The result is cached until a parameter of the source changes."""
+        s = self.sources[sname]
+        source_params = self._filter_source_kwargs(params, sname)
+        key = s.ptensor_from_kwargs(**source_params).numpy().tobytes()
+        if sname in self._differential_rate_cache:
+            cached_key, drs = self._differential_rate_cache[sname]
+            if cached_key == key:
+                return drs
+
+        dsetname = self.dset_for_source[sname]
+        source_i = self.sources_in_dset[dsetname].index(sname)
+        col_start, col_stop = self.column_indices[dsetname][source_i]
+        data_tensor = self.data_tensors[dsetname]
+        differential_rate = (s.log_differential_rate if self.log_space
+                             else s.differential_rate)
+        drs = [differential_rate(
+                   data_tensor[i_batch, :, col_start:col_stop],
+                   **source_params)
+               for i_batch in range(s.n_batches)]
+
+        self._differential_rate_cache[sname] = key, drs
+        return drs
+
+    @tf.function
+    def _log_likelihood_from_rates(self, dsetname, drs,
+                                   omit_grads=tuple(), second_order=False,
+                                   **params):
+        """Return (ll, grad, hessian or None) of a dataset, given the
+        [n_sources, n_events] differential rates drs of its sources
+        (their logs if log_space).
+
+        The differential rates are constants here, so gradients with
+        respect to parameters they depend on are wrong; these must be
+        omitted.
+        """
+        self.n_traces += 1
+        grad_par_stack, params_unstacked = self._stack_params(
+            params, omit_grads)
+        del params    # Do not reuse accidentally!
+
+        rate_mults = tf.stack([
+            self._get_rate_mult(sname, params_unstacked)
+            for sname in self.sources_in_dset[dsetname]])
+        ll = tf.reduce_sum(self._log_total_rates(drs, rate_mults))
+        ll -= tf.cast(self.mu(dataset_name=dsetname, **params_unstacked),
+                      fd.accumulation_type())
+        if dsetname == self.dsetnames[0]:
+            ll += tf.cast(self.log_constraint(**params_unstacked),
+                          fd.accumulation_type())
+
+        grad = tf.gradients(ll, grad_par_stack)[0]
+        if second_order:
+            return ll, grad, tf.hessians(ll, grad_par_stack)[0]
+        return ll, grad, None
+
+    def log_likelihood_hessp(self, vector, omit_grads=tuple(), **kwargs):
+        """Return (ll, grad, hessian @ vector) as numpy values, where vector
+        has one entry per parameter not in omit_grads.
+
+        Use this instead of the full Hessian from log_likelihood if only
+        products with it are needed, e.g. in trust-region optimizers.
+        """
+        params = self.prepare_params(kwargs)
+        omit_grads, _ = self._traced_omit_grads(omit_grads, False)
+        # Differentiate with respect to all parameters, like first-order
+        # log_likelihood calls, and move only along the free ones
+        vector_all = np.zeros(len(self.param_names))
+        vector_all[[i for i, pname in enumerate(self.param_names)
+                    if pname not in omit_grads]] = vector
+        vector_all = tf.constant(vector_all, dtype=fd.accumulation_type())
+
+        ll = 0.
+        llgrad = np.zeros(len(self.param_names), dtype=np.float64)
+        hessp = np.zeros(len(self.param_names), dtype=np.float64)
+        for dsetname in self.dsetnames:
+            n_batches = self.sources[self.sources_in_dset[dsetname][0]].n_batches
+            empty_batch = bool(n_batches == 0)
+            for i_batch in range(max(n_batches, 1)):
+                results = self._traced_function('_log_likelihood_hessp')(
+                    tf.constant(i_batch, dtype=fd.int_type()),
+                    dsetname=dsetname,
+                    data_tensor=(None if empty_batch
+                                 else self.data_tensors[dsetname][i_batch]),
+                    batch_info=self.batch_info,
+                    vector=vector_all,
+                    empty_batch=empty_batch,
+                    **params)
+                ll += results[0].numpy().astype(np.float64)
+                llgrad += results[1].numpy().astype(np.float64)
+                hessp += results[2].numpy().astype(np.float64)
+
+        return (ll,
+                self._omit_grads(llgrad, omit_grads),
+                self._omit_grads(hessp, omit_grads))
+
+    def _traced_function(self, fname, second_order=False):
+        """Return the traced function fname, XLA-compiled if jit_compile.
+
+        Hessians are not XLA-compiled: XLA allocates the second
+        derivatives of all intermediate tensors at once, which can take
+        gigabytes of memory even for small batches.
+        """
+        if fname in self._xla_functions and not second_order:
+            return self._xla_functions[fname]
+        return getattr(self, fname)
+
+    def _traced_omit_grads(self, omit_grads, second_order):
+        """Return (omit_grads, omit_grads to trace the likelihood with),
+        both as tuples in the order of param_names.
+
+        First-order graphs differentiate with respect to all parameters,
+        and omitted gradients are dropped afterwards (see _omit_grads).
+        This costs about the same, and avoids tracing a graph for every
+        set of fixed parameters.
+        Second-order graphs are traced once for each set of omitted
+        parameters, since Hessians of only the free parameters can be
+        much cheaper (e.g. fixing a shape parameter avoids its second
+        derivatives through the full model).
+        """
+        omit_grads = tuple([pname for pname in self.param_names
+                            if pname in omit_grads])
+        return omit_grads, (omit_grads if second_order else tuple())
+
+    def _omit_grads(self, llgrad, omit_grads):
+        """Return gradient over all parameters without the entries
+        for parameters in omit_grads"""
+        if not omit_grads:
+            return llgrad
+        return llgrad[[i for i, pname in enumerate(self.param_names)
+                       if pname not in omit_grads]]
+
+    def _log_likelihood_all_batches(self, second_order=False,
+                                    omit_grads=tuple(), **params):
+        """Return (ll, grad, hessian or None) as numpy values, computing
+        all batches of all datasets in one call to the fused graph."""
+        omit_grads, traced_omit_grads = self._traced_omit_grads(
+            omit_grads, second_order)
+        ll, llgrad, llgrad2 = self._traced_function(
+                '_log_likelihood_fused', second_order)(
+            data_tensors=self.data_tensors,
+            batch_info=self.batch_info,
+            omit_grads=traced_omit_grads,
+            second_order=second_order,
+            **params)
+        ll = ll.numpy()
+        if second_order:
+            return ll, llgrad.numpy(), llgrad2.numpy()
+        return ll, self._omit_grads(llgrad.numpy(), omit_grads), None
 
     def minus2_ll(self, *, omit_grads=tuple(), **kwargs):
         result = self.log_likelihood(omit_grads=omit_grads, **kwargs)
@@ -477,50 +759,184 @@ class LogLikelihood:
     def _log_likelihood(self,
                         i_batch, dsetname, data_tensor, batch_info,
                         omit_grads=tuple(), second_order=False,
-                        empty_batch=False, **params):
+                        empty_batch=False, cached_drs=None, **params):
+        """Return (ll, grad, hessian or None) of one batch in a dataset.
+
+        This is traced once for each combination of dsetname,
+        omit_grads, second_order, empty_batch and memoized sources
+        (see cached_drs in _log_likelihood_inner), and again if tensor
+        shapes change (e.g. after changing the batch size).
+        See _traced_omit_grads for how log_likelihood limits this.
+        """
+        self.n_traces += 1
+        return self._log_likelihood_batch(
+            i_batch, dsetname, data_tensor, batch_info,
+            omit_grads=omit_grads, second_order=second_order,
+            empty_batch=empty_batch, cached_drs=cached_drs, **params)
+
+    @tf.function
+    def _log_likelihood_fused(self, data_tensors, batch_info,
+                              omit_grads=tuple(), second_order=False,
+                              **params):
+        """Return (ll, grad, hessian) summed over all batches of all datasets.
+
+        Batches are iterated over with a tf.while_loop, so the entire
+        computation is one graph. Results are accumulated in float64, just
+        like the host-side accumulation in log_likelihood. If second_order
+        is False, the returned hessian is a tensor of zeros.
+        """
+        self.n_traces += 1
+        n_grads = len(self.param_names) - len(omit_grads)
+        ll = tf.constant(0., dtype=tf.float64)
+        llgrad = tf.zeros(n_grads, dtype=tf.float64)
+        llgrad2 = tf.zeros((n_grads, n_grads), dtype=tf.float64)
+
+        def accumulate(results, ll, llgrad, llgrad2):
+            ll += tf.cast(results[0], tf.float64)
+            if self.param_names:
+                if results[1] is None:
+                    raise ValueError("TensorFlow returned None as gradient!")
+                llgrad += tf.cast(results[1], tf.float64)
+                if second_order:
+                    llgrad2 += tf.cast(results[2], tf.float64)
+            return ll, llgrad, llgrad2
+
+        for dsetname in self.dsetnames:
+            data_tensor = data_tensors[dsetname]
+            n_batches = data_tensor.shape[0]
+
+            if n_batches == 0:
+                # Dummy batch without data, just to get the mu and
+                # constraint terms
+                results = self._log_likelihood_batch(
+                    tf.constant(0, dtype=fd.int_type()),
+                    dsetname, None, batch_info,
+                    omit_grads=omit_grads, second_order=second_order,
+                    empty_batch=True, **params)
+                ll, llgrad, llgrad2 = accumulate(results, ll, llgrad, llgrad2)
+                continue
+
+            def body(i_batch, ll, llgrad, llgrad2):
+                results = self._log_likelihood_batch(
+                    i_batch, dsetname, data_tensor[i_batch], batch_info,
+                    omit_grads=omit_grads, second_order=second_order,
+                    **params)
+                return (i_batch + 1,
+                        *accumulate(results, ll, llgrad, llgrad2))
+
+            _, ll, llgrad, llgrad2 = tf.while_loop(
+                lambda i_batch, *_: i_batch < n_batches,
+                body,
+                (tf.constant(0, dtype=fd.int_type()), ll, llgrad, llgrad2))
+
+        return ll, llgrad, llgrad2
+
+    def _log_likelihood_batch(self,
+                              i_batch, dsetname, data_tensor, batch_info,
+                              omit_grads=tuple(), second_order=False,
+                              empty_batch=False, cached_drs=None, **params):
+        """Return (ll, grad, hessian or None) of one batch in a dataset.
+        Must be called while tracing, see _log_likelihood.
+        """
+        grad_par_stack, params_unstacked = self._stack_params(
+            params, omit_grads)
+        del params    # Do not reuse accidentally!
+
+        ll = self._log_likelihood_batch_value(
+            i_batch, dsetname, data_tensor, batch_info,
+            empty_batch, params_unstacked, cached_drs=cached_drs)
+
+        # Autodifferentiation. This is why we use tensorflow:
+        grad = tf.gradients(ll, grad_par_stack)[0]
+        if second_order:
+            return ll, grad, tf.hessians(ll, grad_par_stack)[0]
+        return ll, grad, None
+
+    def _stack_params(self, params, omit_grads):
+        """Return (tensor to differentiate with respect to,
+        {param: value} computed from it). Must be called while tracing.
+        """
         # Stack the params to create a single node
         # to differentiate with respect to.
-        grad_par_stack = tf.stack([
-            params[k] for k in self.param_names
-            if k not in omit_grads])
+        # In mixed precision, this is in float64, so gradients are too.
+        grad_par_stack = tf.cast(
+            tf.stack([params[k] for k in self.param_names
+                      if k not in omit_grads]),
+            fd.accumulation_type())
 
         # Retrieve individual params from the stacked node,
         # then add back the params we do not differentiate w.r.t.
         params_unstacked = dict(zip(
             [x for x in self.param_names if x not in omit_grads],
-            tf.unstack(grad_par_stack)))
+            tf.unstack(tf.cast(grad_par_stack, fd.float_type()))))
         for k in omit_grads:
             params_unstacked[k] = params[k]
-        del params    # Do not reuse accidentally!
+        return grad_par_stack, params_unstacked
 
+    @tf.function
+    def _log_likelihood_hessp(self,
+                              i_batch, dsetname, data_tensor, batch_info,
+                              vector, empty_batch=False, **params):
+        """Return (ll, grad, hessian @ vector) of one batch in a dataset,
+        differentiating with respect to all parameters.
+
+        The Hessian-vector product is computed with forward-mode autodiff
+        over the gradient, which costs about two gradient evaluations
+        rather than one per parameter.
+        """
+        self.n_traces += 1
+        grad_par_stack = tf.cast(
+            tf.stack([params[k] for k in self.param_names]),
+            fd.accumulation_type())
+        with tf.autodiff.ForwardAccumulator(grad_par_stack, vector) as acc:
+            with tf.GradientTape() as tape:
+                tape.watch(grad_par_stack)
+                ll = self._log_likelihood_batch_value(
+                    i_batch, dsetname, data_tensor, batch_info,
+                    empty_batch,
+                    dict(zip(self.param_names, tf.unstack(
+                        tf.cast(grad_par_stack, fd.float_type())))))
+            grad = tape.gradient(ll, grad_par_stack)
+        return ll, grad, acc.jvp(grad)
+
+    def _log_likelihood_batch_value(self,
+                                    i_batch, dsetname, data_tensor,
+                                    batch_info, empty_batch, params,
+                                    cached_drs=None):
+        """Return log likelihood of one batch in a dataset, including
+        the mu and constraint terms if this batch should add them."""
         # Forward computation
         if empty_batch:
             ll = 0
         else:
             ll = self._log_likelihood_inner(
-                i_batch, params_unstacked, dsetname, data_tensor, batch_info)
+                i_batch, params, dsetname, data_tensor, batch_info,
+                cached_drs=cached_drs)
 
         # Add mu once (to the first batch)
         # and constraint really only once (to first batch of first dataset)
         ll += tf.where(
             tf.equal(i_batch, tf.constant(0, dtype=fd.int_type())),
-            - self.mu(dataset_name=dsetname, **params_unstacked),
-            0.)
+            - tf.cast(self.mu(dataset_name=dsetname, **params),
+                      fd.accumulation_type()),
+            tf.constant(0., dtype=fd.accumulation_type()))
         if dsetname == self.dsetnames[0]:
-            ll += self.log_constraint(**params_unstacked)
-
-        # Autodifferentiation. This is why we use tensorflow:
-        grad = tf.gradients(ll, grad_par_stack)[0]
-        if second_order:
-            return ll, grad, tf.hessians(ll, grad_par_stack)[0]
-        return ll, grad, None
+            ll += tf.cast(self.log_constraint(**params),
+                          fd.accumulation_type())
+        return ll
 
     def _log_likelihood_inner(self, i_batch, params,
-                              dsetname, data_tensor, batch_info):
+                              dsetname, data_tensor, batch_info,
+                              cached_drs=None):
         """Return log likelihood contribution of one batch in a dataset
 
         This loops over sources in the dataset and events in the batch,
         but not not over datasets or batches.
+
+        :param cached_drs: None, or tuple with for each source in the
+            dataset either its differential rates (their logs if log_space)
+            for this batch, see _memoized_differential_rates, or None
+            if they must be computed here.
         """
         # Retrieve batching info. Cannot use tuple-unpacking, tensorflow
         # doesn't like it when you iterate over tenstors
@@ -529,29 +945,50 @@ class LogLikelihood:
         batch_size = batch_info[dataset_index, 1]
         n_padding = batch_info[dataset_index, 2]
 
-        # Compute differential rates from all sources
+        # Compute differential rates (or their logs) from all sources
         # drs = list[n_sources] of [n_events] tensors
-        drs = tf.zeros((batch_size,), dtype=fd.float_type())
+        drs = []
+        rate_mults = []
         for source_i, sname in enumerate(self.sources_in_dset[dsetname]):
             s = self.sources[sname]
-            rate_mult = self._get_rate_mult(sname, params)
+            rate_mults.append(self._get_rate_mult(sname, params))
+            if cached_drs is not None and cached_drs[source_i] is not None:
+                drs.append(cached_drs[source_i])
+                continue
 
             col_start, col_stop = self.column_indices[dsetname][source_i]
-            dr = s.differential_rate(
+            differential_rate = (s.log_differential_rate if self.log_space
+                                 else s.differential_rate)
+            drs.append(differential_rate(
                 data_tensor[:, col_start:col_stop],
                 # We are already tracing; if we call the traced function here
                 # it breaks the Hessian (it will give NaNs)
                 autograph=False,
-                **self._filter_source_kwargs(params, sname))
-            drs += dr * rate_mult
+                **self._filter_source_kwargs(params, sname)))
 
         # Sum over events and remove padding
         n = tf.where(tf.equal(i_batch, n_batches - 1),
                      batch_size - n_padding,
                      batch_size)
-        ll = tf.reduce_sum(tf.math.log(drs[:n]))
+        ll = tf.reduce_sum(self._log_total_rates(
+            tf.stack(drs), tf.stack(rate_mults))[:n])
         return ll
 
+    def _log_total_rates(self, drs, rate_mults):
+        """Return [n_events] log of the total differential rate, given
+        [n_sources, n_events] differential rates drs (their logs if
+        log_space) and [n_sources] rate multipliers
+        """
+        if self.log_space:
+            return tf.reduce_logsumexp(
+                tf.cast(drs, fd.accumulation_type())
+                + tf.math.log(tf.cast(rate_mults,
+                                      fd.accumulation_type()))[:, o],
+                axis=0)
+        return tf.math.log(tf.cast(
+            tf.reduce_sum(rate_mults[:, o] * drs, axis=0),
+            fd.accumulation_type()))
+
     def guess(self) -> ty.Dict[str, float]:
         """Return dictionary of parameter guesses"""
         return {k: v.numpy()
@@ -586,10 +1023,15 @@ class LogLikelihood:
             of the best fit parameters. Bool.
         :param use_hessian: If True, uses flamedisxs' exact Hessian
             in the optimizer. Otherwise, most optimizers estimate it by finite-
-            difference calculations.
-        :param return_errors: If using the minuit minimizer, instead return
-            a 2-tuple of (bestfit dict, error dict).
-            If the optimizer is minuit, you can also pass 'hesse' or 'minos'.
+            difference calculations. The Hessian is only computed when the
+            optimizer asks for it (minuit never does).
+        :param return_errors: If True, instead return a 2-tuple of
+            (bestfit dict, error dict), with errors from the exact Hessian
+            at the best fit. For minuit with use_hessian=False, the errors
+            are minuit's estimates instead. For minuit, return_errors can
+            also be 'hesse', for errors from minuit's HESSE, or 'minos', for
+            (lower, upper) errors from minuit's MINOS, whatever use_hessian.
+            Other values raise a ValueError.
         :param allow_failure: If True, raise a warning instead of an exception
             if there is an optimizer failure.
         """
@@ -601,8 +1043,7 @@ class LogLikelihood:
             raise ValueError("Must specify bestfit guess as a dictionary")
 
         # Check the likelihood has a finite value and gradient before starting
-        val, grad, hess = self.log_likelihood(**guess,
-                                              second_order=use_hessian)
+        val, grad, _ = self.log_likelihood(**guess)
         if not np.isfinite(val):
             raise ValueError("The likelihood is - infinity at your guess, "
                              "please guess better, remove outlier events, or "
@@ -611,14 +1052,6 @@ class LogLikelihood:
             raise ValueError("The likelihood is finite at your guess, "
                              "but the gradient is not. Are you starting at a "
                              "cusp?")
-        if use_hessian:
-            if hess is None:
-                raise RuntimeError("Likelihood did't provide Hessian!")
-            if not np.all(np.isfinite(hess)):
-                raise ValueError("The likelihood and gradient are finite at "
-                                 "your guess, but the Hessian is not. "
-                                 "Are you starting at an unusual point? "
-                                 "You could also try use_hessian=False.")
 
         opt = fd.SUPPORTED_OPTIMIZERS[optimizer]
         res = opt(
@@ -637,12 +1070,11 @@ class LogLikelihood:
         if get_lowlevel_result or get_history:
             return res
 
-        # TODO: This is to deal with a minuit-specific convention,
-        # should either put this to minuit or force others into same mold.
         names = self.param_names
         result, errors = (
             {k: v for k, v in res.items() if k in names},
-            {k: v for k, v in res.items() if k.startswith('error_')})
+            {k[len('error_'):]: v for k, v in res.items()
+             if k.startswith('error_')})
         if return_errors:
             # Filter out errors and return separately
             return result, errors
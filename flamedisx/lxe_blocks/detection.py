@@ -3,7 +3,6 @@ import typing as ty
 import numpy as np
 from scipy import stats
 import tensorflow as tf
-import tensorflow_probability as tfp
 
 import flamedisx as fd
 export, __all__ = fd.exporter()
@@ -22,13 +21,16 @@ class DetectPhotonsOrElectrons(fd.Block):
 
     quanta_name: str
 
+    # Far from quanta_produced * efficiency, the binomial is negligible
+    banded = True
+
     # Prevent pycharm warnings:
     source: fd.Source
     gimme: ty.Callable
     gimme_numpy: ty.Callable
 
     def _compute(self, data_tensor, ptensor,
-                 quanta_produced, quanta_detected):
+                 quanta_produced, quanta_detected, log_space=False):
         p = self.gimme(self.quanta_name + '_detection_eff',
                        data_tensor=data_tensor, ptensor=ptensor)[:, o, o]
 
@@ -42,14 +44,17 @@ class DetectPhotonsOrElectrons(fd.Block):
                                bonus_arg=quanta_produced,
                                data_tensor=data_tensor, ptensor=ptensor)
 
-        result = tfp.distributions.Binomial(
-                total_count=quanta_produced,
-                probs=tf.cast(p, dtype=fd.float_type())
-            ).prob(quanta_detected)
+        result = fd.binom_logpmf(quanta_detected, quanta_produced, p)
         acceptance = self.gimme(self.quanta_name + '_acceptance',
                                 bonus_arg=quanta_detected,
                                 data_tensor=data_tensor, ptensor=ptensor)
-        return result * acceptance
+        if log_space:
+            return result + fd.safe_log(acceptance)
+        return tf.exp(result) * acceptance
+
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        # Far from the mean, binom_logpmf is still accurate
+        return self._compute(data_tensor, ptensor, log_space=True, **kwargs)
 
     def _simulate(self, d):
         p = self.gimme_numpy(self.quanta_name + '_detection_eff')
@@ -125,10 +130,11 @@ class DetectPhotons(DetectPhotonsOrElectrons):
         return 1. + 0. * nph
 
     def _compute(self, data_tensor, ptensor,
-                 photons_produced, photons_detected):
+                 photons_produced, photons_detected, log_space=False):
         return super()._compute(quanta_produced=photons_produced,
                                 quanta_detected=photons_detected,
-                                data_tensor=data_tensor, ptensor=ptensor)
+                                data_tensor=data_tensor, ptensor=ptensor,
+                                log_space=log_space)
 
 
 @export
@@ -157,7 +163,8 @@ class DetectElectrons(DetectPhotonsOrElectrons):
     quanta_name = 'electron'
 
     def _compute(self, data_tensor, ptensor,
-                 electrons_produced, electrons_detected):
+                 electrons_produced, electrons_detected, log_space=False):
         return super()._compute(quanta_produced=electrons_produced,
                                 quanta_detected=electrons_detected,
-                                data_tensor=data_tensor, ptensor=ptensor)
+                                data_tensor=data_tensor, ptensor=ptensor,
+                                log_space=log_space)
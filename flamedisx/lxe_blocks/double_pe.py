@@ -1,7 +1,6 @@
 import numpy as np
 from scipy import stats
 import tensorflow as tf
-import tensorflow_probability as tfp
 
 import flamedisx as fd
 export, __all__ = fd.exporter()
@@ -16,33 +15,28 @@ class MakeS1Photoelectrons(fd.Block):
 
     max_dim_size = {'photons_detected': 100}
 
+    # photoelectrons_detected is between photons_detected and
+    # (1 + ~double_pe_fraction) * photons_detected
+    banded = True
+
     double_pe_fraction = 0.219
 
     def _compute(self, data_tensor, ptensor,
-                 photons_detected, photoelectrons_detected):
+                 photons_detected, photoelectrons_detected, log_space=False):
         p_dpe = self.gimme('double_pe_fraction',
                            data_tensor=data_tensor, ptensor=ptensor)[:, o, o]
 
-        # Double-pe emission only creates additional photoelectrons.
-        # Invalid values will get assigned p=0 later.
-        extra_pe = photoelectrons_detected - photons_detected
-        invalid = extra_pe < 0
-
-        # Negative arguments would mess up tfp's Binomial
-        extra_pe = tf.where(invalid,
-                            tf.zeros_like(extra_pe),
-                            extra_pe)
-
-        # (N_pe - N_photons) distributed as Binom(N_photons, p=pdpe)
-        result = tfp.distributions.Binomial(
-                total_count=photons_detected,
-                probs=tf.cast(p_dpe, dtype=fd.float_type())
-            ).prob(extra_pe)
-
-        # Set probability of extra_pe < 0 cases to 0
-        return tf.where(invalid,
-                        tf.zeros_like(photoelectrons_detected),
-                        result)
+        # (N_pe - N_photons) distributed as Binom(N_photons, p=pdpe).
+        # Double-pe emission only creates additional photoelectrons;
+        # binom_logpmf gives p=0 for N_pe < N_photons.
+        result = fd.binom_logpmf(
+            photoelectrons_detected - photons_detected,
+            photons_detected,
+            p_dpe)
+        return result if log_space else tf.exp(result)
+
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        return self._compute(data_tensor, ptensor, log_space=True, **kwargs)
 
     def _simulate(self, d):
         d['photoelectrons_detected'] = stats.binom.rvs(
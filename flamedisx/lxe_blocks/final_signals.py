@@ -63,7 +63,7 @@ class MakeFinalSignals(fd.Block):
 
     def _compute(self,
                  quanta_detected, s_observed,
-                 data_tensor, ptensor):
+                 data_tensor, ptensor, log_space=False):
         # Lookup signal gain mean and std per detected quanta
         mean_per_q = self.gimme(self.quanta_name + '_gain_mean',
                                 data_tensor=data_tensor,
@@ -76,14 +76,19 @@ class MakeFinalSignals(fd.Block):
         std = quanta_detected ** 0.5 * std_per_q
 
         # add offset to std to avoid NaNs from norm.pdf if std = 0
-        result = tfp.distributions.Normal(
-            loc=mean, scale=std + 1e-10
-        ).prob(s_observed)
+        normal = tfp.distributions.Normal(loc=mean, scale=std + 1e-10)
 
         # Add detection/selection efficiency
-        result *= self.gimme(SIGNAL_NAMES[self.quanta_name] + '_acceptance',
-                             data_tensor=data_tensor, ptensor=ptensor)[:, o, o]
-        return result
+        acceptance = self.gimme(SIGNAL_NAMES[self.quanta_name] + '_acceptance',
+                                data_tensor=data_tensor,
+                                ptensor=ptensor)[:, o, o]
+        if log_space:
+            return normal.log_prob(s_observed) + fd.safe_log(acceptance)
+        return normal.prob(s_observed) * acceptance
+
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        # Far in the tails of the Gaussian, log_prob is still accurate
+        return self._compute(data_tensor, ptensor, log_space=True, **kwargs)
 
     def check_data(self):
         if not self.check_acceptances:
@@ -127,11 +132,11 @@ class MakeS1(MakeFinalSignals):
         return reconstruction_bias
 
     def _compute(self, data_tensor, ptensor,
-                 photoelectrons_detected, s1):
+                 photoelectrons_detected, s1, log_space=False):
         return super()._compute(
             quanta_detected=photoelectrons_detected,
             s_observed=s1,
-            data_tensor=data_tensor, ptensor=ptensor)
+            data_tensor=data_tensor, ptensor=ptensor, log_space=log_space)
 
 
 @export
@@ -170,8 +175,8 @@ class MakeS2(MakeFinalSignals):
         return reconstruction_bias
 
     def _compute(self, data_tensor, ptensor,
-                 electrons_detected, s2):
+                 electrons_detected, s2, log_space=False):
         return super()._compute(
             quanta_detected=electrons_detected,
             s_observed=s2,
-            data_tensor=data_tensor, ptensor=ptensor)
+            data_tensor=data_tensor, ptensor=ptensor, log_space=log_space)
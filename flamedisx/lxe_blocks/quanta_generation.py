@@ -1,7 +1,6 @@
 import numpy as np
 from scipy import stats
 import tensorflow as tf
-import tensorflow_probability as tfp
 
 import flamedisx as fd
 export, __all__ = fd.exporter()
@@ -17,6 +16,7 @@ class MakeERQuanta(fd.Block):
     dimensions = ('quanta_produced', 'energy')
     bonus_dimensions = (('quanta_produced_noStep', False),)
     depends_on = ((('energy',), 'rate_vs_energy'),)
+    contracted_dependency = ('energy',)
     model_functions = ('work',)
 
     max_dim_size = {'quanta_produced': 100}
@@ -91,6 +91,51 @@ class MakeERQuanta(fd.Block):
         # Return the average of the two
         return (result_left + result_right) / 2
 
+    def _compute_contracted(self,
+                            data_tensor, ptensor,
+                            # Domain
+                            quanta_produced,
+                            # Dependency domain and value
+                            energy, rate_vs_energy,
+                            # Extra domains for internal use
+                            quanta_produced_noStep, energy_noStep):
+        # Since p(nq | e) is a delta function, rate_vs_quanta is the
+        # energy spectrum summed into the quanta bins, as in _compute
+
+        # Index of the quanta each energy produces in the unstepped domain.
+        # This does not depend differentiably on work, as in _compute.
+        work = self.gimme('work', data_tensor=data_tensor, ptensor=ptensor)
+        quanta_index = tf.cast(
+            tf.floor(energy_noStep[:, 0, :] / work[:, o])
+            - quanta_produced_noStep[:, :1, 0],
+            dtype=fd.int_type())
+
+        # Padding and chunks as in _compute
+        n_noStep = tf.shape(quanta_produced_noStep)[1]
+        n_quanta = tf.shape(quanta_produced)[1]
+        padding = (n_noStep // (n_quanta - 1)
+                   - n_noStep % (n_quanta - 1))
+        chunks = (n_noStep + padding) // n_quanta
+        steps = self.source._fetch('quanta_produced_steps',
+                                   data_tensor=data_tensor)
+
+        # Half of each energy's rate goes to the stepped quanta bin with
+        # padding from the left, half to the one with padding from the right
+        rate = rate_vs_energy / (2 * steps[:, o] * steps[:, o])
+        n_events = tf.shape(rate)[0]
+        event_offset = n_quanta * tf.range(n_events)[:, o]
+        result = tf.zeros(n_events * n_quanta, dtype=fd.float_type())
+        for quanta_bin in ((quanta_index + padding) // chunks,
+                           quanta_index // chunks):
+            valid = ((quanta_index >= 0) & (quanta_index < n_noStep)
+                     & (quanta_bin < n_quanta))
+            result += tf.math.unsorted_segment_sum(
+                tf.where(valid, rate, tf.zeros_like(rate)),
+                tf.where(valid, quanta_bin + event_offset,
+                         tf.zeros_like(quanta_bin)),
+                num_segments=n_events * n_quanta)
+        return tf.reshape(result, (n_events, n_quanta))
+
     def _simulate(self, d):
         work = self.gimme_numpy('work')
         d['quanta_produced'] = np.floor(d['energy'].values
@@ -122,7 +167,7 @@ class MakeNRQuanta(fd.Block):
     work = DEFAULT_WORK_PER_QUANTUM
 
     @staticmethod
-    def lindhard_l(e, lindhard_k=tf.constant(0.138, dtype=fd.float_type())):
+    def lindhard_l(e, lindhard_k=0.138):
         """Return Lindhard quenching factor at energy e in keV"""
         eps = e * tf.constant(11.5 * 54.**(-7./3.), dtype=fd.float_type())  # Xenon: Z = 54
 
@@ -143,7 +188,8 @@ class MakeNRQuanta(fd.Block):
                  # Dependency domain and value
                  energy, rate_vs_energy,
                  # Extra domains for internal use
-                 quanta_produced_noStep, energy_noStep):
+                 quanta_produced_noStep, energy_noStep,
+                 log_space=False):
 
         # We will use the tensors without stepping througout, then reduce
         # to the correct dimensions for the stepped domains via an averaging
@@ -155,9 +201,13 @@ class MakeNRQuanta(fd.Block):
                              data_tensor=data_tensor, ptensor=ptensor)[:, o, :]
                 / work[:, o, o])
 
-        # (n_events, |nq|, |ne|) tensor giving p(nq | e)
-        result = tfp.distributions.Poisson(mean_q_produced).prob(
-            quanta_produced_noStep)
+        # (n_events, |nq|, |ne|) tensor giving p(nq | e), or its log
+        result = fd.poisson_logpmf(quanta_produced_noStep, mean_q_produced)
+        if not log_space:
+            result = tf.exp(result)
+        # In log space, sum with logsumexp and pad with log(0)
+        sum_chunks = tf.reduce_logsumexp if log_space else tf.reduce_sum
+        pad_value = -np.inf if log_space else 0.
 
         # Padding needed to correctly average over the unstepped quanta
         # domain to the stepped quanta domain: sum slices in equal chunks with
@@ -170,8 +220,10 @@ class MakeNRQuanta(fd.Block):
             (tf.shape(quanta_produced)[1]-1)
 
         # Do the padding
-        result_pad_left = tf.pad(result, [[0, 0], [padding, 0], [0, 0]])
-        result_pad_right = tf.pad(result, [[0, 0], [0, padding], [0, 0]])
+        result_pad_left = tf.pad(result, [[0, 0], [padding, 0], [0, 0]],
+                                 constant_values=pad_value)
+        result_pad_right = tf.pad(result, [[0, 0], [0, padding], [0, 0]],
+                                  constant_values=pad_value)
 
         # Chunks to reshape into, to allow for summation of slices via a
         # reduce_sum
@@ -179,30 +231,36 @@ class MakeNRQuanta(fd.Block):
         steps = self.source._fetch('quanta_produced_steps',
                                    data_tensor=data_tensor)
 
-        # Average slices padding from the left, diving again by the step size
-        # as this will be multiplied by later (once more than it needs to be)
+        # Sum slices padding from the left
         result_temp_left = tf.reshape(
             result_pad_left,
             [tf.shape(result_pad_left)[0],
                 int(tf.shape(result_pad_left)[1] / chunks),
                 chunks,
                 tf.shape(result_pad_left)[2]])
-        result_left = tf.reduce_sum(result_temp_left, axis=2) \
-            / (steps[:, o, o] * steps[:, o, o])
+        result_left = sum_chunks(result_temp_left, axis=2)
 
-        # Average slices padding from the right, diving again by the step size
-        # as this will be multiplied by later (once more than it needs to be)
+        # Sum slices padding from the right
         result_temp_right = tf.reshape(
             result_pad_right,
             [tf.shape(result_pad_right)[0],
                 int(tf.shape(result_pad_right)[1] / chunks),
                 chunks,
                 tf.shape(result_pad_right)[2]])
-        result_right = tf.reduce_sum(result_temp_right, axis=2) \
-            / (steps[:, o, o] * steps[:, o, o])
+        result_right = sum_chunks(result_temp_right, axis=2)
 
-        # Return the average of the two
-        return (result_left + result_right) / 2
+        # Return the average of the two, dividing again by the step size
+        # as this will be multiplied by later (once more than it needs to be)
+        if log_space:
+            return (tf.reduce_logsumexp(
+                        tf.stack([result_left, result_right]), axis=0)
+                    - tf.math.log(2 * steps[:, o, o] * steps[:, o, o]))
+        return (result_left / (steps[:, o, o] * steps[:, o, o])
+                + result_right / (steps[:, o, o] * steps[:, o, o])) / 2
+
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        # Far in the tails of the Poisson, poisson_logpmf is still accurate
+        return self._compute(data_tensor, ptensor, log_space=True, **kwargs)
 
     def _simulate(self, d):
         # If you forget the .values here, you may get a Python core dump...
@@ -245,23 +303,16 @@ def domain_dict_bonus(self, d):
     # Calculate cross_domains from quanta_produced and energy
     quanta_produced_domain = self.source.domain('quanta_produced', d)
     energy_domain = self.source.domain('energy', d)
-    quanta_produced = tf.repeat(quanta_produced_domain[:, :, o],
-                                tf.shape(energy_domain)[1],
-                                axis=2)
+    quanta_produced = quanta_produced_domain[:, :, o]
 
     # Calculate cross_domains from quanta_produced_noStep and energy
     mi = self.source._fetch('quanta_produced_noStep_min', data_tensor=d)[:, o]
     quanta_produced_noStep_domain = mi + tf.range(tf.reduce_max(
         self.source._fetch('quanta_produced_noStep_dimsizes', data_tensor=d)))
 
-    quanta_produced_noStep = tf.repeat(
-        quanta_produced_noStep_domain[:, :, o],
-        tf.shape(energy_domain)[1],
-        axis=2)
-    energy_noStep = tf.repeat(
-        energy_domain[:, o, :],
-        tf.shape(quanta_produced_noStep_domain)[1],
-        axis=1)
+    # These broadcast to (n_events, |nq|, |ne|), see Source.cross_domains
+    quanta_produced_noStep = quanta_produced_noStep_domain[:, :, o]
+    energy_noStep = energy_domain[:, o, :]
 
     # Return as domain_dict
     return dict({'quanta_produced': quanta_produced,
@@ -269,25 +320,30 @@ def domain_dict_bonus(self, d):
                  'energy_noStep': energy_noStep})
 
 
+def batch_max(x, batch_size):
+    """Return x with each element replaced by the maximum over its batch
+    of batch_size consecutive elements. The last batch may be incomplete.
+    """
+    x = np.asarray(x)
+    n_batches = -(-len(x) // batch_size)
+    padded = np.full(n_batches * batch_size, -np.inf)
+    padded[:len(x)] = x
+    batch_maxes = padded.reshape(n_batches, batch_size).max(axis=1)
+    return np.repeat(batch_maxes, batch_size)[:len(x)].astype(x.dtype)
+
+
 def calculate_dimsizes_special(self):
     d = self.source.data
+    batch_size = self.source.batch_size
 
     # Want electrons and photons to have the same stepping: choose the minimum
     # of the two for each event
-    quanta_steps = (d['electrons_produced_steps'] <=
-                    d['photons_produced_steps']) * \
-        d['electrons_produced_steps'] \
-        + (d['photons_produced_steps'] <
-           d['electrons_produced_steps']) * d['photons_produced_steps']
-
-    batch_size = self.source.batch_size
-    n_batches = self.source.n_batches
+    quanta_steps = np.minimum(d['electrons_produced_steps'].to_numpy(),
+                              d['photons_produced_steps'].to_numpy())
 
     # Need the electrons/photons steps to be the same within a batch for the
     # averaging procedure in _compute to work correctly
-    for i in range(n_batches):
-        quanta_steps[i * batch_size: (i + 1) * batch_size + 1] = \
-            max(quanta_steps[i * batch_size: (i + 1) * batch_size + 1])
+    quanta_steps = batch_max(quanta_steps, batch_size)
 
     d['electrons_produced_steps'] = quanta_steps
     d['photons_produced_steps'] = quanta_steps
@@ -315,11 +371,7 @@ def calculate_dimsizes_special(self):
 
     # Need the quanta_produced dimsizes to be the same within a batch for the
     # averaging procedure in _compute to work correctly
-    for i in range(n_batches):
-        quanta_produced_dimsizes[i * batch_size: (i + 1) * batch_size + 1] = \
-            max(quanta_produced_dimsizes[i * batch_size:
-                (i + 1) * batch_size + 1])
-
+    quanta_produced_dimsizes = batch_max(quanta_produced_dimsizes, batch_size)
     self.source.dimsizes['quanta_produced'] = quanta_produced_dimsizes
 
     # Correct dimsizes for quanta_produced_noStep, to cover the full range of
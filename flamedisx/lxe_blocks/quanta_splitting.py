@@ -1,7 +1,6 @@
 import numpy as np
 from scipy import stats
 import tensorflow as tf
-import tensorflow_probability as tfp
 
 import flamedisx as fd
 export, __all__ = fd.exporter()
@@ -26,7 +25,8 @@ class MakePhotonsElectronsBinomial(fd.Block):
                  # Domain
                  electrons_produced, photons_produced,
                  # Dependency domain and value
-                 quanta_produced, rate_vs_quanta):
+                 quanta_produced, rate_vs_quanta,
+                 log_space=False):
         pel = self.source.gimme('p_electron', bonus_arg=quanta_produced,
                                 data_tensor=data_tensor, ptensor=ptensor)
 
@@ -44,30 +44,53 @@ class MakePhotonsElectronsBinomial(fd.Block):
             )[:, o, o])
         # ... differential rate
         rate_nq = fd.lookup_axis1(rate_vs_quanta, _nq_ind)
-        # ... probability of a quantum to become an electron
-        pel = fd.lookup_axis1(pel, _nq_ind)
-        # Finally, the main computation is simple:
-        pel = tf.where(tf.math.is_nan(pel),
-                       tf.zeros_like(pel, dtype=fd.float_type()),
-                       pel)
-        pel = tf.clip_by_value(pel, 1e-6, 1. - 1e-6)
 
         if self.do_pel_fluct:
+            pel = self._clip_pel(pel)
             pel_fluct = self.gimme('p_electron_fluctuation',
                                    bonus_arg=quanta_produced,
                                    data_tensor=data_tensor,
                                    ptensor=ptensor)
-            pel_fluct = fd.lookup_axis1(pel_fluct, _nq_ind)
-            # See issue #37 for why we use 1 - p and photons here
-            return rate_nq * fd.beta_binom_pmf(
-                photons_produced,
-                n=nq,
-                p_mean=1. - pel,
-                p_sigma=pel_fluct)
+            # See issue #37 for why we use 1 - p and photons here.
+            # The beta distribution only depends on nq, so compute it
+            # before looking up its parameters for each (electrons, photons).
+            # Out-of-range nq have zero rate, and just need finite parameters.
+            a, b = fd.beta_params(1. - pel, pel_fluct)
+            log_beta_ab = (tf.math.lgamma(a) + tf.math.lgamma(b)
+                           - tf.math.lgamma(a + b))
+            a, b = [fd.lookup_axis1(x, _nq_ind, fill_value=1.)
+                    for x in (a, b)]
+            log_beta_ab = fd.lookup_axis1(log_beta_ab, _nq_ind)
+            # The binomial coefficients do not depend on parameters
+            log_binom_coef = fd.log_binom_coef(nq, photons_produced)
+            result = fd.beta_binom_logpmf(
+                photons_produced, n=nq, a=a, b=b,
+                log_binom_coef=log_binom_coef,
+                log_beta_ab=log_beta_ab)
+            # Give zero probability where this is NaN or +inf
+            result = tf.where(
+                tf.math.is_finite(result) | (result < 0),
+                result,
+                tf.constant(-np.inf, dtype=fd.float_type()))
 
         else:
-            return rate_nq * tfp.distributions.Binomial(
-                total_count=nq, probs=pel).prob(electrons_produced)
+            # ... probability of a quantum to become an electron
+            pel = self._clip_pel(fd.lookup_axis1(pel, _nq_ind))
+            result = fd.binom_logpmf(electrons_produced, nq, pel)
+
+        if log_space:
+            return fd.safe_log(rate_nq) + result
+        return rate_nq * tf.exp(result)
+
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        return self._compute(data_tensor, ptensor, log_space=True, **kwargs)
+
+    @staticmethod
+    def _clip_pel(pel):
+        pel = tf.where(tf.math.is_nan(pel),
+                       tf.zeros_like(pel, dtype=fd.float_type()),
+                       pel)
+        return tf.clip_by_value(pel, 1e-6, 1. - 1e-6)
 
     def _simulate(self, d):
         d['p_el_mean'] = self.gimme_numpy('p_electron',
@@ -34,6 +34,9 @@ class ERSource(fd.BlockModelSource):
 
     final_dimensions = ('s1', 's2')
     no_step_dimensions = ()
+    # The produced photon domain is the widest, and sets the
+    # stepping shared by the quanta dimensions
+    sort_dimensions = ('photons_produced', 'electrons_produced')
 
 
 @export
@@ -50,6 +53,9 @@ class NRSource(fd.BlockModelSource):
 
     final_dimensions = ('s1', 's2')
     no_step_dimensions = ()
+    # The produced photon domain is the widest, and sets the
+    # stepping shared by the quanta dimensions
+    sort_dimensions = ('photons_produced', 'electrons_produced')
 
     # Use a larger default energy range, since most energy is lost
     # to heat.
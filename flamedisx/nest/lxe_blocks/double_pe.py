@@ -1,7 +1,6 @@
 import numpy as np
 from scipy import stats
 import tensorflow as tf
-import tensorflow_probability as tfp
 
 import flamedisx as fd
 export, __all__ = fd.exporter()
@@ -14,31 +13,23 @@ class MakePhotoelectrons(fd.Block):
     quanta_in_name: str
     quanta_out_name: str
 
+    # quanta_out is between quanta_in and
+    # (1 + ~double_pe_fraction) * quanta_in
+    banded = True
+
     def _compute(self, data_tensor, ptensor,
-                 quanta_in, quanta_out):
+                 quanta_in, quanta_out, log_space=False):
         p_dpe = self.gimme('double_pe_fraction',
                            data_tensor=data_tensor, ptensor=ptensor)[:, o, o]
 
-        # Double-pe emission only creates additional photoelectrons.
-        # Invalid values will get assigned p=0 later.
-        extra_pe = quanta_out - quanta_in
-        invalid = extra_pe < 0
-
-        # Negative arguments would mess up tfp's Binomial
-        extra_pe = tf.where(invalid,
-                            tf.zeros_like(extra_pe),
-                            extra_pe)
-
-        # (N_pe - N_photons) distributed as Binom(N_photons, p=pdpe)
-        result = tfp.distributions.Binomial(
-                total_count=quanta_in,
-                probs=tf.cast(p_dpe, dtype=fd.float_type())
-            ).prob(extra_pe)
+        # (N_pe - N_photons) distributed as Binom(N_photons, p=pdpe).
+        # Double-pe emission only creates additional photoelectrons;
+        # binom_logpmf gives p=0 for N_pe < N_photons.
+        result = fd.binom_logpmf(quanta_out - quanta_in, quanta_in, p_dpe)
+        return result if log_space else tf.exp(result)
 
-        # Set probability of extra_pe < 0 cases to 0
-        return tf.where(invalid,
-                        tf.zeros_like(quanta_out),
-                        result)
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        return self._compute(data_tensor, ptensor, log_space=True, **kwargs)
 
     def _simulate(self, d):
         d[self.quanta_out_name] = stats.binom.rvs(
@@ -69,11 +60,13 @@ class MakeS1Photoelectrons(MakePhotoelectrons):
     quanta_out_name = 's1_photoelectrons_produced'
 
     def _compute(self, data_tensor, ptensor,
-                 photons_detected, s1_photoelectrons_produced):
+                 photons_detected, s1_photoelectrons_produced,
+                 log_space=False):
         return super()._compute(
             quanta_in=photons_detected,
             quanta_out=s1_photoelectrons_produced,
-            data_tensor=data_tensor, ptensor=ptensor)
+            data_tensor=data_tensor, ptensor=ptensor,
+            log_space=log_space)
 
 
 @export
@@ -84,8 +77,10 @@ class MakeS2Photoelectrons(MakePhotoelectrons):
     quanta_out_name = 's2_photoelectrons_detected'
 
     def _compute(self, data_tensor, ptensor,
-                 s2_photons_detected, s2_photoelectrons_detected):
+                 s2_photons_detected, s2_photoelectrons_detected,
+                 log_space=False):
         return super()._compute(
             quanta_in=s2_photons_detected,
             quanta_out=s2_photoelectrons_detected,
-            data_tensor=data_tensor, ptensor=ptensor)
+            data_tensor=data_tensor, ptensor=ptensor,
+            log_space=log_space)
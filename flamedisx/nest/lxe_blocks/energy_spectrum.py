@@ -16,7 +16,8 @@ class EnergySpectrum(fd.FirstBlock):
         'energies',
         'radius', 'z_top', 'z_bottom', 'z_topDrift',
         'drift_velocity',
-        't_start', 't_stop')
+        't_start', 't_stop',
+        'mc_reservoir_size')
 
     # The default boundaries are at points where the WIMP wind is at its
     # average speed.
@@ -24,6 +25,13 @@ class EnergySpectrum(fd.FirstBlock):
     t_start = pd.to_datetime('2019-09-01T08:28:00')
     t_stop = pd.to_datetime('2020-09-01T08:28:00')
 
+    # Number of events simulated for the MC reservoir used in the
+    # energy bounds and priors computation, see Source.get_mc_reservoir
+    mc_reservoir_size = int(1e6)
+
+    # Energy bounds are shared within a batch
+    batch_annotation = True
+
     # Just a dummy 0-10 keV spectrum
     energies = tf.cast(tf.linspace(0., 10., 1000),
                        dtype=fd.float_type())
@@ -48,8 +56,9 @@ class EnergySpectrum(fd.FirstBlock):
                                               axis=0)}
 
     def _annotate(self, d):
-        # Generate an MC reservoir for obtaining energy bounds. Also use this for Bayes bounds priors
-        self.source.mc_reservoir = self.source.simulate(int(1e6), keep_padding=True)
+        # Generate an MC reservoir for obtaining energy bounds. Also use this for Bayes bounds priors.
+        # This is cached, so it is only simulated again when the source configuration changes.
+        self.source.mc_reservoir = self.source.get_mc_reservoir(self.mc_reservoir_size)
         assert not self.source.mc_reservoir.empty, \
             "MC reservoir used in energy bounds computation is empty. Are your cuts too tight?"
 
@@ -57,6 +66,7 @@ class EnergySpectrum(fd.FirstBlock):
         electrons_produced = self.source.mc_reservoir.columns.get_loc('electrons_produced')
         photons_produced = self.source.mc_reservoir.columns.get_loc('photons_produced')
         res = self.source.mc_reservoir.values
+        index = fd.bounds.IndexedReservoir(res, electrons_produced)
 
         # Same energy bounds for all events within a batch
         for batch in range(self.source.n_batches):
@@ -71,10 +81,11 @@ class EnergySpectrum(fd.FirstBlock):
                 batch * self.source.batch_size:(batch + 1) * self.source.batch_size])
 
             # We filter the reservoir energies by flat-prior Bayes bounds on electrons/photons produced
-            energies = res[:, energy][(res[:, electrons_produced] >= electrons_produced_min)
-                                      & (res[:, electrons_produced] <= electrons_produced_max)
-                                      & (res[:, photons_produced] >= photons_produced_min)
-                                      & (res[:, photons_produced] <= photons_produced_max)]
+            energies = res[index.select(
+                mins={electrons_produced: electrons_produced_min,
+                      photons_produced: photons_produced_min},
+                maxs={electrons_produced: electrons_produced_max,
+                      photons_produced: photons_produced_max}), energy]
 
             # We use this filtered reservoir to estimate energy bounds
             self.source.data.loc[batch * self.source.batch_size:
@@ -58,7 +58,7 @@ class MakeFinalSignals(fd.Block):
 
     def _compute(self,
                  photoelectrons_detected, s_observed,
-                 data_tensor, ptensor):
+                 data_tensor, ptensor, log_space=False):
         mean = self.gimme(
             self.signal_name + '_spe_mean',
             bonus_arg=photoelectrons_detected,
@@ -71,14 +71,19 @@ class MakeFinalSignals(fd.Block):
             ptensor=ptensor)
 
         # add offset to std to avoid NaNs from norm.pdf if std = 0
-        result = tfp.distributions.Normal(
-            loc=mean, scale=std + 1e-10
-        ).prob(s_observed)
+        normal = tfp.distributions.Normal(loc=mean, scale=std + 1e-10)
 
         # Add detection/selection efficiency
-        result *= self.gimme(self.signal_name + '_acceptance',
-                             data_tensor=data_tensor, ptensor=ptensor)[:, o, o]
-        return result
+        acceptance = self.gimme(self.signal_name + '_acceptance',
+                                data_tensor=data_tensor,
+                                ptensor=ptensor)[:, o, o]
+        if log_space:
+            return normal.log_prob(s_observed) + fd.safe_log(acceptance)
+        return normal.prob(s_observed) * acceptance
+
+    def _compute_log(self, data_tensor, ptensor, **kwargs):
+        # Far in the tails of the Gaussian, log_prob is still accurate
+        return self._compute(data_tensor, ptensor, log_space=True, **kwargs)
 
     def check_data(self):
         if not self.check_acceptances:
@@ -115,11 +120,11 @@ class MakeS1(MakeFinalSignals):
         return reconstruction_bias
 
     def _compute(self, data_tensor, ptensor,
-                 s1_photoelectrons_detected, s1):
+                 s1_photoelectrons_detected, s1, log_space=False):
         return super()._compute(
             photoelectrons_detected=s1_photoelectrons_detected,
             s_observed=s1,
-            data_tensor=data_tensor, ptensor=ptensor)
+            data_tensor=data_tensor, ptensor=ptensor, log_space=log_space)
 
 
 @export
@@ -147,8 +152,8 @@ class MakeS2(MakeFinalSignals):
         return reconstruction_bias
 
     def _compute(self, data_tensor, ptensor,
-                 s2_photoelectrons_detected, s2):
+                 s2_photoelectrons_detected, s2, log_space=False):
         return super()._compute(
             photoelectrons_detected=s2_photoelectrons_detected,
             s_observed=s2,
-            data_tensor=data_tensor, ptensor=ptensor)
+            data_tensor=data_tensor, ptensor=ptensor, log_space=log_space)
@@ -1,7 +1,6 @@
 import numpy as np
 from scipy import stats
 import tensorflow as tf
-import tensorflow_probability as tfp
 
 import flamedisx as fd
 export, __all__ = fd.exporter()
@@ -21,10 +20,9 @@ class DetectS1Photoelectrons(fd.Block):
                            bonus_arg=s1_photoelectrons_produced,
                            data_tensor=data_tensor, ptensor=ptensor)
 
-        result = tfp.distributions.Binomial(
-                total_count=s1_photoelectrons_produced,
-                probs=tf.cast(p_det, dtype=fd.float_type())
-            ).prob(s1_photoelectrons_detected)
+        result = tf.exp(fd.binom_logpmf(s1_photoelectrons_detected,
+                                        s1_photoelectrons_produced,
+                                        p_det))
 
         result = tf.where(tf.math.is_nan(result),
                           tf.zeros_like(result, dtype=fd.float_type()),
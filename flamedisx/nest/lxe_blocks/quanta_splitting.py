@@ -49,9 +49,7 @@ class MakePhotonsElectronsNR(fd.Block):
             rate_vs_energy = args[1]
             ions_min = args[2]
 
-            ions_min = tf.repeat(ions_min[:, o], tf.shape(ions_produced)[1], axis=1)
-            ions_min = tf.repeat(ions_min[:, :, o], tf.shape(ions_produced)[2], axis=2)
-            ions_min = tf.repeat(ions_min[:, :, :, o], tf.shape(ions_produced)[3], axis=3)
+            ions_min = ions_min[:, o, o, o]
 
             # Calculate the ion domain tensor for this energy
             _ions_produced = ions_produced_add + ions_min
@@ -76,8 +74,7 @@ class MakePhotonsElectronsNR(fd.Block):
                                       bonus_arg=energy)
                 alpha = 1. / (1. + ex_ratio)
 
-                p_ni = tfp.distributions.Binomial(
-                    total_count=nq, probs=alpha).prob(_ions_produced)
+                p_ni = tf.exp(fd.binom_logpmf(_ions_produced, nq, alpha))
 
             else:
                 yields = self.gimme('mean_yields', data_tensor=data_tensor, ptensor=ptensor,
@@ -124,20 +121,13 @@ class MakePhotonsElectronsNR(fd.Block):
             mean = (tf.ones_like(_ions_produced, dtype=fd.float_type()) - recomb_p) * _ions_produced - mu_corr
             std_dev = tf.sqrt(var) / width_corr
 
-            if self.is_ER:
-                owens_t_terms = 5
-            else:
-                owens_t_terms = 2
-
             if approx:
                 p_nel = fd.tfp_files.SkewGaussian(loc=mean, scale=std_dev,
-                                                  skewness=skew,
-                                                  owens_t_terms=owens_t_terms).prob(electrons_produced)
+                                                  skewness=skew).prob(electrons_produced)
             else:
                 p_nel = fd.tfp_files.TruncatedSkewGaussianCC(loc=mean, scale=std_dev,
                                                              skewness=skew,
-                                                             limit=_ions_produced,
-                                                             owens_t_terms=owens_t_terms).prob(electrons_produced)
+                                                             limit=_ions_produced).prob(electrons_produced)
 
             p_mult = p_nq * p_ni * p_nel
 
@@ -163,10 +153,7 @@ class MakePhotonsElectronsNR(fd.Block):
 
         nq = electrons_produced + photons_produced
 
-        ions_min_initial = self.source._fetch('ions_produced_min', data_tensor=data_tensor)[:, 0, o]
-        ions_min_initial = tf.repeat(ions_min_initial, tf.shape(ions_produced)[1], axis=1)
-        ions_min_initial = tf.repeat(ions_min_initial[:, :, o], tf.shape(ions_produced)[2], axis=2)
-        ions_min_initial = tf.repeat(ions_min_initial[:, :, :, o], tf.shape(ions_produced)[3], axis=3)
+        ions_min_initial = self.source._fetch('ions_produced_min', data_tensor=data_tensor)[:, 0, o, o, o]
 
         # Work out the difference between each point in the ion domain and the lower bound,
         # for the lowest energy
@@ -397,15 +384,12 @@ class MakePhotonsElectronsNR(fd.Block):
         ions_range = tf.range(tf.reduce_max(self.source._fetch('ions_produced_dimsizes', data_tensor=d))) * steps
         ions_domain_initial = ions_min_initial + ions_range
 
-        electrons = tf.repeat(electrons_domain[:, :, o], tf.shape(photons_domain)[1], axis=2)
-        electrons = tf.repeat(electrons[:, :, :, o], tf.shape(ions_domain_initial)[1], axis=3)
-
-        photons = tf.repeat(photons_domain[:, o, :], tf.shape(electrons_domain)[1], axis=1)
-        photons = tf.repeat(photons[:, :, :, o], tf.shape(ions_domain_initial)[1], axis=3)
-
+        # These broadcast to (n_events, |nel|, |nph|, |nions|),
+        # see Source.cross_domains
+        electrons = electrons_domain[:, :, o, o]
+        photons = photons_domain[:, o, :, o]
         # We construct the ions domain for only the lowest energy; this is modified later
-        ions = tf.repeat(ions_domain_initial[:, o, :], tf.shape(electrons_domain)[1], axis=1)
-        ions = tf.repeat(ions[:, :, o, :], tf.shape(photons_domain)[1], axis=2)
+        ions = ions_domain_initial[:, o, o, :]
 
         return dict({'electrons_produced': electrons,
                      'photons_produced': photons,
@@ -7,7 +7,7 @@ import flamedisx as fd
 from .. import nest as fd_nest
 
 import math as m
-pi = tf.constant(m.pi)
+pi = m.pi
 
 export, __all__ = fd.exporter()
 o = tf.newaxis
@@ -116,7 +116,7 @@ class nestSource(fd.BlockModelSource):
         var = tf.cast(args[1], fd.float_type())
         width_corr = tf.cast(args[2], fd.float_type())
 
-        return (tf.sqrt(var) / width_corr) * (skew / tf.sqrt(1. + skew * skew)) * tf.sqrt(2. / pi)
+        return (tf.sqrt(var) / width_corr) * (skew / tf.sqrt(1. + skew * skew)) * (2. / pi) ** 0.5
 
     # detection.py
 
@@ -145,7 +145,8 @@ class nestSource(fd.BlockModelSource):
             4.70e-18 * (N_AVAGADRO * self.density_gas / A_XENON)) \
             * self.gas_gap * 0.1
 
-        return tf.sqrt(self.s2Fano * elYield) * tf.ones_like(z)
+        return tf.cast(tf.sqrt(self.s2Fano * elYield), fd.float_type()) \
+            * tf.ones_like(z)
 
     # pe_detection.py
 
@@ -156,7 +157,7 @@ class nestSource(fd.BlockModelSource):
             self.spe_eff)
         eff_trunc = tf.where(
             eff > 1.,
-            1.,
+            tf.ones_like(eff),
             eff)
 
         return 1. - (1. - eff_trunc) / (1. + self.double_pe_fraction)
@@ -279,7 +280,8 @@ class nestERSource(nestSource):
         skew = 1. / (1. + tf.exp((energy - E2) / E3)) * \
             (alpha0 + cc0 * tf.exp(-1. * self.drift_field / F0) * (1. - tf.exp(-1. * energy / E0))) + \
             1. / (1. + tf.exp(-1. * (energy - E2) / E3)) * cc1 * tf.exp(-1. * energy / E1) * \
-            tf.exp(-1. * tf.sqrt(self.drift_field) / tf.sqrt(F1))
+            tf.exp(-1. * tf.sqrt(tf.cast(self.drift_field, fd.float_type()))
+                    / tf.sqrt(F1))
 
         mask_quanta = tf.less(nq_mean, 10000*tf.ones_like(nq_mean))
         mask_field_low = tf.greater(self.drift_field*tf.ones_like(nq_mean), 50.*tf.ones_like(nq_mean))
@@ -311,12 +313,13 @@ class nestERSource(nestSource):
         cntr = er_free_d
         skew = er_free_e
 
-        mode = cntr + 2. / (tf.sqrt(2. * pi)) * skew * wide / tf.sqrt(1. + skew * skew)
-        norm = 1. / (tf.exp(-0.5 * pow(mode - cntr, 2.) / (wide * wide)) *
-                     (1. + tf.math.erf(skew * (mode - cntr) / (wide * tf.sqrt(2.)))))
+        # Constants, so compute these in python
+        mode = cntr + 2. / m.sqrt(2. * pi) * skew * wide / m.sqrt(1. + skew * skew)
+        norm = 1. / (m.exp(-0.5 * pow(mode - cntr, 2.) / (wide * wide)) *
+                     (1. + m.erf(skew * (mode - cntr) / (wide * m.sqrt(2.)))))
 
         omega = norm * ampl * tf.exp(-0.5 * pow(elec_frac - cntr, 2.) / (wide * wide)) * \
-            (1. + tf.math.erf(skew * (elec_frac - cntr) / (wide * tf.sqrt(2.))))
+            (1. + tf.math.erf(skew * (elec_frac - cntr) / (wide * 2. ** 0.5)))
         omega = tf.where(nq_mean == 0,
                          tf.zeros_like(omega, dtype=fd.float_type()),
                          omega)
@@ -1,6 +1,14 @@
+from concurrent.futures import ProcessPoolExecutor
 from copy import copy
 from contextlib import contextmanager
 import inspect
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import types
 import typing as ty
 import warnings
 
@@ -16,6 +24,21 @@ export, __all__ = fd.exporter()
 
 o = tf.newaxis
 
+#: Maximum number of MC reservoirs kept in memory, see
+#: Source.get_mc_reservoir
+MC_RESERVOIR_CACHE_SIZE = 4
+
+# MC reservoirs by key, least recently used first
+_mc_reservoir_cache = dict()
+
+
+@export
+def clear_mc_reservoir_cache():
+    """Remove all MC reservoirs from the in-memory cache.
+    Reservoirs cached on disk (see Source.cache_dir) are kept.
+    """
+    _mc_reservoir_cache.clear()
+
 
 @export
 class Source:
@@ -58,6 +81,11 @@ class Source:
     #: for which the domain is always a single interval of integers
     no_step_dimensions: ty.Tuple[str] = tuple()
 
+    #: inner_dimensions whose domain widths are used to sort events
+    #: if sort_by_dimsizes is True, most significant first.
+    #: If empty, sort by the product of all inner_dimensions' widths.
+    sort_dimensions: ty.Tuple[str] = tuple()
+
     #: Names of dimensions of hidden variables for which
     #: dimsize calculations are NOT done here (but in user-defined code)
     #: but for which we DO track _min and _dimsizes
@@ -87,6 +115,11 @@ class Source:
     #: The fully annotated event data
     data: pd.DataFrame = None
 
+    #: If events were sorted by domain size (see sort_by_dimsizes),
+    #: event_order[i] is the index in the original data of the i-th event
+    #: in self.data and self.data_tensor. None if events were not sorted.
+    event_order: np.ndarray = None
+
     ##
     # Initialization and helpers
     ##
@@ -197,6 +230,9 @@ class Source:
                  _skip_bounds_computation=False,
                  fit_params=None,
                  progress=False,
+                 sort_by_dimsizes=False,
+                 cache_dir=None,
+                 jit_compile=False,
                  **params):
         """Initialize a flamedisx source
 
@@ -212,6 +248,23 @@ class Source:
         :param fit_params: List of parameters to fit
         :param progress: whether to show progress bars for mu estimation
             (if data is not None)
+        :param sort_by_dimsizes: If True, sort events by the size of their
+            hidden variable domains before batching, so small events are not
+            padded to the domain of the largest event in the data.
+            Results of batched_differential_rate are returned in the
+            original order. Bounds computed for each event separately are
+            kept from the sorting, only batch-level steps are redone.
+        :param cache_dir: Directory in which to cache the annotated data
+            and data tensor. If set_data is called with the same data and
+            source configuration, the cached results are loaded instead of
+            annotating the data again. MC reservoirs (see
+            get_mc_reservoir) are also stored here. If None, only
+            MC reservoirs are cached, in memory.
+        :param jit_compile: If True, compile the differential rate with XLA,
+            which fuses the many elementwise operations of the model. If XLA
+            cannot compile the source (e.g. because a domain size depends on
+            the data), this falls back to a regular tf.function with a
+            warning. See fd.XLAFunction.
         :param params: New defaults to for parameters, and new values for
         constant-valued model functions.
         """
@@ -280,11 +333,16 @@ class Source:
         # A source may choose to fill these in for improved bounds computation.
         # See bounds.py for details
         self.mc_reservoir = pd.DataFrame()
+        self._mc_reservoir_key = None
         self.prior_PDFs_LB = tuple(dict())
         self.prior_PDFs_UB = tuple(dict())
 
         self.set_defaults(**params)
 
+        self.sort_by_dimsizes = sort_by_dimsizes
+        self.cache_dir = cache_dir
+        self.jit_compile = jit_compile
+
         if fit_params is None:
             fit_params = list(self.defaults.keys())
         # Filter out parameters the source does not use
@@ -339,17 +397,61 @@ class Source:
         if unused:
             warnings.warn(f"Defaults for unused settings ignored: {unused}")
 
+        # Tensors in model attributes are often made at import time,
+        # before fd.set_float_type could have been called
+        for k in self.model_attributes + self.model_functions:
+            v = getattr(self, k, None)
+            if (isinstance(v, tf.Tensor) and v.dtype.is_floating
+                    and v.dtype != fd.float_type()):
+                setattr(self, k, tf.cast(v, fd.float_type()))
+
     def set_data(self,
                  data=None,
                  data_is_annotated=False,
                  _skip_tf_init=False,
                  _skip_bounds_computation=False,
+                 event_order=None,
+                 n_workers=1,
                  **params):
+        """Set new data for the source
+
+        :param event_order: array of indices in data giving the order in
+            which events are batched. If not given, and sort_by_dimsizes is
+            True, events are sorted by the size of their hidden variable
+            domains.
+        :param n_workers: Number of processes to annotate the data with.
+            Each process annotates a contiguous range of whole batches.
+        """
         self.set_defaults(**params)
 
         if data is None:
             self.data = self.n_batches = self.n_padding = None
+            self.event_order = None
             return
+
+        cache_key = None
+        if (self.cache_dir is not None and not data_is_annotated
+                and not _skip_tf_init and not _skip_bounds_computation):
+            cache_key = self.annotation_cache_key(data, event_order)
+            if self._load_annotation_cache(cache_key):
+                self._extend_log_factorials()
+                return
+
+        # Whether data already has the columns of _annotate_events
+        events_annotated = False
+        if not _skip_tf_init:
+            if (event_order is None and self.sort_by_dimsizes
+                    and not _skip_bounds_computation):
+                event_order, annotated = self._dimsize_order(
+                    data, data_is_annotated=data_is_annotated,
+                    n_workers=n_workers)
+                if annotated is not None:
+                    # Keep the per-event annotation done for sorting
+                    data, events_annotated = annotated, True
+            if event_order is not None:
+                data = data.iloc[event_order]
+            self.event_order = event_order
+
         self.data = data
         del data
 
@@ -371,14 +473,295 @@ class Source:
                 self.data = pd.concat([self.data, df_pad], ignore_index=True)
             self.data = self.data.reset_index(drop=True)
         if not data_is_annotated:
-            self.add_extra_columns(self.data)
+            if (n_workers > 1 and self.n_batches > 1
+                    and not _skip_bounds_computation):
+                self._annotate_parallel(n_workers, events_annotated)
+            elif events_annotated:
+                self._annotate(_events_annotated=True)
+            else:
+                self.add_extra_columns(self.data)
+                if not _skip_bounds_computation:
+                    self._annotate()
             if not _skip_bounds_computation:
-                self._annotate()
                 self._calculate_dimsizes()
 
         if not _skip_tf_init:
             self._check_data()
             self._populate_tensor_cache()
+            self._extend_log_factorials()
+
+        if cache_key is not None:
+            self._save_annotation_cache(cache_key)
+
+    def _hashable_config(self):
+        """Return dictionary describing the source class, its defaults,
+        model attributes and constant model functions, the code of the
+        source and block classes, the float type and the flamedisx version,
+        for use in cache keys"""
+        def to_hashable(x):
+            if isinstance(x, (tf.Tensor, tf.Variable)):
+                x = x.numpy()
+            if isinstance(x, np.ndarray):
+                return x.tolist()
+            if isinstance(x, np.generic):
+                return x.item()
+            if callable(x):
+                return [getattr(x, '__qualname__', repr(x)), _code_key(x)]
+            if isinstance(x, (dict, list, tuple, str, int, float, bool)) \
+                    or x is None:
+                return x
+            return repr(x)
+
+        return dict(
+            flamedisx_version=fd.__version__,
+            float_type=fd.float_type().name,
+            source_class=(self.__class__.__module__ + '.'
+                          + self.__class__.__qualname__),
+            defaults={k: to_hashable(v) for k, v in self.defaults.items()},
+            attributes={
+                k: to_hashable(getattr(self, k))
+                for k in self.model_attributes + self.model_functions
+                if not callable(getattr(self, k))},
+            max_dim_sizes={k: to_hashable(v)
+                           for k, v in self.max_dim_sizes.items()},
+            # Classes redefined under the same name (e.g. in a notebook)
+            # must not reuse cached results
+            code=[_class_code_key(c) for c in [self.__class__] + [
+                b.__class__ for b in getattr(self, 'model_blocks', [])]])
+
+    def annotation_cache_key(self, data, event_order=None):
+        """Return key under which annotation results of data are cached.
+
+        The key covers the data, the source class, its defaults, model
+        attributes and constant model functions, the bounds and batching
+        settings, and the flamedisx version. It covers the code of the
+        source and block classes (including model functions), but not of
+        functions they call, nor values captured in closures.
+        """
+        data_hash = pd.util.hash_pandas_object(data, index=True).values
+        if event_order is not None:
+            event_order = np.asarray(event_order).tolist()
+        config = dict(
+            **self._hashable_config(),
+            bounds_prob=self.bounds_prob,
+            bounds_prob_outer=self.bounds_prob_outer,
+            batch_size=self.batch_size,
+            sort_by_dimsizes=self.sort_by_dimsizes,
+            event_order=event_order,
+            columns=list(data.columns),
+            data=fd.deterministic_hash(data_hash.tolist(), length=32))
+        return fd.deterministic_hash(config, length=32)
+
+    def mc_reservoir_key(self, n_events):
+        """Return key under which an MC reservoir of n_events events,
+        simulated with the current defaults, is cached.
+
+        Like annotation_cache_key, this covers the code of the source and
+        block classes, but not of functions they call.
+        """
+        return fd.deterministic_hash(
+            dict(**self._hashable_config(), n_events=int(n_events)),
+            length=32)
+
+    def get_mc_reservoir(self, n_events):
+        """Return dataframe of n_events events (including those lost to
+        efficiencies) simulated with the current defaults, for use as
+        source.mc_reservoir in bounds computations.
+
+        Reservoirs are cached in memory, shared between sources with the
+        same configuration, and on disk if cache_dir is set. They are only
+        simulated again if the source configuration or defaults change,
+        or after invalidate_mc_reservoir or fd.clear_mc_reservoir_cache.
+
+        Do NOT mutate the result, since it is shared.
+        """
+        key = self.mc_reservoir_key(n_events)
+        self._mc_reservoir_key = key
+        if key in _mc_reservoir_cache:
+            # Move to the end, as most recently used
+            _mc_reservoir_cache[key] = _mc_reservoir_cache.pop(key)
+            return _mc_reservoir_cache[key]
+
+        path = None
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, f'mc_reservoir_{key}.pkl')
+        if path is not None and os.path.exists(path):
+            reservoir = pd.read_pickle(path)
+        else:
+            reservoir = self.simulate(int(n_events), keep_padding=True)
+            if path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Write to a temporary file first, so other processes
+                # never see a partially written reservoir
+                fd_tmp, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+                os.close(fd_tmp)
+                reservoir.to_pickle(tmp_path)
+                os.replace(tmp_path, path)
+
+        _mc_reservoir_cache[key] = reservoir
+        while len(_mc_reservoir_cache) > MC_RESERVOIR_CACHE_SIZE:
+            del _mc_reservoir_cache[next(iter(_mc_reservoir_cache))]
+        return reservoir
+
+    def invalidate_mc_reservoir(self):
+        """Remove the MC reservoir last used by this source from the
+        in-memory and on-disk caches, so it is simulated again the
+        next time data is annotated."""
+        key = self._mc_reservoir_key
+        self.mc_reservoir = pd.DataFrame()
+        self._mc_reservoir_key = None
+        if key is None:
+            return
+        _mc_reservoir_cache.pop(key, None)
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, f'mc_reservoir_{key}.pkl')
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load_annotation_cache(self, key):
+        """Load annotated data and data tensor cached under key,
+        return whether this succeeded"""
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(path):
+            return False
+        with open(os.path.join(path, 'metadata.json')) as f:
+            metadata = json.load(f)
+
+        columns = dict()
+        for i, column in enumerate(metadata['columns']):
+            fn = os.path.join(path, f'column_{i}.npy')
+            if column in metadata['object_columns']:
+                columns[column] = np.load(fn, allow_pickle=True)
+            else:
+                columns[column] = np.load(fn, mmap_mode='r')
+        self.data = pd.DataFrame(columns)
+        self.n_events = metadata['n_events']
+        self.n_padding = metadata['n_padding']
+        self.n_batches = metadata['n_batches']
+        self.event_order = metadata['event_order']
+        if self.event_order is not None:
+            self.event_order = np.array(self.event_order)
+        self.data_tensor = tf.convert_to_tensor(
+            np.load(os.path.join(path, 'data_tensor.npy'), mmap_mode='r'))
+        return True
+
+    def _save_annotation_cache(self, key):
+        """Store annotated data and data tensor under key"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temporary directory first, so other processes
+        # never see a partially written cache entry
+        tmp_path = tempfile.mkdtemp(dir=self.cache_dir)
+        object_columns = []
+        for i, column in enumerate(self.data.columns):
+            x = self.data[column].values
+            if x.dtype == object:
+                object_columns.append(column)
+            np.save(os.path.join(tmp_path, f'column_{i}.npy'), x,
+                    allow_pickle=x.dtype == object)
+        np.save(os.path.join(tmp_path, 'data_tensor.npy'),
+                self.data_tensor.numpy())
+        metadata = dict(
+            columns=list(self.data.columns),
+            object_columns=object_columns,
+            n_events=int(self.n_events),
+            n_padding=int(self.n_padding),
+            n_batches=int(self.n_batches),
+            event_order=(None if self.event_order is None
+                         else np.asarray(self.event_order).tolist()))
+        with open(os.path.join(tmp_path, 'metadata.json'), mode='w') as f:
+            json.dump(metadata, f)
+        try:
+            os.rename(tmp_path, os.path.join(self.cache_dir, key))
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_path)
+
+    def _annotate_parallel(self, n_workers, events_annotated=False):
+        """Annotate self.data in n_workers processes.
+
+        Each process gets a contiguous range of whole batches, so
+        batch-level quantities (e.g. shared energy bounds) are the same as
+        when annotating in a single process. Dimension sizes, which can
+        depend on neighbouring batches, are computed afterwards.
+        The MC reservoir (see get_mc_reservoir), if the source uses one,
+        is simulated once here and sent to all processes.
+        """
+        n_chunks = min(n_workers, self.n_batches)
+        edges = self.batch_size * np.round(
+            np.linspace(0, self.n_batches, n_chunks + 1)).astype(int)
+        chunks = [self.data.iloc[start:stop]
+                  for start, stop in zip(edges[:-1], edges[1:])]
+
+        # Sources with an mc_reservoir_size (e.g. the NEST sources) use an
+        # MC reservoir for bounds. Each process would otherwise simulate
+        # its own, with different random numbers.
+        reservoirs = dict()
+        n_reservoir = getattr(self, 'mc_reservoir_size', None)
+        if n_reservoir is not None:
+            reservoirs[self.mc_reservoir_key(n_reservoir)] = \
+                self.get_mc_reservoir(n_reservoir)
+
+        # Send the source without its data. Other annotation state
+        # is rebuilt in each process.
+        saved = self.data, self.mc_reservoir
+        self.data, self.mc_reservoir = None, pd.DataFrame()
+        try:
+            source_pickle = pickle.dumps(self)
+        finally:
+            self.data, self.mc_reservoir = saved
+
+        # Tensorflow is not fork-safe, so start fresh processes
+        with ProcessPoolExecutor(
+                n_chunks,
+                mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_annotate_chunk,
+                                    [source_pickle] * n_chunks,
+                                    chunks,
+                                    [events_annotated] * n_chunks,
+                                    [reservoirs] * n_chunks))
+        self.data = pd.concat(results, ignore_index=True)
+
+    def dimsize_order(self, data, data_is_annotated=False, n_workers=1):
+        """Return indices that sort events in data by the size of their
+        hidden variable domains, smallest first.
+
+        Unless data_is_annotated, this annotates (a copy of) data,
+        since the domain sizes are only known after annotation.
+        """
+        return self._dimsize_order(data, data_is_annotated, n_workers)[0]
+
+    def _dimsize_order(self, data, data_is_annotated=False, n_workers=1):
+        """Return (order, annotated), with order as in dimsize_order.
+        If the source supports _annotate_events, annotated is a copy of
+        data with only the per-event annotation, else None.
+        """
+        annotated = None
+        if not data_is_annotated:
+            annotated = data.copy()
+            self.add_extra_columns(annotated)
+            with self._set_temporarily(annotated, data_is_annotated=True):
+                if not self._annotate_events():
+                    annotated = None
+            if annotated is None:
+                with self._set_temporarily(data.copy(), n_workers=n_workers):
+                    data = self.data
+            else:
+                data = annotated
+        # Use each event's own (uncapped) bounds: capping, stepping and
+        # batch-level equalization are redone after sorting. Bounds set for
+        # whole batches are not (yet) known if annotated is not None.
+        widths = {
+            dim: (data[dim + '_max'].values
+                  - data[dim + '_min'].values + 1).clip(1, None)
+            for dim in self.inner_dimensions
+            if dim + '_max' in data.columns}
+        if self.sort_dimensions:
+            order = np.lexsort([widths[dim]
+                                for dim in self.sort_dimensions[::-1]])
+        else:
+            order = np.argsort(np.prod(list(widths.values()), axis=0),
+                               kind='stable')
+        return order, annotated
 
     def _check_data(self):
         """Do any final checks on the self.data dataframe,
@@ -423,6 +806,20 @@ class Source:
         result = tf.concat(result, axis=1)
         self.data_tensor = tf.reshape(result, shape)
 
+    def _extend_log_factorials(self):
+        """Extend the table of fd.log_factorial to cover the largest
+        value in the domains of the hidden dimensions, and sums of two
+        such values (e.g. electrons plus photons produced)"""
+        n_max = 0
+        for dim in self.inner_dimensions + self.bonus_dimensions:
+            if dim + '_dimsizes' not in self.data.columns:
+                continue
+            n_max = max(n_max, np.max(
+                self.data[dim + '_min'].values
+                + self.data[dim + '_steps'].values
+                * (self.data[dim + '_dimsizes'].max() - 1)))
+        fd.extend_log_factorials(2 * n_max)
+
     def cap_dimsizes(self, dim, cap):
         if dim in self.no_step_dimensions:
             pass
@@ -605,7 +1002,13 @@ class Source:
             y.append(fd.tf_to_np(self.differential_rate(data_tensor=q,
                                                         **params)))
 
-        return np.concatenate(y)[:self.n_events]
+        y = np.concatenate(y)[:self.n_events]
+        if self.event_order is None:
+            return y
+        # Restore the original order of the events
+        result = np.empty_like(y)
+        result[self.event_order] = y
+        return result
 
     def _batch_data_tensor_shape(self):
         return [self.batch_size, self.n_columns_in_data_tensor]
@@ -617,9 +1020,13 @@ class Source:
                           dtype=fd.float_type()),
             tf.TensorSpec(shape=[len(self.parameter_index)],
                           dtype=fd.float_type()))
-        self._differential_rate_tf = tf.function(
+        trace = fd.XLAFunction if self.jit_compile else tf.function
+        self._differential_rate_tf = trace(
             self._differential_rate,
             input_signature=input_signature)
+        self._log_differential_rate_tf = trace(
+            self._log_differential_rate,
+            input_signature=input_signature)
 
     def differential_rate(self, data_tensor=None, autograph=True, **kwargs):
         ptensor = self.ptensor_from_kwargs(**kwargs)
@@ -630,9 +1037,21 @@ class Source:
             return self._differential_rate(
                 data_tensor=data_tensor, ptensor=ptensor)
 
+    def log_differential_rate(self, data_tensor=None, autograph=True,
+                              **kwargs):
+        """Return log of the differential rate, see differential_rate"""
+        ptensor = self.ptensor_from_kwargs(**kwargs)
+        if autograph and self.trace_difrate:
+            return self._log_differential_rate_tf(
+                data_tensor=data_tensor, ptensor=ptensor)
+        else:
+            return self._log_differential_rate(
+                data_tensor=data_tensor, ptensor=ptensor)
+
     def ptensor_from_kwargs(self, **kwargs):
         return tf.convert_to_tensor([kwargs.get(k, self.defaults[k])
-                                     for k in self.defaults])
+                                     for k in self.defaults],
+                                    dtype=fd.float_type())
 
     ##
     # Helpers for response model implementation
@@ -655,15 +1074,17 @@ class Source:
         return left_bound + x_range
 
     def cross_domains(self, x, y, data_tensor):
-        """Return (x, y) two-tuple of (n_events, n_x, n_y) tensors
-        containing possible integer values of x and y, respectively.
+        """Return (x, y) two-tuple of (n_events, n_x, 1) and
+        (n_events, 1, n_y) tensors containing possible integer values
+        of x and y, respectively.
+
+        These broadcast to (n_events, n_x, n_y) in elementwise operations,
+        without storing the full grid of values for each domain.
         """
         # TODO: somehow mask unnecessary elements and save computation time
         x_domain = self.domain(x, data_tensor)
         y_domain = self.domain(y, data_tensor)
-        result_x = tf.repeat(x_domain[:, :, o], tf.shape(y_domain)[1], axis=2)
-        result_y = tf.repeat(y_domain[:, o, :], tf.shape(x_domain)[1], axis=1)
-        return result_x, result_y
+        return x_domain[:, :, o], y_domain[:, o, :]
 
     ##
     # Simulation methods and helpers
@@ -746,6 +1167,16 @@ class Source:
         """Add columns needed in inference to self.data
         """
 
+    def _annotate_events(self):
+        """Add the columns of _annotate to self.data that are computed
+        for each event separately, i.e. that do not depend on how events
+        are batched. Used to sort events before batching.
+
+        Return whether this is supported. If so,
+        _annotate(_events_annotated=True) must add the remaining columns.
+        """
+        return False
+
     def add_extra_columns(self, data):
         """Add additional columns to data
 
@@ -770,6 +1201,11 @@ class Source:
         """
         return self.data
 
+    def _log_differential_rate(self, data_tensor, ptensor):
+        """Return log of the differential rate. Override this if the
+        source can compute it without underflow."""
+        return fd.safe_log(self._differential_rate(data_tensor, ptensor))
+
     def calculate_dimsizes_special(self):
         pass
 
@@ -797,3 +1233,64 @@ class ColumnSource(Source):
 
     def _differential_rate(self, data_tensor, ptensor):
         return self._fetch(self.column, data_tensor)
+
+
+def _code_key(x):
+    """Return a JSON-serializable description of the code of function x
+    (its bytecode, constants and names), or None if x has no Python code"""
+    x = getattr(x, '__func__', x)   # methods, staticmethods, classmethods
+    x = getattr(x, 'python_function', x)   # tf.functions
+    code = getattr(x, '__code__', x)
+    if not isinstance(code, types.CodeType):
+        return None
+    consts = []
+    for c in code.co_consts:
+        if isinstance(c, types.CodeType):
+            # e.g. lambdas, whose repr contains their memory address
+            consts.append(_code_key(c))
+        elif isinstance(c, frozenset):
+            consts.append(sorted(repr(y) for y in c))
+        else:
+            consts.append(repr(c))
+    return [code.co_code.hex(), consts, list(code.co_names)]
+
+
+def _class_code_key(cls):
+    """Return a JSON-serializable description of the code of the
+    functions defined in cls and its base classes"""
+    result = dict()
+    for c in cls.__mro__[:-1]:   # Skip object
+        result[c.__module__ + '.' + c.__qualname__] = {
+            k: _code_key(v) for k, v in sorted(vars(c).items())
+            if _code_key(v) is not None}
+    return result
+
+
+def _annotate_chunk(source_pickle, data, events_annotated=False,
+                    reservoirs=None):
+    """Return data (a range of whole batches) annotated by the pickled
+    source. Used by Source._annotate_parallel in worker processes.
+
+    :param events_annotated: If True, data already has the columns of
+        source._annotate_events.
+    :param reservoirs: {key: MC reservoir} from the parent process,
+        see Source.get_mc_reservoir
+    """
+    if reservoirs:
+        _mc_reservoir_cache.update(reservoirs)
+    source = pickle.loads(source_pickle)
+    source.prior_PDFs_LB = source.prior_PDFs_UB = tuple()
+    source.data = data.reset_index(drop=True)
+    source.n_events = len(data)
+    source.n_padding = 0
+    source.n_batches = np.ceil(len(data) / source.batch_size).astype(int)
+    if events_annotated:
+        source._annotate(_events_annotated=True)
+    else:
+        source.add_extra_columns(source.data)
+        source._annotate()
+    if reservoirs and source._mc_reservoir_key not in reservoirs:
+        raise RuntimeError(
+            "Worker process used a different MC reservoir than its parent; "
+            "does the source configuration depend on the process?")
+    return source.data
@@ -12,9 +12,9 @@ import numpy as np
 import tensorflow.compat.v2 as tf
 
 import functools
+import warnings
 
 from tensorflow_probability.python.distributions import distribution
-from tensorflow_probability.python.distributions import normal
 from tensorflow_probability.python.internal import assert_util
 from tensorflow_probability.python.internal import dtype_util
 from tensorflow_probability.python.internal import prefer_static
@@ -48,10 +48,11 @@ class SkewGaussian(distribution.Distribution):
                loc,
                scale,
                skewness,
-               owens_t_terms=2,
+               owens_t_points=6,
                validate_args=False,
                allow_nan_stats=True,
-               name='SkewGaussian'):
+               name='SkewGaussian',
+               owens_t_terms=None):
     """Construct Skew Gaussian distributions with mean, stddev and skewness `loc`, `scale` and `skewness`.
 
     The parameters must be shaped in a way that supports
@@ -62,7 +63,8 @@ class SkewGaussian(distribution.Distribution):
       scale: Floating point tensor; the stddevs of the distribution(s).
         Must contain only positive values.
       skewness: Floating point tensor; the skewness of the distribution(s).
-      owens_t_terms: Number of terms to use in the expansion of Owen's T function
+      owens_t_points: Number of quadrature points used to evaluate Owen's
+        T function, see `fd.owens_t`.
       validate_args: Python `bool`, default `False`. When `True` distribution
         parameters are checked for validity despite possibly degrading runtime
         performance. When `False` invalid inputs may silently render incorrect
@@ -72,10 +74,18 @@ class SkewGaussian(distribution.Distribution):
         indicate the result is undefined. When `False`, an exception is raised
         if one or more of the statistic's batch members are undefined.
       name: Python `str` name prefixed to Ops created by this class.
+      owens_t_terms: Deprecated and ignored. Owen's T function used to be
+        evaluated with this many series terms; use `owens_t_points`.
 
     Raises:
       TypeError: if `loc`, `scale` or `skewness` have different `dtype`.
     """
+    if owens_t_terms is not None:
+      warnings.warn(
+          "owens_t_terms is deprecated and ignored: Owen's T function is "
+          "now evaluated by quadrature, see owens_t_points",
+          DeprecationWarning)
+      owens_t_terms = None
     parameters = dict(locals())
     with tf.name_scope(name) as name:
       dtype = dtype_util.common_dtype([loc, scale, skewness], dtype_hint=tf.float32)
@@ -85,7 +95,7 @@ class SkewGaussian(distribution.Distribution):
           scale, dtype=dtype, name='scale')
       self._skewness = tensor_util.convert_nonref_to_tensor(
           skewness, dtype=dtype, name='skewness')
-      self.owens_t_terms = owens_t_terms
+      self.owens_t_points = owens_t_points
       super(SkewGaussian, self).__init__(
           dtype=dtype,
           reparameterization_type=reparameterization.FULLY_REPARAMETERIZED,
@@ -139,40 +149,19 @@ class SkewGaussian(distribution.Distribution):
     scale = tf.convert_to_tensor(self.scale)
     skewness = tf.convert_to_tensor(self.skewness)
     log_value = 1 + tf.math.erf(skewness/(np.sqrt(2)*scale) * (x - self.loc))
-    log_value = tf.where(log_value <= 0, 1e-10, log_value)
+    log_value = tf.where(log_value <= 0, tf.constant(1e-10, self.dtype), log_value)
     log_unnormalized = -0.5 * tf.math.squared_difference(
         x / scale, self.loc / scale) + tf.math.log(log_value)
     log_normalization = tf.constant(
         0.5 * np.log(2. * np.pi), dtype=self.dtype) + tf.math.log(scale)
     return log_unnormalized - log_normalization
 
-  @staticmethod
-  def owensT1(h, a, terms):
-    hs = -0.5 * h * h
-    exp_hs = tf.math.exp(hs)
-
-    ci = -1 + exp_hs
-    val = tf.math.atan(a) * tf.ones_like(hs)
-
-    for i in range(terms):
-        val += ci * tf.math.pow(a,2*tf.cast(i,'float32')+1) / (2*tf.cast(i,'float32')+1)
-        ci = -ci + tf.math.pow(hs,tf.cast(i+1,'float32')) / tf.exp(tf.math.lgamma(tf.cast(i+2,'float32'))) * exp_hs
-
-    val = val / (2 * np.pi)
-
-    return val
-
   def _cdf(self, x):
     scale = tf.convert_to_tensor(self.scale)
     skewness = tf.convert_to_tensor(self.skewness)
-
-    h = tf.cast((x - self.loc)/scale,'float32')
-    a = tf.cast(skewness,'float32')
-
-    owens_t_eval = 0.5 * normal.Normal(loc=0.,scale=1.).cdf(h) + 0.5 * normal.Normal(loc=0.,scale=1.).cdf(a*h) - normal.Normal(loc=0.,scale=1.).cdf(h) * normal.Normal(loc=0.,scale=1.).cdf(a*h)
-
-    return 0.5 * (1. + tf.math.erf(1./(np.sqrt(2.)*scale) * (x - self.loc))) - \
-    tf.cast(tf.where(a > tf.ones_like(a), 2. * (owens_t_eval - self.owensT1(a*h,1./a,self.owens_t_terms)), 2. * self.owensT1(h,a,self.owens_t_terms)),'float32')
+    h = (x - self.loc) / scale
+    return (0.5 * tf.math.erfc(-h / np.sqrt(2.))
+            - 2. * fd.owens_t(h, skewness, self.owens_t_points))
 
   def _parameter_control_dependencies(self, is_init):
     assertions = []
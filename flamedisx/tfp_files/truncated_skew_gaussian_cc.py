@@ -12,6 +12,7 @@ import numpy as np
 import tensorflow.compat.v2 as tf
 
 import functools
+import warnings
 
 from tensorflow_probability.python.distributions import distribution
 from tensorflow_probability.python.internal import assert_util
@@ -36,10 +37,11 @@ class TruncatedSkewGaussianCC(distribution.Distribution):
                scale,
                skewness,
                limit,
-               owens_t_terms=2,
+               owens_t_points=6,
                validate_args=False,
                allow_nan_stats=True,
-               name='TruncatedSkewGaussianCC'):
+               name='TruncatedSkewGaussianCC',
+               owens_t_terms=None):
     """Construct Truncated Skew Gaussian distributions with mean, stddev and skewness `loc`, `scale` and `skewness`.
     Distribition is truncated at `limit`.
     Designed to be used for discrete random variables, with an in-built continuity correction.
@@ -55,7 +57,8 @@ class TruncatedSkewGaussianCC(distribution.Distribution):
       limit: Floating point tensor; the point above which all probability
         mass is zero-ed out and re-dumped into the the probability mass of
         limit.
-      owens_t_terms: Number of terms to use in the expansion of Owen's T function
+      owens_t_points: Number of quadrature points used to evaluate Owen's
+        T function, see `fd.owens_t`.
       validate_args: Python `bool`, default `False`. When `True` distribution
         parameters are checked for validity despite possibly degrading runtime
         performance. When `False` invalid inputs may silently render incorrect
@@ -65,10 +68,18 @@ class TruncatedSkewGaussianCC(distribution.Distribution):
         indicate the result is undefined. When `False`, an exception is raised
         if one or more of the statistic's batch members are undefined.
       name: Python `str` name prefixed to Ops created by this class.
+      owens_t_terms: Deprecated and ignored. Owen's T function used to be
+        evaluated with this many series terms; use `owens_t_points`.
 
     Raises:
       TypeError: if `loc`, `scale`, `skewness` or `limit` have different `dtype`.
     """
+    if owens_t_terms is not None:
+      warnings.warn(
+          "owens_t_terms is deprecated and ignored: Owen's T function is "
+          "now evaluated by quadrature, see owens_t_points",
+          DeprecationWarning)
+      owens_t_terms = None
     parameters = dict(locals())
     with tf.name_scope(name) as name:
       dtype = dtype_util.common_dtype([loc, scale, skewness, limit], dtype_hint=tf.float32)
@@ -80,7 +91,7 @@ class TruncatedSkewGaussianCC(distribution.Distribution):
           skewness, dtype=dtype, name='skewness')
       self._limit = tensor_util.convert_nonref_to_tensor(
           limit, dtype=dtype, name='limit')
-      self.owens_t_terms = owens_t_terms
+      self.owens_t_points = owens_t_points
       super(TruncatedSkewGaussianCC, self).__init__(
           dtype=dtype,
           reparameterization_type=reparameterization.FULLY_REPARAMETERIZED,
@@ -140,7 +151,7 @@ class TruncatedSkewGaussianCC(distribution.Distribution):
     scale = tf.convert_to_tensor(self.scale)
     skewness = tf.convert_to_tensor(self.skewness)
     limit = tf.convert_to_tensor(self.limit)
-    skew_gauss = fd.tfp_files.SkewGaussian(loc=self.loc,scale=scale,skewness=skewness,owens_t_terms=self.owens_t_terms)
+    skew_gauss = fd.tfp_files.SkewGaussian(loc=self.loc,scale=scale,skewness=skewness,owens_t_points=self.owens_t_points)
 
     cdf_upper = skew_gauss.cdf(x+0.5)
     cdf_lower = skew_gauss.cdf(x-0.5)
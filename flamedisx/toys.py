@@ -0,0 +1,289 @@
+"""
+Running toy Monte Carlos of likelihoods, e.g. for Neyman constructions
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+import tempfile
+import time
+import typing as ty
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+import flamedisx as fd
+
+export, __all__ = fd.exporter()
+
+# (ToyRunner, LogLikelihood) of a worker process, see _init_toy_worker
+_toy_worker = None
+
+
+@export
+class ToyRunner:
+    """Run toy Monte Carlos of a likelihood: simulate a dataset, set it as
+    the likelihood's data, find the best fit, and optionally compute a test
+    statistic and a limit.
+
+    Toys run in a pool of worker processes, each of which builds and traces
+    its likelihood once. Results are appended to the output as toys finish.
+    Running again with the same output resumes the run: toys already in
+    the output are not redone (so use a new output when changing any
+    settings). Toy i is simulated after seeding numpy's
+    random generator with (seed, i), so results do not depend on the
+    number of workers or on interruptions.
+
+    :param likelihood_factory: Function without arguments that returns a
+        fd.LogLikelihood. If n_workers > 1, this is called in each worker
+        process, so it must be picklable, e.g. a module-level function or a
+        functools.partial of one.
+    :param output: Path to a .csv file, or to a .parquet directory to which
+        one file is written per finished chunk of toys (requires pyarrow).
+    :param truth: {param: value} to simulate toys at. Omitted parameters
+        are simulated at the defaults of the likelihood from the factory.
+    :param test_point: {param: value} at which to compute the test
+        statistic -2 (log L(conditional best fit) - log L(best fit)),
+        where the conditional best fit keeps test_point fixed.
+        If None, no test statistic is computed.
+    :param limit_parameter: Parameter to compute a limit on, see
+        LogLikelihood.limit. If None, no limit is computed.
+    :param bestfit_kwargs: Keyword arguments for LogLikelihood.bestfit
+    :param limit_kwargs: Keyword arguments for LogLikelihood.limit
+    :param n_workers: Number of worker processes. If 1, toys run in this
+        process, without a process pool.
+    :param chunk_size: Number of toys each worker runs per task
+    :param seed: Seed for the toys
+    """
+
+    #: Columns present for every toy. Other columns depend on the
+    #: likelihood's parameters and the options.
+    base_columns = ('toy_index', 'n_events', 'error',
+                    'time_simulate', 'time_set_data', 'time_fit',
+                    'time_total')
+
+    def __init__(self,
+                 likelihood_factory: ty.Callable[[], 'fd.LogLikelihood'],
+                 output: str,
+                 truth: ty.Dict[str, float] = None,
+                 test_point: ty.Dict[str, float] = None,
+                 limit_parameter: str = None,
+                 bestfit_kwargs: ty.Dict[str, ty.Any] = None,
+                 limit_kwargs: ty.Dict[str, ty.Any] = None,
+                 n_workers=1,
+                 chunk_size=1,
+                 seed=0):
+        if output.endswith('.csv'):
+            self.output_format = 'csv'
+        elif output.endswith('.parquet'):
+            self.output_format = 'parquet'
+        else:
+            raise ValueError(
+                f"Output {output} must end with .csv or .parquet")
+        self.likelihood_factory = likelihood_factory
+        self.output = output
+        self.truth = dict() if truth is None else truth
+        self.test_point = test_point
+        self.limit_parameter = limit_parameter
+        self.bestfit_kwargs = dict() if bestfit_kwargs is None \
+            else bestfit_kwargs
+        self.limit_kwargs = dict() if limit_kwargs is None else limit_kwargs
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self._simulation_params = None
+
+    def columns(self, param_names):
+        """Return output columns, for a likelihood with param_names"""
+        columns = list(self.base_columns)
+        columns += ['bestfit_' + p for p in param_names]
+        columns += ['ll_bestfit']
+        if self.test_point is not None:
+            columns += ['conditional_' + p for p in param_names]
+            columns += ['ll_conditional', 'test_statistic']
+        if self.limit_parameter is not None:
+            if self.limit_kwargs.get('kind') == 'central':
+                columns += ['lower_limit', 'upper_limit']
+            else:
+                columns += ['limit']
+        return columns
+
+    def build_likelihood(self):
+        """Return likelihood from the factory, traced on a simulated toy"""
+        lf = self.likelihood_factory()
+        # Setting data changes the default rate multipliers, so fix the
+        # parameters to simulate at now. Otherwise, each toy would depend
+        # on the data of the previous one.
+        self._simulation_params = {**lf.guess(), **self.truth}
+        # Seed differently from all toys
+        np.random.seed([self.seed, 2**32 - 1])
+        lf.set_data(lf.simulate(**self._simulation_params))
+        lf.log_likelihood(second_order=True)
+        return lf
+
+    def run_toy(self, lf, toy_index):
+        """Return dictionary with results of toy toy_index, using
+        likelihood lf from build_likelihood. Exceptions are caught and
+        their message stored as 'error', which is None (or NaN) for
+        successful toys."""
+        result = dict(toy_index=toy_index, error=None)
+        t_start = time.time()
+        np.random.seed([self.seed, toy_index])
+        try:
+            data = lf.simulate(**self._simulation_params)
+            result['n_events'] = len(data)
+            t0 = time.time()
+            result['time_simulate'] = t0 - t_start
+
+            lf.set_data(data)
+            t1 = time.time()
+            result['time_set_data'] = t1 - t0
+
+            bestfit = lf.bestfit(**self.bestfit_kwargs)
+            for p, x in bestfit.items():
+                result['bestfit_' + p] = x
+            result['ll_bestfit'] = float(lf(**bestfit))
+
+            if self.test_point is not None:
+                fix = {**self.bestfit_kwargs.get('fix', dict()),
+                       **self.test_point}
+                if set(lf.param_names) - set(fix):
+                    conditional = lf.bestfit(
+                        **{**self.bestfit_kwargs, 'fix': fix})
+                else:
+                    # Nothing left to fit
+                    conditional = {p: fix[p] for p in lf.param_names}
+                for p, x in conditional.items():
+                    result['conditional_' + p] = x
+                result['ll_conditional'] = float(lf(**conditional))
+                result['test_statistic'] = -2 * (
+                    result['ll_conditional'] - result['ll_bestfit'])
+
+            if self.limit_parameter is not None:
+                limit = lf.limit(self.limit_parameter,
+                                 bestfit=bestfit,
+                                 **self.limit_kwargs)
+                if isinstance(limit, (tuple, list)):
+                    result['lower_limit'], result['upper_limit'] = limit
+                else:
+                    result['limit'] = limit
+            result['time_fit'] = time.time() - t1
+
+        except Exception as e:
+            result['error'] = f'{e.__class__.__name__}: {e}'
+        result['time_total'] = time.time() - t_start
+        return result
+
+    def done_toys(self):
+        """Return results of toys already in the output"""
+        if self.output_format == 'csv':
+            if not os.path.exists(self.output):
+                return pd.DataFrame()
+            _repair_csv(self.output)
+            if not os.path.getsize(self.output):
+                return pd.DataFrame()
+            return pd.read_csv(self.output)
+        if not os.path.exists(self.output):
+            return pd.DataFrame()
+        parts = sorted([fn for fn in os.listdir(self.output)
+                        if fn.endswith('.parquet')])
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat([pd.read_parquet(os.path.join(self.output, fn))
+                          for fn in parts], ignore_index=True)
+
+    def run(self, n_toys, progress=True):
+        """Run toys 0 ... n_toys - 1 that are not yet in the output,
+        and return a DataFrame with the results of all of them.
+
+        :param progress: If True, show a progress bar
+        """
+        done = self.done_toys()
+        todo = np.arange(n_toys)
+        if len(done):
+            todo = todo[~np.isin(todo, done['toy_index'].values)]
+        chunks = [todo[i:i + self.chunk_size].tolist()
+                  for i in range(0, len(todo), self.chunk_size)]
+        results = [done] if len(done) else []
+
+        with tqdm(total=len(todo), disable=not progress,
+                  desc='Running toys') as pbar:
+            if self.n_workers == 1:
+                lf = self.build_likelihood() if chunks else None
+                columns = None if lf is None else \
+                    self.columns(lf.param_names)
+                for chunk in chunks:
+                    df = pd.DataFrame(
+                        [self.run_toy(lf, i) for i in chunk],
+                        columns=columns)
+                    self._write(df)
+                    results.append(df)
+                    pbar.update(len(chunk))
+            elif chunks:
+                with ProcessPoolExecutor(
+                        self.n_workers,
+                        # Tensorflow is not fork-safe
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_toy_worker,
+                        initargs=(self,)) as pool:
+                    columns = self.columns(
+                        pool.submit(_toy_worker_param_names).result())
+                    futures = [pool.submit(_run_toys_in_worker, chunk)
+                               for chunk in chunks]
+                    for future in as_completed(futures):
+                        df = pd.DataFrame(future.result(), columns=columns)
+                        self._write(df)
+                        results.append(df)
+                        pbar.update(len(df))
+
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(results, ignore_index=True).sort_values(
+            'toy_index').reset_index(drop=True)
+
+    def _write(self, df):
+        """Append results of a chunk of toys to the output"""
+        if self.output_format == 'csv':
+            new_file = (not os.path.exists(self.output)
+                        or not os.path.getsize(self.output))
+            # Write each chunk in one call, so a crash leaves at most
+            # one partial line (removed by _repair_csv)
+            text = df.to_csv(index=False, header=new_file)
+            with open(self.output, mode='a') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            return
+
+        os.makedirs(self.output, exist_ok=True)
+        fn = (f'toys_{df["toy_index"].min():09d}_'
+              f'{df["toy_index"].max():09d}.parquet')
+        # Write to a temporary file first, so a crash never leaves
+        # a partially written part file
+        fd_tmp, tmp_path = tempfile.mkstemp(dir=self.output, suffix='.tmp')
+        os.close(fd_tmp)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.output, fn))
+
+
+def _repair_csv(path):
+    """Remove a partially written last line from the CSV file at path"""
+    with open(path, mode='rb+') as f:
+        content = f.read()
+        if not content or content.endswith(b'\n'):
+            return
+        f.truncate(content.rfind(b'\n') + 1)
+
+
+def _init_toy_worker(runner):
+    global _toy_worker
+    _toy_worker = runner, runner.build_likelihood()
+
+
+def _toy_worker_param_names():
+    return _toy_worker[1].param_names
+
+
+def _run_toys_in_worker(toy_indices):
+    runner, lf = _toy_worker
+    return [runner.run_toy(lf, i) for i in toy_indices]
@@ -1,16 +1,26 @@
 from pathlib import Path
 import subprocess
+import warnings
 
 import inspect
 import numpy as np
 import pandas as pd
-from scipy import stats
+from scipy import special, stats
 import tensorflow as tf
 
 lgamma = tf.math.lgamma
 o = tf.newaxis
 FLOAT_TYPE = tf.float32
 INT_TYPE = tf.int32
+# Type in which log likelihood terms are summed and differentiated,
+# see set_float_type
+ACCUMULATION_TYPE = tf.float32
+
+# kind -> (FLOAT_TYPE, ACCUMULATION_TYPE), see set_float_type
+FLOAT_TYPE_KINDS = dict(
+    float32=(tf.float32, tf.float32),
+    float64=(tf.float64, tf.float64),
+    mixed=(tf.float32, tf.float64))
 
 # Extreme mean and standard deviations give numerical errors
 # in the beta-binomial.
@@ -44,11 +54,112 @@ def float_type():
     return FLOAT_TYPE
 
 
+@export
+def accumulation_type():
+    """Return type in which log likelihood terms are summed and
+    differentiated"""
+    return ACCUMULATION_TYPE
+
+
+@export
+def set_float_type(kind):
+    """Set the floating point precision of flamedisx computations.
+
+    :param kind: One of
+      - 'float32' (default): compute everything in float32;
+      - 'float64': compute everything in float64;
+      - 'mixed': compute the model (i.e. the block tensors) in float32,
+        but sum log likelihood terms and compute gradients and Hessians
+        in float64.
+
+    Sources and likelihoods keep the precision they were created with,
+    so call this before creating them.
+    """
+    global FLOAT_TYPE, ACCUMULATION_TYPE
+    if kind not in FLOAT_TYPE_KINDS:
+        raise ValueError(f"Unknown float type {kind}, choose one of "
+                         f"{list(FLOAT_TYPE_KINDS.keys())}")
+    FLOAT_TYPE, ACCUMULATION_TYPE = FLOAT_TYPE_KINDS[kind]
+
+
+@export
+def get_float_type():
+    """Return the kind of floating point precision set by set_float_type"""
+    for kind, types in FLOAT_TYPE_KINDS.items():
+        if types == (FLOAT_TYPE, ACCUMULATION_TYPE):
+            return kind
+
+
 @export
 def int_type():
     return INT_TYPE
 
 
+# Errors tensorflow raises when XLA cannot compile a graph, e.g. if it
+# has unsupported ops, or shapes that depend on intermediate results
+XLA_ERRORS = (tf.errors.InvalidArgumentError,
+              tf.errors.UnimplementedError)
+
+
+@export
+class XLAFunction:
+    """tf.function compiled with XLA, falling back to a regular tf.function
+    for input signatures XLA cannot compile.
+
+    Whether XLA can compile a graph is only known when it is first run,
+    so the first call with each input signature may trace the function
+    twice. XLA errors on the first call only cause a fallback if the
+    regular tf.function succeeds; later errors are always raised.
+
+    :param python_function: function to compile
+    :param kwargs: other options for tf.function, e.g. input_signature
+    """
+
+    def __init__(self, python_function, **kwargs):
+        self.python_function = python_function
+        self._xla_function = tf.function(
+            python_function, jit_compile=True, **kwargs)
+        self._function = tf.function(python_function, **kwargs)
+        # Input signatures run with and without XLA
+        self._xla_signatures = set()
+        self._fallback_signatures = set()
+
+    @property
+    def jit_compile(self):
+        """Whether XLA compiled the function for all inputs so far"""
+        return not self._fallback_signatures
+
+    @staticmethod
+    def _signature(args, kwargs):
+        def spec(x):
+            if isinstance(x, (tf.Tensor, tf.Variable, np.ndarray)):
+                return str(x.dtype), tuple(x.shape)
+            return repr(x)
+        return repr(tf.nest.map_structure(spec, (args, kwargs)))
+
+    def __call__(self, *args, **kwargs):
+        signature = self._signature(args, kwargs)
+        if signature in self._xla_signatures:
+            return self._xla_function(*args, **kwargs)
+        if signature in self._fallback_signatures:
+            return self._function(*args, **kwargs)
+
+        try:
+            result = self._xla_function(*args, **kwargs)
+        except XLA_ERRORS as e:
+            # Raises if the error was not specific to XLA
+            result = self._function(*args, **kwargs)
+            name = getattr(self.python_function, '__qualname__',
+                           repr(self.python_function))
+            warnings.warn(
+                f"XLA could not compile {name}, falling back to a "
+                f"regular tf.function: {str(e).splitlines()[0]}")
+            self._fallback_signatures.add(signature)
+            return result
+        self._xla_signatures.add(signature)
+        return result
+
+
 @export
 def lookup_axis1(x, indices, fill_value=0):
     """Return values of x at indices along axis 1,
@@ -120,6 +231,242 @@ def tf_log10(x):
     return tf.math.log(x) / tf.math.log(tf.constant(10, dtype=x.dtype))
 
 
+@export
+def safe_log(x):
+    """Return log(x), giving -inf (with zero rather than NaN gradient)
+    where x is zero.
+    """
+    positive = x > 0
+    return tf.where(
+        positive,
+        tf.math.log(tf.where(positive, x, tf.ones_like(x))),
+        tf.constant(-np.inf, dtype=x.dtype))
+
+
+@export
+def log_einsum_exp(equation, a, b):
+    """Return log(tf.einsum(equation, exp(a), exp(b))) without underflow
+    for very negative a or b.
+
+    The largest entries of a and b along the summed dimensions are
+    factored out before exponentiating, as in a logsumexp. Results that
+    underflow relative to the product of these largest entries become -inf.
+
+    :param equation: einsum equation with two operands and an explicit
+        output, e.g. 'zab,zbc->zac'. Ellipses are not supported.
+    """
+    inputs, output = equation.split('->')
+    result = 0.
+    shifted = []
+    for x, letters in zip((a, b), inputs.split(',')):
+        # Factor out the maximum over the summed dimensions of x
+        summed = [i for i, c in enumerate(letters) if c not in output]
+        x_max = tf.stop_gradient(
+            tf.reduce_max(x, axis=summed, keepdims=True))
+        x_max = tf.where(tf.math.is_finite(x_max),
+                         x_max, tf.zeros_like(x_max))
+        shifted.append(tf.exp(x - x_max))
+
+        # Add it back in the layout of the output
+        kept = ''.join([c for c in output if c in letters])
+        x_max = tf.einsum(f'{letters}->{kept}', x_max)
+        x_shape = tf.shape(x_max)
+        result += tf.reshape(x_max, tf.stack([
+            x_shape[kept.index(c)] if c in kept else 1
+            for c in output]))
+    return safe_log(tf.einsum(equation, *shifted)) + result
+
+
+@export
+def to_band(x, threshold=0., log_space=False):
+    """Return (band, offset) for a batch of matrices x that are nonzero
+    only near a diagonal, with band[:, i, k] = x[:, i, i + offset + k].
+
+    offset has one entry per matrix; the band width (band's last axis)
+    is the largest needed for any matrix in the batch. Entries of x
+    outside the band are taken to be zero.
+
+    :param threshold: Neglect entries of x below threshold times the
+        largest entry of their matrix.
+    :param log_space: If True, x holds logs, and so will band.
+    """
+    n, m = tf.shape(x)[1], tf.shape(x)[2]
+    diagonal = (tf.range(m)[o, :] - tf.range(n)[:, o])[o, :, :]
+
+    x_max = tf.reduce_max(x, axis=[1, 2], keepdims=True)
+    if log_space:
+        nonzero = x > x_max + tf.math.log(tf.cast(threshold, x.dtype))
+    else:
+        nonzero = x > threshold * x_max
+    lo = tf.reduce_min(tf.where(nonzero, diagonal, m), axis=[1, 2])
+    hi = tf.reduce_max(tf.where(nonzero, diagonal, -n), axis=[1, 2])
+    # Matrices without nonzero entries get a band of zeros
+    lo = tf.where(lo > hi, tf.zeros_like(lo), lo)
+    hi = tf.maximum(hi, lo)
+    width = tf.reduce_max(hi - lo) + 1
+
+    indices = (tf.range(n)[o, :, o]
+               + lo[:, o, o]
+               + tf.range(width)[o, o, :])
+    band = tf.gather(x, tf.clip_by_value(indices, 0, m - 1),
+                     axis=2, batch_dims=2)
+    zero = -float('inf') if log_space else 0.
+    band = tf.where((indices >= 0) & (indices < m),
+                    band,
+                    tf.fill(tf.shape(band), tf.cast(zero, x.dtype)))
+    return band, lo
+
+
+@export
+def band_matmul(band, offset, b, log_space=False):
+    """Return a @ b for a batch of banded matrices a, given as
+    (band, offset) by to_band, and a batch of matrices b.
+
+    Costs a factor band width / a's number of columns fewer
+    multiply-adds than a dense matmul. The band is summed one diagonal
+    at a time, so no intermediate is larger than the result.
+
+    :param log_space: If True, band and b hold logs, and
+        log(exp(a) @ exp(b)) is returned.
+    """
+    rows = tf.range(tf.shape(band)[1])[o, :] + offset[:, o]
+
+    def add_diagonal(result, k):
+        # Rows of b the k-th band entry of each row multiplies.
+        # Out-of-range indices only meet zeros of the band.
+        b_k = tf.gather(b, tf.clip_by_value(rows + k, 0, tf.shape(b)[1] - 1),
+                        axis=1, batch_dims=1)
+        if log_space:
+            term = band[:, :, k, o] + b_k
+            # As in log_einsum_exp, so entries where both are -inf
+            # get zero rather than NaN gradients
+            x_max = tf.stop_gradient(tf.maximum(result, term))
+            x_max = tf.where(tf.math.is_finite(x_max),
+                             x_max, tf.zeros_like(x_max))
+            return safe_log(tf.exp(result - x_max)
+                            + tf.exp(term - x_max)) + x_max
+        return result + band[:, :, k, o] * b_k
+
+    zero = -float('inf') if log_space else 0.
+    initializer = tf.fill(
+        tf.stack([tf.shape(band)[0], tf.shape(band)[1], tf.shape(b)[2]]),
+        tf.cast(zero, b.dtype))
+    return tf.foldl(add_diagonal, tf.range(tf.shape(band)[2]),
+                    initializer=initializer)
+
+
+# Table of log(n!) for n = 0, 1, ..., see extend_log_factorials
+_log_factorials_np = special.gammaln(np.arange(1, 1001))
+# The same table as a variable, so traced functions see extensions
+_log_factorials = None
+
+
+@export
+def extend_log_factorials(n_max):
+    """Ensure log_factorial can look up log(n!) for n up to n_max, and
+    return the table of log(n!) as a numpy array.
+    Sources do this in set_data for the largest value in their domains.
+    """
+    global _log_factorials_np
+    n_max = int(n_max)
+    if n_max >= len(_log_factorials_np):
+        # Leave room for larger datasets, to avoid extending often
+        _log_factorials_np = special.gammaln(np.arange(1, 2 * n_max + 2))
+        if _log_factorials is not None:
+            _log_factorials.assign(_log_factorials_np)
+    return _log_factorials_np
+
+
+def _lookup_log_factorials(n, check=True):
+    """Return float64 tensor of log(n!) for integer-valued n
+
+    :param check: If True, check n is in the table. The check is a no-op
+        in functions compiled with XLA (jit_compile).
+    """
+    global _log_factorials
+    if _log_factorials is None:
+        with tf.init_scope():
+            _log_factorials = tf.Variable(
+                _log_factorials_np, dtype=tf.float64, trainable=False,
+                shape=tf.TensorShape([None]))
+    n = tf.cast(n, dtype=int_type())
+    if not check:
+        return tf.gather(_log_factorials, n)
+    # Rather than silently clipping to the table. Note XLA drops these
+    # assertions, and its gather clamps out-of-range indices, so with
+    # jit_compile n outside the table gives wrong results without error.
+    with tf.control_dependencies([
+            tf.debugging.assert_non_negative(
+                n, message="log_factorial needs n >= 0"),
+            tf.debugging.assert_less(
+                n, tf.shape(_log_factorials, out_type=int_type())[0],
+                message="log_factorial needs n <= n_max of an earlier "
+                        "extend_log_factorials(n_max)")]):
+        return tf.gather(_log_factorials, n)
+
+
+@export
+def log_factorial(n):
+    """Return log(n!) for integer-valued n, looked up in a table.
+    n must be in [0, n_max] for an earlier extend_log_factorials(n_max).
+    This is checked, except in functions compiled with XLA.
+    """
+    return tf.cast(_lookup_log_factorials(n), dtype=float_type())
+
+
+@export
+def log_binom_coef(n, k):
+    """Return log of the binomial coefficient (n choose k), for
+    integer-valued n and k with 0 <= k <= n, see log_factorial.
+
+    The log factorials are combined in float64, since for large n they
+    are much larger than the result.
+    """
+    n = tf.cast(n, dtype=float_type())
+    k = tf.cast(k, dtype=float_type())
+    # k and n - k are in the table if n is
+    return tf.cast(_lookup_log_factorials(n)
+                   - _lookup_log_factorials(k, check=False)
+                   - _lookup_log_factorials(n - k, check=False),
+                   dtype=float_type())
+
+
+@export
+def binom_logpmf(k, n, p):
+    """Return log of the binomial PMF of k successes in n trials with
+    success probability p, for integer-valued k and n.
+
+    Faster than tfp.distributions.Binomial(n, p).log_prob(k), since the
+    binomial coefficient is looked up with log_binom_coef.
+    Gives -inf for k outside [0, n].
+    """
+    k, n, p = [tf.cast(x, dtype=float_type()) for x in (k, n, p)]
+    # Avoid nans (also in gradients) outside the support
+    in_support = (k >= 0) & (k <= n)
+    k = tf.where(in_support, k, tf.zeros_like(k))
+    n = tf.where(in_support, n, tf.zeros_like(n))
+    result = (log_binom_coef(n, k)
+              + tf.math.xlogy(k, p) + tf.math.xlog1py(n - k, -p))
+    return tf.where(in_support,
+                    result,
+                    tf.constant(-np.inf, dtype=float_type()))
+
+
+@export
+def poisson_logpmf(k, mu):
+    """Return log of the Poisson PMF of integer-valued k with mean mu.
+
+    Faster than tfp.distributions.Poisson(mu).log_prob(k), since log(k!)
+    is looked up with log_factorial. Gives -inf for k < 0.
+    """
+    k, mu = tf.cast(k, dtype=float_type()), tf.cast(mu, dtype=float_type())
+    in_support = k >= 0
+    k = tf.where(in_support, k, tf.zeros_like(k))
+    return tf.where(in_support,
+                    tf.math.xlogy(k, mu) - mu - log_factorial(k),
+                    tf.constant(-np.inf, dtype=float_type()))
+
+
 @export
 def safe_p(ps):
     """Clip probabilities to be in [1e-5, 1 - 1e-5]
@@ -163,16 +510,75 @@ def beta_binom_pmf(x, n, p_mean, p_sigma):
     with mean p_mean and standard deviation p_sigma.
     """
     a, b = beta_params(p_mean, p_sigma)
-    res = tf.exp(
-        lgamma(n + 1.) + lgamma(x + a) + lgamma(n - x + b)
-        + lgamma(a + b)
-        - (lgamma(x + 1.) + lgamma(n - x + 1.)
-           + lgamma(a) + lgamma(b) + lgamma(n + a + b)))
+    res = tf.exp(beta_binom_logpmf(x, n, a, b))
     return tf.where(tf.math.is_finite(res),
                     res,
                     tf.zeros_like(res, dtype=float_type()))
 
 
+@export
+def beta_binom_logpmf(x, n, a, b, log_binom_coef=None, log_beta_ab=None):
+    """Return log of the beta-binomial PMF (see beta_binom_pmf), for a
+    beta distribution with parameters a and b (see beta_params).
+
+    Terms that do not depend on both x and the parameters can be passed
+    if they are already known, e.g. computed on a smaller tensor:
+    :param log_binom_coef: log of the binomial coefficient (n choose x),
+        e.g. from log_binom_coef. Computed with lgamma if not given.
+    :param log_beta_ab: log of the beta function B(a, b).
+        Computed with lgamma if not given.
+    """
+    if log_binom_coef is None:
+        log_binom_coef = (lgamma(n + 1.)
+                          - lgamma(x + 1.) - lgamma(n - x + 1.))
+    if log_beta_ab is None:
+        log_beta_ab = lgamma(a) + lgamma(b) - lgamma(a + b)
+    return (log_binom_coef
+            + lgamma(x + a) + lgamma(n - x + b) - lgamma(n + a + b)
+            - log_beta_ab)
+
+
+@export
+def owens_t(h, a, n_points=6):
+    """Return Owen's T function T(h, a), as scipy.special.owens_t
+
+    For |a| <= 1, evaluates
+        T(h, a) = 1/(2 pi) int_0^a exp(-h^2 (1 + x^2) / 2) / (1 + x^2) dx
+    with n_points-point Gauss-Legendre quadrature (method T5 of
+    Patefield and Tandy, J. Stat. Softw. 5 (2000)). Larger |a| are mapped
+    to |a| < 1 with T(h, a) = (Q(h) + Q(ah)) / 2 - Q(h) Q(ah) - T(ah, 1/a),
+    for h, a >= 0 and Q(z) = 1 - Phi(z).
+
+    The absolute error is below 1e-6 for n_points >= 4, and below 1e-8
+    for n_points >= 6, for all h and a.
+    """
+    # T is even in h and odd in a. The quadrature below is odd in a_q,
+    # so only the swapped branch needs the sign of a; using a itself
+    # otherwise keeps the gradient at a = 0.
+    h = tf.abs(h)
+    abs_a = tf.abs(a)
+    swap = abs_a > 1
+    h_q = tf.where(swap, abs_a * h, h)
+    # maximum avoids nan gradients from the unused branch at a = 0
+    a_q = tf.where(swap, 1. / tf.maximum(abs_a, 1.), a)
+
+    hs = -0.5 * h_q ** 2
+    a_q2 = a_q ** 2
+    nodes, weights = np.polynomial.legendre.leggauss(n_points)
+    result = tf.zeros_like(hs)
+    # Nodes and weights on [0, 1]
+    for x, w in zip((nodes + 1) / 2, weights / 2):
+        q = 1. + a_q2 * float(x ** 2)
+        result += float(w) * tf.exp(hs * q) / q
+    result *= a_q / (2 * np.pi)
+
+    q_h = 0.5 * tf.math.erfc(h / np.sqrt(2))
+    q_ah = 0.5 * tf.math.erfc(abs_a * h / np.sqrt(2))
+    return tf.where(swap,
+                    tf.sign(a) * (0.5 * (q_h + q_ah) - q_h * q_ah - result),
+                    result)
+
+
 @export
 def is_numpy_number(x):
     try:
@@ -6,6 +6,7 @@ commit 156c5b1f0aad543ad5707911e2ee301a091a40a4
 import logging
 import gzip
 import json
+import os
 import re
 
 import numpy as np
@@ -15,6 +16,9 @@ from scipy.interpolate import RectBivariateSpline, RegularGridInterpolator
 import flamedisx as fd
 export, __all__ = fd.exporter()
 
+# Maps built by registered_map, by key
+_map_registry = dict()
+
 
 @export
 class InterpolateAndExtrapolate:
@@ -268,3 +272,57 @@ class InterpolatingMap:
                                             values=np.array(map_data),
                                             array_valued=array_valued)
         self.interpolators[map_name] = itp_fun
+
+
+@export
+def get_interpolating_map(path, is_bbf=False, map_name='map',
+                          method='WeightedNearestNeighbors', **kwargs):
+    """Return InterpolatingMap for the file at path. Each map is built once
+    per process, and shared between all sources and calls using the same
+    path, map_name, method and kwargs.
+
+    Do NOT mutate the result, since it is shared (see get_resource).
+
+    :param path: Name of the file in the XENONnT/Flamedisx repository,
+        or in the BBF repository if is_bbf. Existing local files and URLs
+        are loaded directly.
+    :param map_name: Name of the map in the file to use as default 'map'
+    :param method: Interpolation method, see InterpolatingMap
+    """
+    def build():
+        if '://' in path or os.path.exists(path):
+            data = fd.get_resource(path)
+        elif is_bbf:
+            data = fd.get_bbf_file(path)
+        else:
+            data = fd.get_nt_file(path)
+        # Copy, so we don't change the cached resource
+        data = dict(data)
+        data['map'] = data[map_name]
+        return InterpolatingMap(data, method=method, **kwargs)
+
+    return registered_map(
+        ('InterpolatingMap', path, is_bbf, map_name, method,
+         fd.hashablize(kwargs)),
+        build)
+
+
+@export
+def registered_map(key, build):
+    """Return the map registered under key, calling build() to make it
+    if it is not yet registered.
+
+    :param key: hashable key, which should include everything the
+        map depends on (e.g. file names and interpolation options)
+    :param build: function without arguments that returns the map
+    """
+    if key not in _map_registry:
+        _map_registry[key] = build()
+    return _map_registry[key]
+
+
+@export
+def clear_map_registry():
+    """Remove all registered maps (see registered_map), e.g. after
+    map files have changed on disk"""
+    _map_registry.clear()
@@ -40,21 +40,28 @@ def read_maps_tf(path_bag, is_bbf=False):
     """ Function to read reconstruction bias/combined cut acceptances/dummy maps.
     Note that this implementation fundamentally assumes upper and lower bounds
     have exactly the same domain definition.
+    Maps are read once per process, see fd.registered_map.
     :param path_bag: List with filenames of acceptance maps
     :param is_bbf: True if reading file from BBF folder.
     :return: List of acceptance maps and their domain definitions
     """
-    data_bag = []
-    yy_ref_bag = []
-    for loc_path in path_bag:
-        if is_bbf:
-            tmp = fd.get_bbf_file(loc_path)
-        else:
-            tmp = fd.get_nt_file(loc_path)
-        yy_ref_bag.append(tf.convert_to_tensor(tmp['map'], dtype=fd.float_type()))
-        data_bag.append(tmp)
-    domain_def = tmp['coordinate_system'][0][1]
-    return yy_ref_bag, domain_def
+    def build():
+        data_bag = []
+        yy_ref_bag = []
+        for loc_path in path_bag:
+            if is_bbf:
+                tmp = fd.get_bbf_file(loc_path)
+            else:
+                tmp = fd.get_nt_file(loc_path)
+            yy_ref_bag.append(tf.convert_to_tensor(tmp['map'], dtype=fd.float_type()))
+            data_bag.append(tmp)
+        domain_def = tmp['coordinate_system'][0][1]
+        return yy_ref_bag, domain_def
+
+    yy_ref_bag, domain_def = fd.registered_map(
+        ('read_maps_tf', tuple(path_bag), is_bbf, fd.float_type().name),
+        build)
+    return list(yy_ref_bag), domain_def
 
 def interpolate_tf(sig_tf, fmap, domain):
     """ Function to interpolate values from map given S1, S2 values
@@ -217,9 +224,12 @@ class SR1Source:
     def set_defaults(self, *args, **kwargs):
         super().set_defaults(*args, **kwargs)
 
+        # Maps are built once per process and shared between sources,
+        # see fd.get_interpolating_map and read_maps_tf.
+
         # Yield maps
-        self.s1_map = fd.InterpolatingMap(fd.get_nt_file(self.path_s1_rly))
-        self.s2_map = fd.InterpolatingMap(fd.get_nt_file(self.path_s2_rly))
+        self.s1_map = fd.get_interpolating_map(self.path_s1_rly)
+        self.s2_map = fd.get_interpolating_map(self.path_s2_rly)
 
         # Loading combined cut acceptances
         self.cut_accept_map_s1, self.cut_accept_domain_s1 = \
@@ -242,18 +252,17 @@ class SR1Source:
             read_maps_tf(self.path_electron_lifetimes, is_bbf=False)
 
         # Field maps
-        self.field_map = fd.InterpolatingMap(fd.get_nt_file(self.path_drift_field))
+        self.field_map = fd.get_interpolating_map(self.path_drift_field)
 
         # Field distortion maps
-        # cheap hack
-        aa = fd.get_nt_file(self.path_drift_field_distortion) 
-        aa['map'] = aa['r_distortion_map']
-        self.drift_field_distortion_map = fd.InterpolatingMap(aa, method='RectBivariateSpline')
-        del aa
+        self.drift_field_distortion_map = fd.get_interpolating_map(
+            self.path_drift_field_distortion,
+            map_name='r_distortion_map',
+            method='RectBivariateSpline')
 
         # FDC maps
-        self.fdc_map = fd.InterpolatingMap(fd.get_nt_file(self.path_drift_field_distortion_correction))
-
+        self.fdc_map = fd.get_interpolating_map(
+            self.path_drift_field_distortion_correction)
 
     def reconstruction_bias_s1(self,
                                s1,
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import flamedisx as fd
+
+
+def test_tune_batch_size_source():
+    np.random.seed(0)
+    data = fd.ERSource().simulate(12)
+    n = len(data)
+    s = fd.ERSource(data.copy(), batch_size=4)
+    dr = s.batched_differential_rate(progress=False)
+
+    memory = fd.estimate_batch_memory(s)
+    assert memory > 0
+
+    # Without applying, the source is restored to its original batch size
+    best = fd.tune_batch_size(s, candidates=(2, 5, 100), n_batches=1,
+                              apply=False)
+    assert best in (2, 5, n)
+    assert s.batch_size == 4
+    np.testing.assert_allclose(s.batched_differential_rate(progress=False),
+                               dr, rtol=1e-5)
+
+    best = fd.tune_batch_size(s, candidates=(2, 5, 100), n_batches=1)
+    assert s.batch_size == best
+    assert s.batched_differential_rate(progress=False).shape == (n,)
+
+    # Nothing fits in one byte
+    with pytest.raises(ValueError):
+        fd.tune_batch_size(s, max_memory=1, candidates=(2,))
+
+
+def test_tune_batch_size_likelihood():
+    np.random.seed(0)
+    data = fd.ERSource().simulate(12)
+    lf = fd.LogLikelihood(
+        sources=dict(er=fd.ERSource, nr=fd.NRSource),
+        free_rates=('er', 'nr'),
+        batch_size=4,
+        data=data)
+    param_defaults = lf.param_defaults.copy()
+
+    best = fd.tune_batch_size(lf, candidates=(2, 5), n_batches=1)
+    assert best in (2, 5)
+    for s in lf.sources.values():
+        assert s.batch_size == best
+    assert lf.batch_info.numpy()[0, 1] == best
+    assert lf.param_defaults == param_defaults
+    assert np.isfinite(lf())
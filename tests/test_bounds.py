@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import flamedisx as fd
+
+
+def per_event_bounds(supports, cdfs, bounds_prob):
+    lower = [support[np.where(cdf < bounds_prob)[0][-1]]
+             if len(np.where(cdf < bounds_prob)[0]) > 0
+             else support[0]
+             for support, cdf in zip(supports, cdfs)]
+    upper = [support[np.where(cdf > 1. - bounds_prob)[0][0]]
+             if len(np.where(cdf > 1. - bounds_prob)[0]) > 0
+             else support[-1]
+             for support, cdf in zip(supports, cdfs)]
+    mle = [support[np.argmin(np.abs(cdf - 0.5))]
+           for support, cdf in zip(supports, cdfs)]
+    return lower, upper, mle
+
+
+def check_bounds(supports, cdfs, bound_type, **kwargs):
+    bounds_prob = 1e-3
+    df = pd.DataFrame(index=np.arange(len(supports)))
+    for bound in ('lower', 'upper', 'mle'):
+        fd.bounds.bayes_bounds(df, 'x', bounds_prob, bound, bound_type,
+                               supports, **kwargs)
+    lower, upper, mle = per_event_bounds(supports, cdfs, bounds_prob)
+    np.testing.assert_array_equal(df['x_min'], lower)
+    np.testing.assert_array_equal(df['x_max'], upper)
+    np.testing.assert_array_equal(df['x_mle'], mle)
+
+
+def test_binom_pmf():
+    n = np.arange(-2, 300)
+    k = 20 * np.ones_like(n)
+    np.testing.assert_allclose(fd.bounds.binom_pmf(k, n, 0.1),
+                               stats.binom.pmf(k, n, 0.1),
+                               rtol=1e-8, atol=1e-300)
+    # Non-integer arguments fall back to scipy
+    np.testing.assert_array_equal(fd.bounds.binom_pmf(k + 0.5, n, 0.1),
+                                  stats.binom.pmf(k + 0.5, n, 0.1))
+
+
+def test_bayes_bounds_binomial():
+    np.random.seed(0)
+    out_bounds = np.random.randint(0, 100, size=50)
+    effs = np.random.uniform(0.05, 0.5, size=50)
+    supports = [np.linspace(out_bound, np.ceil(out_bound / eff * 10.),
+                            200).astype(int)
+                for out_bound, eff in zip(out_bounds, effs)]
+    rvs = [out_bound * np.ones_like(support)
+           for out_bound, support in zip(out_bounds, supports)]
+    ps = [eff * np.ones_like(support) for eff, support in zip(effs, supports)]
+
+    pdfs = [stats.binom.pmf(rv, n, p)
+            for rv, n, p in zip(rvs, supports, ps)]
+    cdfs = [np.cumsum(pdf / np.sum(pdf)) for pdf in pdfs]
+    np.testing.assert_allclose(
+        fd.bounds.bayes_bounds_binomial(supports, rvs, supports, ps),
+        cdfs, rtol=1e-6)
+    check_bounds(supports, cdfs, 'binomial',
+                 rvs_binom=rvs, ns_binom=supports, ps_binom=ps)
+
+    # With a prior that vanishes on part of the supports
+    prior = stats.rv_histogram(np.histogram(np.random.uniform(0, 500, 1000)))
+    priors = [prior.pdf(support) if np.sum(prior.pdf(support)) else 1
+              for support in supports]
+    cdfs = [np.cumsum(pdf * p / np.sum(pdf * p))
+            for pdf, p in zip(pdfs, priors)]
+    np.testing.assert_allclose(
+        fd.bounds.bayes_bounds_binomial(supports, rvs, supports, ps,
+                                        prior_pdf=prior),
+        cdfs, rtol=1e-6)
+
+
+def test_bayes_bounds_normal():
+    np.random.seed(0)
+    signals = np.random.uniform(1, 100, size=50)
+    supports = [np.linspace(np.floor(s / 2.), np.ceil(s * 2.),
+                            200).astype(int)
+                for s in signals]
+    rvs = [s * np.ones_like(support) for s, support in zip(signals, supports)]
+    sigmas = [0.4 * np.sqrt(support) + 0.1 for support in supports]
+
+    pdfs = [stats.norm.pdf(rv, mu, sigma)
+            for rv, mu, sigma in zip(rvs, supports, sigmas)]
+    cdfs = [np.cumsum(pdf / np.sum(pdf)) for pdf in pdfs]
+    check_bounds(supports, cdfs, 'normal',
+                 rvs_normal=rvs, mus_normal=supports, sigmas_normal=sigmas)
+
+
+def test_indexed_reservoir():
+    np.random.seed(0)
+    reservoir = np.random.randint(0, 100, size=(10_000, 3)).astype(float)
+    reservoir[::10, 0] = np.nan
+    index = fd.bounds.IndexedReservoir(reservoir, 0)
+
+    for mins, maxs in [(dict(), dict()),
+                       ({0: 20, 1: 30}, {0: 40, 2: 50}),
+                       ({1: 30}, {0: 40}),
+                       ({0: 60}, {0: 40})]:
+        mask = np.ones(len(reservoir), dtype=bool)
+        for col, x in mins.items():
+            mask &= reservoir[:, col] >= x
+        for col, x in maxs.items():
+            mask &= reservoir[:, col] <= x
+        if not mins and not maxs:
+            # NaN keys are never selected
+            mask &= ~np.isnan(reservoir[:, 0])
+        np.testing.assert_array_equal(
+            np.sort(index.select(mins=mins, maxs=maxs)),
+            np.flatnonzero(mask))
+
+    class MockSource:
+        prior_PDFs_LB = tuple()
+        prior_PDFs_UB = tuple()
+
+    # Same priors with and without the index
+    sources = MockSource(), MockSource()
+    for s, res in zip(sources, (reservoir, index)):
+        fd.bounds.get_priors(s, res, ('a',), (2,), (0, 1), (20, 30), (40, 50))
+    for bounds in ('prior_PDFs_LB', 'prior_PDFs_UB'):
+        x = np.linspace(0, 100, 50)
+        pdfs = [getattr(s, bounds)[0]['a'].pdf(x) for s in sources]
+        np.testing.assert_array_equal(*pdfs)
@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 
 import flamedisx as fd
 from .test_source import xes   # Yes, it is used through pytest magic
@@ -153,3 +154,71 @@ def test_bestfit_scipy(xes):
     bestfit = lf.bestfit(guess, optimizer='scipy')
     assert isinstance(bestfit, dict)
     assert len(bestfit) == 2
+
+
+def test_lazy_hessian(xes):
+    if not xes.__class__.__name__ == 'ERSource':
+        return
+
+    lf = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        data=xes.data)
+
+    # Record which likelihood calls compute the Hessian
+    calls = []
+    log_likelihood = lf.log_likelihood
+
+    def counting_log_likelihood(*args, second_order=False, **kwargs):
+        calls.append(second_order)
+        return log_likelihood(*args, second_order=second_order, **kwargs)
+
+    lf.log_likelihood = counting_log_likelihood
+
+    # Minuit does not use the Hessian, so it is only computed once,
+    # at the best fit, for the errors.
+    bestfit, errors = lf.bestfit(optimizer='minuit', return_errors=True)
+    assert len(calls) > 2
+    assert calls[-1] and not any(calls[:-1])
+
+    # Errors agree with those from the inverse Hessian
+    cov = 2 * lf.inverse_hessian(bestfit)
+    np.testing.assert_allclose(
+        [errors[p] for p in lf.param_names],
+        np.diag(cov) ** 0.5,
+        rtol=1e-5)
+
+    # Without errors, the Hessian is not computed at all
+    del calls[:]
+    lf.bestfit(optimizer='minuit')
+    assert calls and not any(calls)
+
+
+def test_minuit_error_methods(xes):
+    if not xes.__class__.__name__ == 'ERSource':
+        return
+
+    lf = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        data=xes.data)
+    _, errors = lf.bestfit(optimizer='minuit', return_errors=True)
+
+    # HESSE and MINOS are used, even though use_hessian defaults to True
+    _, hesse_errors = lf.bestfit(optimizer='minuit', return_errors='hesse')
+    np.testing.assert_allclose(
+        [hesse_errors[p] for p in lf.param_names],
+        [errors[p] for p in lf.param_names],
+        rtol=0.2)
+    _, minos_errors = lf.bestfit(optimizer='minuit', return_errors='minos')
+    for p in lf.param_names:
+        lower, upper = minos_errors[p]
+        assert lower < 0 < upper
+
+    # Other optimizers only support the exact Hessian
+    with pytest.raises(ValueError):
+        lf.bestfit(optimizer='scipy', return_errors='hesse')
+    with pytest.raises(ValueError):
+        lf.bestfit(optimizer='minuit', return_errors='migrad')
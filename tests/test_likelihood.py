@@ -343,3 +343,353 @@ def test_hessian_rate_and_shape(xes: fd.ERSource):
     a = inv_hess[0, 1]
     b = inv_hess[1, 0]
     assert abs(a - b)/(a+b) < 1e-3
+
+
+def test_hessp(xes: fd.ERSource):
+    lf = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        data=xes.data)
+    guess = lf.guess()
+    vector = np.array([0.3, -1.2])
+
+    ll, grad, hess = lf.log_likelihood(second_order=True, **guess)
+    ll_2, grad_2, hessp = lf.log_likelihood_hessp(vector, **guess)
+    np.testing.assert_allclose(ll_2, ll, rtol=1e-6)
+    np.testing.assert_allclose(grad_2, grad, rtol=1e-5)
+    np.testing.assert_allclose(hessp, hess @ vector, rtol=1e-4)
+
+    # Products with the Hessian of the free parameters only
+    fix = ('elife',)
+    _, _, hess = lf.log_likelihood(second_order=True, omit_grads=fix,
+                                   **guess)
+    _, grad, hessp = lf.log_likelihood_hessp(vector[:1], omit_grads=fix,
+                                             **guess)
+    assert grad.shape == hessp.shape == (1,)
+    np.testing.assert_allclose(hessp, hess @ vector[:1], rtol=1e-4)
+
+
+def test_memoize_differential_rates(xes: fd.ERSource):
+    lf = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        data=xes.data)
+    source = lf.sources['er']
+
+    # Count differential rate computations
+    n_calls = [0]
+    differential_rate = source.differential_rate
+
+    def counting_differential_rate(*args, **kwargs):
+        n_calls[0] += 1
+        return differential_rate(*args, **kwargs)
+
+    source.differential_rate = counting_differential_rate
+
+    # Results match those without memoization
+    for params in (dict(er_rate_multiplier=2.),
+                   dict(er_rate_multiplier=0.5, elife=300e3)):
+        for second_order in (False, True):
+            results = []
+            for memoize in (True, False):
+                lf.memoize_differential_rates = memoize
+                results.append(lf.log_likelihood(
+                    omit_grads=('elife',), second_order=second_order,
+                    **params))
+            n_results = 3 if second_order else 2
+            for x, y in zip(*[r[:n_results] for r in results]):
+                np.testing.assert_allclose(x, y, rtol=1e-5)
+    lf.memoize_differential_rates = True
+
+    # Differential rates are only computed again if elife changes
+    lf.log_likelihood(er_rate_multiplier=1., omit_grads=('elife',))
+    n = n_calls[0]
+    lf.log_likelihood(er_rate_multiplier=3., omit_grads=('elife',))
+    assert n_calls[0] == n
+    lf.log_likelihood(er_rate_multiplier=3., elife=200e3,
+                      omit_grads=('elife',))
+    assert n_calls[0] > n
+
+
+def test_memoize_differential_rates_per_source(xes: fd.ERSource):
+    lf = fd.LogLikelihood(
+        sources=dict(er=fd.ERSource, nr=fd.NRSource),
+        elife=(100e3, 500e3, 5),
+        er_pel_a=(10, 20, 3),
+        free_rates=('er', 'nr'),
+        data=xes.data)
+
+    # Count differential rate computations of each source
+    n_calls = dict(er=0, nr=0)
+    for sname, source in lf.sources.items():
+        def counting_differential_rate(
+                *args, _sname=sname, _f=source.differential_rate, **kwargs):
+            n_calls[_sname] += 1
+            return _f(*args, **kwargs)
+        source.differential_rate = counting_differential_rate
+
+    # Only the nr source has all its parameters fixed
+    assert lf._memoized_sources(('elife',)) == ('nr',)
+
+    # Results match those without memoization
+    for params in (dict(er_pel_a=12., nr_rate_multiplier=2.),
+                   dict(er_pel_a=18., elife=300e3)):
+        for second_order in (False, True):
+            results = []
+            for memoize in (True, False):
+                lf.memoize_differential_rates = memoize
+                results.append(lf.log_likelihood(
+                    omit_grads=('elife',), second_order=second_order,
+                    **params))
+            n_results = 3 if second_order else 2
+            for x, y in zip(*[r[:n_results] for r in results]):
+                np.testing.assert_allclose(x, y, rtol=1e-5)
+    lf.memoize_differential_rates = True
+
+    # Changing an er parameter only recomputes the er differential rates
+    lf.log_likelihood(er_pel_a=12., omit_grads=('elife',))
+    n = n_calls.copy()
+    lf.log_likelihood(er_pel_a=15., omit_grads=('elife',))
+    assert n_calls['nr'] == n['nr']
+    assert n_calls['er'] > n['er']
+
+
+def test_fuse_batches(xes: fd.ERSource):
+    data = pd.concat([xes.data] * 3, ignore_index=True)
+    lf = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        batch_size=4,
+        data=data)
+
+    lf2 = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        batch_size=4,
+        fuse_batches=True,
+        data=data)
+
+    # Prevent jitter from mu interpolator simulation to fail test
+    lf2.mu_estimators = lf.mu_estimators
+
+    params = dict(er_rate_multiplier=2., elife=300e3)
+    for second_order in (False, True):
+        ll1, grad1, hess1 = lf.log_likelihood(second_order=second_order,
+                                              **params)
+        ll2, grad2, hess2 = lf2.log_likelihood(second_order=second_order,
+                                               **params)
+        np.testing.assert_allclose(ll1, ll2, rtol=1e-6)
+        np.testing.assert_allclose(grad1, grad2, rtol=1e-5)
+        if second_order:
+            np.testing.assert_allclose(hess1, hess2, rtol=1e-5)
+        else:
+            assert hess2 is None
+
+    ll1, grad1, _ = lf.log_likelihood(omit_grads=('elife',), **params)
+    ll2, grad2, _ = lf2.log_likelihood(omit_grads=('elife',), **params)
+    assert grad2.shape == (1,)
+    np.testing.assert_allclose(grad1, grad2, rtol=1e-5)
+
+
+def test_jit_compile(xes: fd.ERSource):
+    lf = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        data=xes.data)
+
+    lf2 = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        jit_compile=True,
+        data=xes.data)
+    lf2.mu_estimators = lf.mu_estimators
+    lf2.param_defaults = lf.param_defaults
+
+    params = dict(er_rate_multiplier=2., elife=300e3)
+    ll1, grad1, _ = lf.log_likelihood(**params)
+    ll2, grad2, _ = lf2.log_likelihood(**params)
+    assert lf2._xla_functions['_log_likelihood'].jit_compile
+    # XLA may reorder floating-point operations
+    np.testing.assert_allclose(ll1, ll2, rtol=1e-5)
+    np.testing.assert_allclose(grad1, grad2, rtol=1e-3)
+
+    # Hessians are computed without XLA
+    _, _, hess1 = lf.log_likelihood(second_order=True, **params)
+    _, _, hess2 = lf2.log_likelihood(second_order=True, **params)
+    np.testing.assert_allclose(hess1, hess2, rtol=1e-5)
+
+    np.testing.assert_allclose(
+        lf2.sources['er'].batched_differential_rate(),
+        lf.sources['er'].batched_differential_rate(),
+        rtol=1e-3)
+
+
+def test_log_space(xes: fd.ERSource):
+    lf = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        data=xes.data)
+
+    lf2 = fd.LogLikelihood(
+        sources=dict(er=xes.__class__),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        log_space=True,
+        data=xes.data)
+    lf2.mu_estimators = lf.mu_estimators
+    lf2.param_defaults = lf.param_defaults
+
+    source = lf2.sources['er']
+    np.testing.assert_allclose(
+        np.exp(source.log_differential_rate(source.data_tensor[0])),
+        source.differential_rate(source.data_tensor[0]),
+        rtol=1e-5)
+
+    params = dict(er_rate_multiplier=2., elife=300e3)
+    ll1, grad1, hess1 = lf.log_likelihood(second_order=True, **params)
+    ll2, grad2, hess2 = lf2.log_likelihood(second_order=True, **params)
+    np.testing.assert_allclose(ll1, ll2, rtol=1e-5)
+    np.testing.assert_allclose(grad1, grad2, rtol=1e-3)
+    np.testing.assert_allclose(hess1, hess2, rtol=1e-3,
+                               atol=1e-3 * np.max(np.abs(hess1)))
+
+    # Banded contractions in log space give the same (finite) gradient
+    class BandedSource(xes.__class__):
+        max_band_fraction = 1.
+
+    lf3 = fd.LogLikelihood(
+        sources=dict(er=BandedSource),
+        elife=(100e3, 500e3, 5),
+        free_rates='er',
+        log_space=True,
+        data=xes.data)
+    lf3.mu_estimators = lf.mu_estimators
+    lf3.param_defaults = lf.param_defaults
+    ll3, grad3, _ = lf3.log_likelihood(**params)
+    assert np.all(np.isfinite(grad3))
+    np.testing.assert_allclose(ll1, ll3, rtol=1e-5)
+    np.testing.assert_allclose(grad1, grad3, rtol=1e-3)
+
+    # Memoized differential rates are stored as logs
+    fix = ('elife',)
+    ll1, grad1, _ = lf.log_likelihood(omit_grads=fix, **params)
+    ll2, grad2, _ = lf2.log_likelihood(omit_grads=fix, **params)
+    np.testing.assert_allclose(ll1, ll2, rtol=1e-5)
+    np.testing.assert_allclose(grad1, grad2, rtol=1e-3)
+
+
+def test_sort_by_dimsizes(xes: fd.ERSource):
+    np.random.seed(0)
+    data = fd.ERSource().simulate(5)
+    n = len(data)
+    lf = fd.LogLikelihood(
+        sources=dict(er=fd.ERSource, nr=fd.NRSource),
+        free_rates=('er', 'nr'),
+        batch_size=n,
+        data=data)
+
+    lf2 = fd.LogLikelihood(
+        sources=dict(er=fd.ERSource, nr=fd.NRSource),
+        free_rates=('er', 'nr'),
+        batch_size=n,
+        sort_by_dimsizes=True,
+        data=data)
+    lf2.mu_estimators = lf.mu_estimators
+    lf2.param_defaults = lf.param_defaults
+
+    # Sources in one dataset must share the event order,
+    # since their data tensors are concatenated
+    order = lf2.sources['er'].event_order
+    assert sorted(order) == list(range(n))
+    np.testing.assert_array_equal(lf2.sources['nr'].event_order, order)
+
+    # With a single batch, sorting does not change the likelihood
+    np.testing.assert_allclose(lf2(), lf(), rtol=1e-5)
+
+
+def test_no_retracing(xes: fd.ERSource):
+    if not xes.__class__.__name__ == 'ERSource':
+        return
+    for fuse_batches in (False, True):
+        lf = fd.LogLikelihood(
+            sources=dict(er=xes.__class__),
+            elife=(100e3, 500e3, 5),
+            free_rates='er',
+            fuse_batches=fuse_batches,
+            # Test the graphs that compute differential rates
+            memoize_differential_rates=False,
+            data=xes.data)
+
+        params = dict(er_rate_multiplier=2., elife=300e3)
+        _, grad, _ = lf.log_likelihood(**params)
+        n_traces = lf.n_traces
+        assert n_traces > 0
+
+        # First-order results for any omitted gradients
+        # and parameter values reuse the same graph
+        for omit_grads in (('elife',), ('er_rate_multiplier',),
+                           ('elife', 'er_rate_multiplier')):
+            keep = [i for i, pname in enumerate(lf.param_names)
+                    if pname not in omit_grads]
+            _, grad_2, _ = lf.log_likelihood(omit_grads=omit_grads, **params)
+            np.testing.assert_array_equal(grad_2, grad[keep])
+            lf.log_likelihood(omit_grads=omit_grads, elife=200e3)
+        assert lf.n_traces == n_traces
+
+        # Second-order graphs are traced once per set of omitted gradients
+        _, _, hess = lf.log_likelihood(second_order=True, **params)
+        _, _, hess_2 = lf.log_likelihood(
+            second_order=True, omit_grads=('elife',), **params)
+        assert hess_2.shape == (1, 1)
+        np.testing.assert_allclose(hess_2[0, 0], hess[0, 0], rtol=1e-5)
+        n_traces = lf.n_traces
+        lf.bestfit(fix=dict(elife=300e3))
+        # Only the Hessian-vector product graph is new, and it is reused
+        # for other fixed parameters
+        assert lf.n_traces == n_traces + 1
+        lf.bestfit(fix=dict(er_rate_multiplier=2.))
+        assert lf.n_traces == n_traces + 1
+        # ... regardless of their order
+        assert (lf._traced_omit_grads(('elife', 'er_rate_multiplier'), True)
+                == lf._traced_omit_grads(('er_rate_multiplier', 'elife'),
+                                         True))
+
+
+@pytest.mark.parametrize('kind', ['float64', 'mixed'])
+def test_float_type(xes: fd.ERSource, kind):
+    dr = xes.batched_differential_rate(progress=False)
+    with pytest.raises(ValueError):
+        fd.set_float_type('float16')
+    assert fd.get_float_type() == 'float32'
+
+    fd.set_float_type(kind)
+    try:
+        assert fd.get_float_type() == kind
+        assert fd.accumulation_type() == tf.float64
+        expected_type = dict(float64=tf.float64, mixed=tf.float32)[kind]
+        source = xes.__class__(xes.data.copy(), batch_size=2, max_sigma=8)
+        assert source.data_tensor.dtype == expected_type
+        assert (source.differential_rate(source.data_tensor[0]).dtype
+                == expected_type)
+        # float32 rounding errors are at the 1e-4 level
+        np.testing.assert_allclose(
+            source.batched_differential_rate(progress=False), dr,
+            rtol=1e-3)
+
+        lf = fd.LogLikelihood(
+            sources=dict(er=xes.__class__),
+            elife=(100e3, 500e3, 5),
+            free_rates='er',
+            data=xes.data)
+        assert lf.sources['er'].data_tensor.dtype == expected_type
+        _, _, hess = lf.log_likelihood(second_order=True)
+        assert np.isfinite(hess).all()
+    finally:
+        fd.set_float_type('float32')
@@ -1,3 +1,4 @@
+import os
 import numpy as np
 import pandas as pd
 
@@ -43,3 +44,36 @@ def test_nest_source():
         [1.837623e-05, 4.047864e-05],
         # For some reason, we get different values on different machines
         rtol=5e-3)
+
+
+def test_mc_reservoir_cache(tmp_path):
+    import flamedisx as fd
+    import flamedisx.nest as fd_nest
+    fd.clear_mc_reservoir_cache()
+    df_test = dummy_data()
+    kwargs = dict(energy_min=8, energy_max=8, num_energies=1, batch_size=2,
+                  mc_reservoir_size=int(1e4))
+
+    s = fd_nest.nestERSource(df_test, cache_dir=str(tmp_path), **kwargs)
+    reservoir = s.mc_reservoir
+    assert 0 < len(reservoir) <= int(1e4)
+
+    # Reused for new data, and shared between sources
+    s.set_data(df_test.iloc[::-1].reset_index(drop=True))
+    assert s.mc_reservoir is reservoir
+    assert fd_nest.nestERSource(df_test, **kwargs).mc_reservoir is reservoir
+
+    # Loaded from disk when not in memory
+    fd.clear_mc_reservoir_cache()
+    s.set_data(df_test.iloc[::-1].reset_index(drop=True))
+    pd.testing.assert_frame_equal(s.mc_reservoir, reservoir)
+
+    # Simulated again when the configuration changes
+    s.set_data(df_test, radius=s.radius / 2)
+    assert not s.mc_reservoir.equals(reservoir)
+
+    s.invalidate_mc_reservoir()
+    assert s.mc_reservoir.empty
+    assert not [fn for fn in os.listdir(tmp_path)
+                if fn.startswith('mc_reservoir_')
+                and s.mc_reservoir_key(int(1e4)) in fn]
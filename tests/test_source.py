@@ -172,10 +172,9 @@ def test_domains(xes: fd.ERSource):
     n_det = n_det.numpy()
     n_prod = n_prod.numpy()
 
-    assert (n_det.shape == n_prod.shape
-            == (n_events,
-                max(xes.dimsizes['electrons_detected']),
-                max(xes.dimsizes['electrons_produced'])))
+    # Domains are broadcastable views, not full grids
+    assert n_det.shape == (n_events, max(xes.dimsizes['electrons_detected']), 1)
+    assert n_prod.shape == (n_events, 1, max(xes.dimsizes['electrons_produced']))
 
     np.testing.assert_equal(
         np.amin(n_det, axis=(1, 2)),
@@ -300,6 +299,146 @@ def test_diff_rate_grad(xes):
     np.testing.assert_almost_equal(dr, dr3, decimal=4)
 
 
+def test_contraction_plan(xes: fd.ERSource):
+    plan = xes.contraction_plan
+    assert set(plan.output_dims) == {'s1', 's2'}
+    assert 'multiply-adds' in str(plan)
+    dr = xes.batched_differential_rate()
+
+    # Contracting in block order gives the same result, at higher cost
+    xes.plan_contractions(optimize=False)
+    assert xes.contraction_plan.flops > plan.flops
+    xes.trace_differential_rate()
+    np.testing.assert_allclose(xes.batched_differential_rate(), dr,
+                               rtol=1e-5)
+
+
+def test_banded_contraction(xes: fd.ERSource):
+    assert any(xes.contraction_plan.step_bands)
+    dr = xes.batched_differential_rate()
+    log_dr = xes.log_differential_rate(xes.data_tensor[0])
+
+    # Contracting banded blocks using their band (where it is narrower
+    # than the summed dimension) gives the same result
+    xes.max_band_fraction = 1.
+    xes.trace_differential_rate()
+    np.testing.assert_allclose(xes.batched_differential_rate(), dr,
+                               rtol=1e-5)
+    np.testing.assert_allclose(
+        xes.log_differential_rate(xes.data_tensor[0]), log_dr, rtol=1e-5)
+
+
+def test_contracted_er_quanta():
+    x = fd.ERSource(dummy_data(), batch_size=2, max_sigma=8)
+    assert x.contracted_results == {1: len(x.model_blocks)}
+    spectrum, quanta = x.model_blocks[:2]
+    data_tensor = x.data_tensor[0]
+    ptensor = x.ptensor_from_kwargs()
+    kwargs = dict(
+        rate_vs_energy=spectrum.compute(data_tensor, ptensor),
+        **x._domain_dict(('energy',), data_tensor))
+
+    # Summing the spectrum into quanta bins is the same as contracting
+    # it with the full p(nq | e)
+    expected = tf.einsum('zqe,ze->zq',
+                         quanta.compute(data_tensor, ptensor, **kwargs),
+                         kwargs['rate_vs_energy'])
+    np.testing.assert_allclose(
+        quanta.compute_contracted(data_tensor, ptensor, **kwargs),
+        expected, rtol=1e-5)
+
+
+def test_log_space_underflow():
+    # With a large max_sigma, the produced electrons domain reaches far
+    # into the tails of the binomial detection, where float32
+    # probabilities underflow to zero but their logs do not
+    x = fd.ERSource(dummy_data(), batch_size=2, max_sigma=40)
+    block = [b for b in x.model_blocks
+             if isinstance(b, fd.DetectElectrons)][0]
+    data_tensor = x.data_tensor[0]
+    ptensor = x.ptensor_from_kwargs()
+    result = block.compute(data_tensor, ptensor).numpy()
+    log_result = block.compute(data_tensor, ptensor, log_space=True).numpy()
+    assert np.any((result == 0) & np.isfinite(log_result))
+    assert not np.any(np.isnan(log_result))
+    nonzero = result > 0
+    np.testing.assert_allclose(np.exp(log_result[nonzero]),
+                               result[nonzero], rtol=1e-4)
+
+    # The differential rate agrees where it does not underflow
+    log_dr = x.log_differential_rate(data_tensor).numpy()
+    assert np.all(np.isfinite(log_dr))
+    np.testing.assert_allclose(
+        np.exp(log_dr),
+        x.differential_rate(data_tensor), rtol=1e-3)
+
+
+def test_plan_contraction():
+    # The shared dimension b must be kept until all three tensors
+    # are contracted, giving rank-3 intermediates
+    input_dims = [('a', 'b'), ('b', 'c'), ('b', 'd')]
+    output_dims = ('a', 'c', 'd')
+    dimsizes = dict(a=2, b=3, c=4, d=5)
+    np.random.seed(0)
+    results = [np.random.rand(6, *[dimsizes[d] for d in dims])
+               for dims in input_dims]
+    expected = np.einsum('zab,zbc,zbd->zacd', *results)
+
+    for optimize in (True, False):
+        plan = fd.plan_contraction(
+            (0, 1, 2), input_dims, output_dims, dimsizes, optimize=optimize)
+        assert plan.operand_dims[-1] == output_dims
+        tensors = [tf.constant(r, dtype=fd.float_type()) for r in results]
+        np.testing.assert_allclose(plan.contract(tensors), expected,
+                                   rtol=1e-5)
+        np.testing.assert_allclose(
+            np.exp(plan.contract([tf.math.log(r) for r in tensors],
+                                 log_space=True)),
+            expected, rtol=1e-5)
+
+
+def test_multiply_block_results(xes: fd.ERSource):
+    np.random.seed(0)
+    r = np.random.rand(2, 3, 4)
+    r2 = np.random.rand(2, 5, 4)
+    dims, result = xes.multiply_block_results(
+        ('a', 'b'), ('c', 'b'), tf.constant(r), tf.constant(r2))
+    assert dims == ('a', 'c')
+    np.testing.assert_allclose(result, np.einsum('zab,zcb->zac', r, r2),
+                               rtol=1e-5)
+    with pytest.raises(ValueError):
+        xes.multiply_block_results(('a', 'b'), ('c', 'd'), r, r2)
+
+
+def test_banded_plan_contraction():
+    # a is nonzero on three diagonals only, so its band is narrower than
+    # half of the summed dimension b, and the band is used
+    input_dims = [('a', 'b'), ('b', 'c', 'd')]
+    output_dims = ('a', 'c', 'd')
+    dimsizes = dict(a=10, b=12, c=3, d=4)
+    np.random.seed(0)
+    a = np.random.rand(6, 10, 12)
+    a *= np.abs(np.arange(12)[None, :] - np.arange(10)[:, None] - 1) <= 1
+    b = np.random.rand(6, 12, 3, 4)
+    expected = np.einsum('zab,zbcd->zacd', a, b)
+
+    plan = fd.plan_contraction(
+        (0, 1), input_dims, output_dims, dimsizes, banded=(0,))
+    assert plan.step_bands[0] == (0, 'b')
+    assert fd.to_band(tf.constant(a))[0].shape[2] == 3
+
+    tensors = [tf.constant(r, dtype=fd.float_type()) for r in (a, b)]
+    for max_band_fraction in (0., 0.5):
+        np.testing.assert_allclose(
+            plan.contract(tensors, max_band_fraction=max_band_fraction),
+            expected, rtol=1e-5)
+        np.testing.assert_allclose(
+            np.exp(plan.contract([tf.math.log(r) for r in tensors],
+                                 log_space=True,
+                                 max_band_fraction=max_band_fraction)),
+            expected, rtol=1e-5)
+
+
 def test_set_data(xes: fd.ERSource):
     assert xes.n_batches == 1
     assert xes.n_padding == 0
@@ -409,3 +548,186 @@ def test_FrozenReservoirSource():
 
     assert (dr_data_nr_source_er == d_nr['er_diff_rate'].values).all()
     assert (dr_data_nr_source_nr == d_nr['nr_diff_rate'].values).all()
+
+
+def test_sort_by_dimsizes():
+    np.random.seed(42)
+    data = fd.ERSource().simulate(6)
+    n = len(data)
+
+    # With one batch, sorting only changes the order of events
+    # inside the data tensor, not the results.
+    s = fd.ERSource(data.copy(), batch_size=n)
+    s_sorted = fd.ERSource(data.copy(), batch_size=n, sort_by_dimsizes=True)
+    assert s.event_order is None
+    assert sorted(s_sorted.event_order) == list(range(n))
+    np.testing.assert_array_equal(
+        s_sorted.data['s1'].values,
+        data['s1'].values[s_sorted.event_order])
+
+    # Results come back in the original order
+    np.testing.assert_allclose(
+        s_sorted.batched_differential_rate(),
+        s.batched_differential_rate(),
+        rtol=1e-5)
+
+    # Explicit orders override sorting
+    s_sorted.set_data(data.copy(), event_order=np.arange(n)[::-1])
+    np.testing.assert_array_equal(s_sorted.data['s1'].values,
+                                  data['s1'].values[::-1])
+
+
+def test_sort_by_dimsizes_batches():
+    np.random.seed(42)
+    data = fd.ERSource().simulate(20)
+    n = len(data)
+    batch_size = 4
+
+    s_sorted = fd.ERSource(data.copy(), batch_size=batch_size,
+                           sort_by_dimsizes=True)
+    order = s_sorted.event_order
+    assert s_sorted.n_batches > 1
+    np.testing.assert_array_equal(s_sorted.data['s1'].values[:n],
+                                  data['s1'].values[order])
+
+    # Events stay sorted across batches
+    widths = (s_sorted.data['photons_produced_max'].values[:n]
+              - s_sorted.data['photons_produced_min'].values[:n])
+    assert np.all(np.diff(widths) >= 0)
+
+    # Reusing the annotation done for sorting gives the same result as
+    # annotating events that were in this order to begin with
+    s = fd.ERSource(data.iloc[order].copy(), batch_size=batch_size)
+    for column in s.data.columns:
+        np.testing.assert_array_equal(s_sorted.data[column].values,
+                                      s.data[column].values)
+    dr = np.zeros(n)
+    dr[order] = s.batched_differential_rate(progress=False)
+    np.testing.assert_allclose(
+        s_sorted.batched_differential_rate(progress=False),
+        dr,
+        rtol=1e-5)
+
+
+def test_annotation_cache(tmp_path):
+    np.random.seed(0)
+    data = fd.ERSource().simulate(10)
+    s = fd.ERSource(data.copy(), batch_size=4, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    dr = s.batched_differential_rate(progress=False)
+
+    # Same data and configuration: loaded from the cache
+    s2 = fd.ERSource(data.copy(), batch_size=4, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    assert s2.n_padding == s.n_padding
+    assert list(s2.data.columns) == list(s.data.columns)
+    np.testing.assert_array_equal(s2.data_tensor.numpy(),
+                                  s.data_tensor.numpy())
+    np.testing.assert_allclose(s2.batched_differential_rate(progress=False),
+                               dr)
+
+    # Different data, defaults or batch size give new entries
+    s2.set_data(data.iloc[:5].copy())
+    fd.ERSource(data.copy(), batch_size=4, cache_dir=str(tmp_path),
+                elife=300e3)
+    fd.ERSource(data.copy(), batch_size=5, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 4
+
+
+def test_cache_key_covers_code():
+    class ModifiedSource(fd.ERSource):
+        @staticmethod
+        def p_electron(nq):
+            return 0.5 * tf.ones_like(nq)
+    key = ModifiedSource().mc_reservoir_key(100)
+
+    # Redefined under the same name, e.g. in a notebook
+    class ModifiedSource(fd.ERSource):  # noqa: F811
+        @staticmethod
+        def p_electron(nq):
+            return 0.6 * tf.ones_like(nq)
+    assert ModifiedSource().mc_reservoir_key(100) != key
+
+    class ModifiedSource(fd.ERSource):  # noqa: F811
+        @staticmethod
+        def p_electron(nq):
+            return 0.5 * tf.ones_like(nq)
+    assert ModifiedSource().mc_reservoir_key(100) == key
+
+
+def test_parallel_annotation():
+    np.random.seed(0)
+    data = fd.ERSource().simulate(20)
+
+    s = fd.ERSource(batch_size=4)
+    s.set_data(data.copy())
+    s2 = fd.ERSource(batch_size=4)
+    s2.set_data(data.copy(), n_workers=2)
+
+    pd.testing.assert_frame_equal(s.data, s2.data)
+    np.testing.assert_array_equal(s.data_tensor.numpy(),
+                                  s2.data_tensor.numpy())
+
+
+def test_parallel_annotation_mc_reservoir():
+    # Processes use the parent's MC reservoir, rather than each simulating
+    # their own, so bounds do not depend on n_workers
+    np.random.seed(0)
+    data = fd.nest.nestERSource().simulate(20)
+    s = fd.nest.nestERSource(batch_size=4)
+    s.mc_reservoir_size = 10_000
+    s.set_data(data.copy())
+    s2 = fd.nest.nestERSource(batch_size=4)
+    s2.mc_reservoir_size = 10_000
+    s2.set_data(data.copy(), n_workers=2)
+
+    bound_columns = [c for c in s.data.columns
+                     if c.endswith('_min') or c.endswith('_max')]
+    assert 'energy_min' in bound_columns
+    pd.testing.assert_frame_equal(s.data[bound_columns],
+                                  s2.data[bound_columns])
+
+
+def test_batch_max():
+    x = np.array([3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5])
+    for batch_size in (1, 3, 4, 11, 20):
+        expected = np.concatenate([
+            np.full(len(x[i:i + batch_size]), x[i:i + batch_size].max())
+            for i in range(0, len(x), batch_size)])
+        np.testing.assert_array_equal(
+            fd.lxe_blocks.quanta_generation.batch_max(x, batch_size),
+            expected)
+
+
+def test_quanta_steps_per_batch():
+    np.random.seed(0)
+    data = fd.ERSource().simulate(40)
+    data = data.iloc[:23].reset_index(drop=True)
+    batch_size = 5
+
+    # Annotate without padding, so the last batch is incomplete
+    s = fd.ERSource(batch_size=batch_size)
+    s.max_dim_sizes = {k: 10 for k in s.max_dim_sizes}
+    s.set_data(data.copy(), _skip_tf_init=True)
+    d = s.data
+    assert len(d) % batch_size != 0
+
+    steps = np.minimum(
+        np.ceil((d['electrons_produced_max'] - d['electrons_produced_min'])
+                / 9),
+        np.ceil((d['photons_produced_max'] - d['photons_produced_min'])
+                / 9)).clip(1, None)
+    assert len(np.unique(steps)) > 1
+    for i in range(0, len(d), batch_size):
+        batch = slice(i, i + batch_size)
+        # Steps and quanta_produced dimsizes are the batch maximum,
+        # independent of neighbouring batches
+        np.testing.assert_array_equal(d['quanta_produced_steps'][batch],
+                                      steps[batch].max())
+        assert len(np.unique(d['quanta_produced_dimsizes'][batch])) == 1
+
+    # Same results when annotating the first batches alone
+    s.set_data(data.iloc[:10].copy(), _skip_tf_init=True)
+    for col in ('quanta_produced_steps', 'quanta_produced_dimsizes',
+                'electrons_produced_dimsizes'):
+        np.testing.assert_array_equal(s.data[col], d[col][:10])
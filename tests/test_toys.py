@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+import flamedisx as fd
+
+
+def template_likelihood():
+    edges = [np.linspace(0, 10, 11), np.linspace(0, 20, 11)]
+    centers = [0.5 * (e[1:] + e[:-1]) for e in edges]
+    hist = np.outer(np.exp(-(centers[0] - 5)**2 / 8),
+                    np.exp(-(centers[1] - 8)**2 / 20))
+    hist *= 20 / hist.sum()
+    return fd.LogLikelihood(
+        sources=dict(bg=fd.TemplateSource),
+        arguments=dict(bg=dict(template=(hist, edges),
+                               axis_names=('s1', 's2'),
+                               events_per_bin=True)),
+        free_rates='bg',
+        progress=False)
+
+
+def test_toy_runner(tmp_path):
+    output = str(tmp_path / 'toys.csv')
+    kwargs = dict(output=output, test_point=dict(bg_rate_multiplier=1.),
+                  seed=1)
+
+    runner = fd.ToyRunner(template_likelihood, **kwargs)
+    results = runner.run(3, progress=False)
+    assert results['toy_index'].tolist() == [0, 1, 2]
+    assert results['error'].isna().all()
+    assert np.all(results['n_events'] > 0)
+    assert np.all(results['test_statistic'] >= -1e-3)
+    # Rate multiplier fits to the number of events (mu = 20 at 1)
+    np.testing.assert_allclose(results['bestfit_bg_rate_multiplier'],
+                               results['n_events'] / 20, rtol=1e-3)
+
+    # Resuming only runs the missing toys, and simulates the same toys
+    # regardless of the number of workers
+    with open(output) as f:
+        lines = f.readlines()
+    with open(output, mode='w') as f:
+        # Drop the last toy, and leave a partially written line
+        f.writelines(lines[:-1] + [lines[-1][:5]])
+    runner = fd.ToyRunner(template_likelihood, n_workers=2, **kwargs)
+    resumed = runner.run(4, progress=False)
+    assert resumed['toy_index'].tolist() == [0, 1, 2, 3]
+    pd.testing.assert_frame_equal(
+        resumed.iloc[:3][['toy_index', 'n_events', 'test_statistic']],
+        results[['toy_index', 'n_events', 'test_statistic']],
+        check_dtype=False, rtol=1e-4)
+    pd.testing.assert_frame_equal(
+        runner.done_toys().sort_values('toy_index').reset_index(drop=True),
+        resumed, check_dtype=False)
@@ -1,5 +1,8 @@
 import numpy as np
 import pandas as pd
+import pytest
+from scipy import special, stats
+import tensorflow as tf
 import wimprates as wr
 import flamedisx as fd
 
@@ -13,3 +16,206 @@ def test_j2000_conversion():
     np.testing.assert_array_almost_equal(j2000_times,
                                          test_times,
                                          decimal=6)
+
+
+def test_map_registry(tmp_path):
+    fn = str(tmp_path / 'test_map.json')
+    pd.Series(dict(
+        coordinate_system=[[0., 0.], [0., 1.], [1., 0.], [1., 1.]],
+        map=[1., 2., 3., 4.],
+        other_map=[5., 6., 7., 8.])).to_json(fn)
+
+    fd.clear_map_registry()
+    m = fd.get_interpolating_map(fn)
+    assert fd.get_interpolating_map(fn) is m
+    np.testing.assert_allclose(m(np.array([[0., 0.]])), [1.], rtol=1e-4)
+
+    # Using a different map does not change the cached resource
+    m2 = fd.get_interpolating_map(fn, map_name='other_map')
+    assert m2 is not m
+    np.testing.assert_allclose(m2(np.array([[0., 0.]])), [5.], rtol=1e-4)
+    assert fd.get_resource(fn)['map'] == [1., 2., 3., 4.]
+
+    fd.clear_map_registry()
+    assert fd.get_interpolating_map(fn) is not m
+
+
+def test_xla_function():
+    f = fd.XLAFunction(lambda x: 2 * x)
+    np.testing.assert_allclose(f(tf.constant([1., 2.])), [2., 4.])
+    assert f.jit_compile
+
+    # XLA cannot compile python functions
+    f = fd.XLAFunction(
+        lambda x: tf.numpy_function(np.sort, [x], tf.float32))
+    with pytest.warns(UserWarning, match='XLA'):
+        np.testing.assert_allclose(f(tf.constant([3., 1.])), [1., 3.])
+    assert not f.jit_compile
+    np.testing.assert_allclose(f(tf.constant([2., 0.])), [0., 2.])
+
+    # Errors not specific to XLA are raised, and do not turn XLA off
+    f = fd.XLAFunction(lambda x: tf.reshape(x, (3,)))
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        f(tf.constant([1., 2.]))
+    assert f.jit_compile
+    np.testing.assert_allclose(f(tf.constant([1., 2., 3.])), [1., 2., 3.])
+
+
+def test_log_einsum_exp():
+    np.random.seed(0)
+    a = np.random.uniform(-5, 0, size=(2, 3, 4))
+    b = np.random.uniform(-5, 0, size=(2, 4, 5))
+
+    for equation in ('zab,zbc->zac', 'zab,zbc->zca', 'zab,zbc->zabc'):
+        expected = np.log(np.einsum(equation, np.exp(a), np.exp(b)))
+        result = fd.log_einsum_exp(
+            equation,
+            tf.constant(a - 100, dtype=tf.float32),
+            tf.constant(b - 100, dtype=tf.float32))
+        np.testing.assert_allclose(result, expected - 200, rtol=1e-5)
+
+    # Zero probabilities give -inf, not nan
+    a[0, 0, :] = -np.inf
+    expected = np.log(np.exp(a) @ np.exp(b))
+    result = fd.log_einsum_exp('zab,zbc->zac',
+                               tf.constant(a, dtype=tf.float32),
+                               tf.constant(b, dtype=tf.float32)).numpy()
+    assert np.all(result[0, 0] == -np.inf)
+    np.testing.assert_allclose(result[0, 1:], expected[0, 1:], rtol=1e-5)
+
+
+def test_band_matmul():
+    np.random.seed(0)
+    a = np.random.rand(2, 4, 6)
+    # Keep a band of width 3, at different offsets for the two matrices
+    i, j = np.arange(4)[:, None], np.arange(6)[None, :]
+    a[0][(j - i < 0) | (j - i > 2)] = 0
+    a[1][(j - i < 1) | (j - i > 3)] = 0
+    b = np.random.rand(2, 6, 5)
+
+    band, offset = fd.to_band(tf.constant(a))
+    assert band.shape == (2, 4, 3)
+    np.testing.assert_array_equal(offset, [0, 1])
+    np.testing.assert_allclose(fd.band_matmul(band, offset, tf.constant(b)),
+                               a @ b, rtol=1e-5)
+
+    # In log space
+    with np.errstate(divide='ignore'):
+        log_a = np.log(a)
+    band, offset = fd.to_band(tf.constant(log_a), log_space=True)
+    assert band.shape == (2, 4, 3)
+    np.testing.assert_allclose(
+        np.exp(fd.band_matmul(band, offset, tf.constant(np.log(b)),
+                              log_space=True)),
+        a @ b, rtol=1e-5)
+
+    # Rows of zeros in log space give -inf, but no NaN gradients
+    a[:, 0] = 0
+    with np.errstate(divide='ignore'):
+        band, offset = fd.to_band(tf.constant(np.log(a)), log_space=True)
+    log_b = tf.constant(np.log(b))
+    with tf.GradientTape() as tape:
+        tape.watch(log_b)
+        r = fd.band_matmul(band, offset, log_b, log_space=True)
+        total = tf.reduce_sum(tf.where(tf.math.is_finite(r),
+                                       r, tf.zeros_like(r)))
+    ab = a @ b
+    ab[ab == 0] = np.inf
+    # d/d log(b_jp) of sum_ip log((a @ b)_ip) for nonzero (a @ b)_ip
+    expected = np.einsum('zij,zjp,zip->zjp', a, b, 1 / ab)
+    np.testing.assert_allclose(tape.gradient(total, log_b), expected,
+                               rtol=1e-5)
+
+
+def test_binom_poisson_logpmf():
+    fd.extend_log_factorials(50)
+    k = np.arange(-2, 40)[:, None].astype(float)
+    n = np.arange(0, 30)[None, :].astype(float)
+    p = 0.3
+
+    with np.errstate(divide='ignore'):
+        expected = stats.binom.logpmf(k, n, p)
+    np.testing.assert_allclose(fd.binom_logpmf(k, n, p), expected,
+                               rtol=1e-4)
+
+    mu = np.linspace(0.5, 20, 30)[None, :]
+    with np.errstate(divide='ignore'):
+        expected = stats.poisson.logpmf(k, mu)
+    np.testing.assert_allclose(fd.poisson_logpmf(k, mu), expected,
+                               rtol=1e-4)
+
+
+def test_binom_logpmf_large_n():
+    # The log factorials are much larger than the result, so they
+    # must not be combined in (the default) float32
+    # Restore the table afterwards, so other tests see its usual size
+    old_table = fd.utils._log_factorials_np
+    try:
+        fd.extend_log_factorials(20_000)
+        n = 10_000.
+        k = np.arange(2800, 3200, dtype=np.float32)
+        np.testing.assert_allclose(fd.binom_logpmf(k, n, 0.3),
+                                   stats.binom.logpmf(k, n, 0.3),
+                                   atol=2e-3)
+    finally:
+        fd.utils._log_factorials_np = old_table
+        if fd.utils._log_factorials is not None:
+            fd.utils._log_factorials.assign(old_table)
+
+
+def test_log_factorial_out_of_table():
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        fd.log_factorial(10**9)
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        fd.log_factorial(-1)
+
+
+def test_beta_binom_logpmf():
+    x = np.arange(0, 20)[:, None].astype(np.float32)
+    n = 20.
+    a, b = fd.beta_params(np.array([0.2, 0.5, 0.7]),
+                          np.array([0.05, 0.1, 0.2]))
+    expected = stats.betabinom.logpmf(x, n, a.numpy(), b.numpy())
+
+    np.testing.assert_allclose(fd.beta_binom_logpmf(x, n, a, b),
+                               expected, rtol=1e-4)
+    fd.extend_log_factorials(n)
+    np.testing.assert_allclose(
+        fd.beta_binom_logpmf(x, n, a, b,
+                             log_binom_coef=fd.log_binom_coef(n, x)),
+        expected, rtol=1e-4)
+
+
+def test_owens_t():
+    h = np.array([0., 0.5, 1., 2., 4., 8., -1.5])[:, None]
+    a = np.array([0., 0.3, 1., 1.5, 10., -0.7, -3.])[None, :]
+    expected = special.owens_t(h, a)
+
+    for n_points in (4, 6):
+        np.testing.assert_allclose(fd.owens_t(h, a, n_points=n_points),
+                                   expected, atol=1e-6)
+
+    # dT/da = exp(-h^2 (1 + a^2) / 2) / (2 pi (1 + a^2)), also at a = 0
+    h = tf.constant(h[:, 0])
+    a = tf.zeros_like(h)
+    with tf.GradientTape() as tape:
+        tape.watch(a)
+        t = fd.owens_t(h, a)
+    np.testing.assert_allclose(tape.gradient(t, a),
+                               np.exp(-h ** 2 / 2) / (2 * np.pi),
+                               rtol=1e-6)
+
+    # Skew Gaussian CDF uses Owen's T
+    x = np.linspace(-3., 3., 13).astype(np.float32)
+    np.testing.assert_allclose(
+        fd.tfp_files.SkewGaussian(loc=0.5, scale=1.5, skewness=2.).cdf(x),
+        stats.skewnorm.cdf(x, 2., loc=0.5, scale=1.5),
+        atol=1e-5)
+
+    # The number of series terms is no longer used
+    with pytest.warns(DeprecationWarning, match='owens_t_terms'):
+        dist = fd.tfp_files.SkewGaussian(loc=0.5, scale=1.5, skewness=2.,
+                                         owens_t_terms=5)
+    np.testing.assert_allclose(
+        dist.cdf(x), stats.skewnorm.cdf(x, 2., loc=0.5, scale=1.5),
+        atol=1e-5)